@@ -1,15 +1,34 @@
 #!/usr/bin/python
 
-import time
+import heapq
 from collections import deque, OrderedDict
+from pcb import PCB
+from events import TextSink, make_sink
+from devices import IOSystem
 
 class BaseOS(object):
     """docstring for BaseOS"""
+    # log line of each event, see events.py
+    event_formats = {
+        'start': "time %(t)sms: Simulator started [Q %(q)s",
+        'end': "time %(t)sms: Simulator ended",
+        'dispatch': "time %(t)sms: P%(proc)s started using the CPU [Q %(q)s",
+        'burst_done': "time %(t)sms: P%(proc)s completed its CPU burst [Q %(q)s",
+        'io_start': "time %(t)sms: P%(proc)s performing I/O [Q %(q)s",
+        'io_done': "time %(t)sms: P%(proc)s completed I/O [Q %(q)s",
+        'terminate': "time %(t)sms: P%(proc)s terminated [Q %(q)s",
+    }
+
     def __init__(self):
         super(BaseOS, self).__init__()
         self.process_table = OrderedDict() # process table
         self.process_queue = deque()
         self.t_cs = 13 # context switch cost
+        self.clock = 0 # virtual clock (ms), driven by events instead of the wall clock
+        self.io_queue = [] # min-heap of (I/O completion time, proc-num) of the blocked processes
+        self.io_devices = None # I/O devices "<name>:<channels>:<FIFO|ELEVATOR>[:<seek-time>],...", see devices.py, None for unlimited I/O
+        self.io_system = None # IOSystem of the run
+        self.sink = TextSink(self.event_formats) # where the events go, EventSink() to drop them
 
     def load_process(self, filename):
         try:
@@ -18,8 +37,9 @@ class BaseOS(object):
                     if each_line == '' or each_line[0] == '#':
                         continue
                     conf = each_line.rstrip('\n').split('|') # <proc-num>|<burst-time>|<num-burst>|<io-time>
-                    # process table {'proc-num':['burst-time', 'num-burst', 'io-time', 'status', 'eachstage-start-time']}
-                    self.process_table[int(conf[0])] = dict(zip(['burst_time', 'num_burst', 'io_time', 'status', 'start_time'], [int(x) for x in conf[1:]] + [0, 0]))
+                    # process table {proc-num: PCB(burst-time, num-burst, io-time), status and eachstage-start-time start at 0}
+                    burst_time, num_burst, io_time = [int(x) for x in conf[1:]]
+                    self.process_table[int(conf[0])] = PCB(int(conf[0]), burst_time, num_burst, io_time)
         except Exception, e:
             print e
             assert False
@@ -31,59 +51,105 @@ class BaseOS(object):
         self.process_table = dict(sorted(self.process_table.iteritems(), key=lambda d:d[0]))
 
     def run(self):
-        print "time 0ms: Simulator started [Q " + ("%s"%list(self.process_queue))[1:]
-        self.t0 = time.time()
-        while len(self.process_table):
-            if len(self.process_queue) == 0: # the CPU is idle
-                self.poll_io()
-            else:
-                # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
-                # poll io performance
-                t1 = time.time()
-                while int(1000*(time.time() - t1)) < self.t_cs:
+        self.sink.event(0, 'start', None, self.process_queue)
+        self.clock = 0
+        self.io_queue = []
+        self.io_system = IOSystem.parse(self.io_devices) if self.io_devices else None
+        try:
+            while len(self.process_table):
+                if len(self.process_queue) == 0: # the CPU is idle
                     self.poll_io()
-                # switch to the next process
-                current_process = self.process_queue.popleft()
-                self.process_table[current_process]['status'] = 1 # actively using the CPU
-                self.process_table[current_process]['start_time'] = time.time()
-                print "time %sms: P%s started using the CPU [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(self.process_queue))[1:]
-
-                while int(1000*(time.time() - self.process_table[current_process]['start_time'])) < self.process_table[current_process]['burst_time']:
-                    self.poll_io() # poll io performance
-                # handle CPU
-                if self.process_table[current_process]['num_burst'] == 1: # it is the last CPU burst
-                    del self.process_table[current_process] # delete the completed process
-                    print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(self.process_queue))[1:]
+                    if len(self.process_queue) == 0 and len(self.process_table):
+                        self.advance_clock() # jump to the next I/O completion
                 else:
-                    if self.process_table[current_process]['io_time'] > 0:
-                        print "time %sms: P%s completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(self.process_queue))[1:]
-                        print "time %sms: P%s performing I/O [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(self.process_queue))[1:]
-                        self.process_table[current_process]['status'] = 2 # blocked on (or performing) I/O
-                        self.process_table[current_process]['start_time'] = time.time()
+                    # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
+                    # poll io performance
+                    t1 = self.clock
+                    while self.clock - t1 < self.t_cs:
+                        self.poll_io()
+                        self.advance_clock(t1 + self.t_cs)
+                    # switch to the next process
+                    current_process = self.process_queue.popleft()
+                    self.process_table[current_process].status = 1 # actively using the CPU
+                    self.process_table[current_process].start_time = self.clock
+                    self.sink.event(self.clock, 'dispatch', current_process, self.process_queue)
+
+                    burst_end = self.process_table[current_process].start_time + self.process_table[current_process].burst_time
+                    while self.clock < burst_end:
+                        self.poll_io() # poll io performance
+                        self.advance_clock(burst_end)
+                    # handle CPU
+                    if self.process_table[current_process].num_burst == 1: # it is the last CPU burst
+                        del self.process_table[current_process] # delete the completed process
+                        self.sink.event(self.clock, 'terminate', current_process, self.process_queue)
                     else:
-                        self.process_table[current_process]['status'] = 0 # ready to use the CPU
-                        self.process_table[current_process]['num_burst'] -= 1
-                        print "time %sms: P%s completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(self.process_queue))[1:]
-                        self.process_queue.append(current_process)
-        print "time %sms: Simulator ended"%(int(1000*(time.time()-self.t0)))
+                        if self.process_table[current_process].io_time > 0:
+                            self.sink.event(self.clock, 'burst_done', current_process, self.process_queue)
+                            self.sink.event(self.clock, 'io_start', current_process, self.process_queue)
+                            self.process_table[current_process].status = 2 # blocked on (or performing) I/O
+                            self.process_table[current_process].start_time = self.clock
+                            self.start_io(current_process, self.process_table[current_process].io_time)
+                        else:
+                            self.process_table[current_process].status = 0 # ready to use the CPU
+                            self.process_table[current_process].num_burst -= 1
+                            self.sink.event(self.clock, 'burst_done', current_process, self.process_queue)
+                            self.process_queue.append(current_process)
+            self.sink.event(self.clock, 'end')
+        finally:
+            self.sink.flush() # also the lines logged before an error
+        self.print_io_stats()
+
+    def start_io(self, proc_num, io_time):
+        # the process blocks on I/O now, it completes after io_time unless it has to queue for a device
+        if self.io_system is None:
+            heapq.heappush(self.io_queue, (self.clock + io_time, proc_num))
+            return
+        for entry in self.io_system.start(self.clock, proc_num, io_time):
+            heapq.heappush(self.io_queue, entry)
+
+    def end_io(self, proc_num, t_io):
+        # the I/O of the process completed at t_io, its device channel serves the next request
+        if self.io_system is not None:
+            for entry in self.io_system.complete(t_io, proc_num):
+                heapq.heappush(self.io_queue, entry)
+
+    def print_io_stats(self):
+        if self.io_system is not None:
+            for line in self.io_system.report(self.clock):
+                print line
 
     def poll_io(self):
-        # check IO performance (two processes complete io at the same time?)
-        for k, v in self.process_table.items():
-            if v['status'] == 2: #blocked on (or performing) I/O
-                if int(1000*(time.time() - v['start_time'])) >= v['io_time']:
-                    self.process_table[k]['status'] = 0 # ready to use the CPU
-                    self.process_table[k]['num_burst'] -= 1
-                    if self.process_table[k]['num_burst'] > 0:
-                        print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(self.process_queue))[1:]
-                        self.process_queue.append(k)
-                    else:
-                        del self.process_table[k] # delete the completed process
-                        print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(self.process_queue))[1:]
+        # check IO performance, ties are broken using process number order
+        while self.io_queue and self.io_queue[0][0] <= self.clock:
+            t_io, k = heapq.heappop(self.io_queue)
+            self.end_io(k, t_io)
+            self.process_table[k].status = 0 # ready to use the CPU
+            self.process_table[k].num_burst -= 1
+            if self.process_table[k].num_burst > 0:
+                self.sink.event(self.clock, 'io_done', k, self.process_queue)
+                self.process_queue.append(k)
+            else:
+                del self.process_table[k] # delete the completed process
+                self.sink.event(self.clock, 'terminate', k, self.process_queue)
+
+    def advance_clock(self, deadline=None):
+        """
+        jump the virtual clock straight to the next event (an I/O completion)
+        or to the deadline, whichever comes first
+        """
+        t_next = deadline
+        if self.io_queue and (t_next is None or self.io_queue[0][0] < t_next):
+            t_next = self.io_queue[0][0]
+        if t_next is None:
+            raise RuntimeError("time %sms: no pending event"%self.clock)
+        if t_next > self.clock:
+            self.clock = t_next
 
 if __name__ == '__main__':
     import sys
     bos = BaseOS()
     bos.load_process(sys.argv[1])
+    if len(sys.argv) > 2:
+        bos.sink = make_sink(sys.argv[2], bos.event_formats) # text, jsonl:<file> or none
     # bos.load_process('processes.txt')
     bos.run()
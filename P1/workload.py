@@ -0,0 +1,211 @@
+#!/usr/bin/python
+
+"""
+synthetic workloads
+
+Workload draws every field of the processes from its own distribution with
+a fixed seed and generates them in chunks, so that millions of processes
+neither take long (numpy sampling when installed, one call per chunk and
+field) nor need to fit in memory; the same seed and chunk size give the same
+workload (numpy and the random module draw different ones)
+
+distributions, "<name>:<params>":
+    const:v             always v
+    uniform:lo:hi       integers lo..hi
+    exp:mean            exponential
+    pareto:alpha:xm     Pareto with shape alpha and minimum xm (heavy tail)
+    bimodal:p:m1:m2     exponential of mean m1 with probability p, m2 otherwise
+
+the values are rounded and clipped to the bounds of their field, the
+arrival times are the running sum of the interarrival times
+
+    python workload.py -n 1000000 --format P3 --burst pareto:1.5:50 -o big.txt
+"""
+
+import sys
+import random
+import argparse
+from collections import OrderedDict
+from pcb import PCB
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# field: (default distribution, min, max)
+FIELDS = OrderedDict([
+    ('interarrival', ('exp:100', 0, None)),
+    ('burst', ('exp:200', 1, None)),
+    ('num_burst', ('uniform:1:5', 1, None)),
+    ('io', ('exp:500', 0, None)),
+    ('priority', ('uniform:0:4', 0, None)),
+    ('memory', ('pareto:2:8', 1, 256)),
+])
+
+# <proc-num>|... line of each simulator
+FORMATS = {
+    'P1': ('burst', 'num_burst', 'io'),
+    'P2': ('burst', 'num_burst', 'io', 'priority'),
+    'P3': ('arrival', 'burst', 'num_burst', 'io', 'memory'),
+}
+COLUMN_NAMES = {'arrival': 'arrival-time', 'burst': 'burst-time', 'num_burst': 'num-burst', 'io': 'io-time',
+                'priority': 'priority', 'memory': 'memory'}
+
+def parse_dist(spec):
+    fields = spec.split(':')
+    name, params = fields[0], [float(x) for x in fields[1:]]
+    arity = {'const': 1, 'uniform': 2, 'exp': 1, 'pareto': 2, 'bimodal': 3}
+    if name not in arity or len(params) != arity[name]:
+        raise ValueError('invalid distribution arg: %s'%spec)
+    return name, params
+
+class Sampler(object):
+    """
+    one field: sample(n) returns the next n values, as a list or a numpy array
+    """
+    def __init__(self, spec, seed, lo=None, hi=None):
+        super(Sampler, self).__init__()
+        self.name, self.params = parse_dist(spec)
+        self.lo = lo
+        self.hi = hi
+        if numpy is not None:
+            self.random = numpy.random.RandomState(seed)
+        else:
+            self.random = random.Random(seed)
+
+    def sample(self, n):
+        if numpy is not None:
+            values = self.sample_numpy(n)
+            if self.lo is not None or self.hi is not None:
+                values = numpy.clip(values, self.lo, self.hi)
+            return values
+        values = self.sample_python(n)
+        if self.lo is not None:
+            values = [max(x, self.lo) for x in values]
+        if self.hi is not None:
+            values = [min(x, self.hi) for x in values]
+        return values
+
+    def sample_numpy(self, n):
+        rs = self.random
+        p = self.params
+        if self.name == 'const':
+            return numpy.full(n, int(p[0]), dtype=numpy.int64)
+        if self.name == 'uniform':
+            return rs.randint(int(p[0]), int(p[1]) + 1, size=n).astype(numpy.int64)
+        if self.name == 'exp':
+            values = rs.exponential(p[0], size=n)
+        elif self.name == 'pareto':
+            values = (rs.pareto(p[0], size=n) + 1) * p[1]
+        else: # bimodal
+            values = numpy.where(rs.random_sample(n) < p[0], rs.exponential(p[1], size=n), rs.exponential(p[2], size=n))
+        return numpy.rint(values).astype(numpy.int64)
+
+    def sample_python(self, n):
+        r = self.random
+        p = self.params
+        if self.name == 'const':
+            return [int(p[0])] * n
+        if self.name == 'uniform':
+            lo, hi = int(p[0]), int(p[1])
+            return [r.randint(lo, hi) for i in xrange(n)]
+        if self.name == 'exp':
+            rate = 1.0 / p[0]
+            return [int(round(r.expovariate(rate))) for i in xrange(n)]
+        if self.name == 'pareto':
+            alpha, xm = p
+            return [int(round(r.paretovariate(alpha) * xm)) for i in xrange(n)]
+        rate1, rate2 = 1.0 / p[1], 1.0 / p[2]
+        return [int(round(r.expovariate(rate1 if r.random() < p[0] else rate2))) for i in xrange(n)]
+
+
+class Workload(object):
+    """
+    n processes numbered from 1, dists is {field: distribution} over the
+    defaults of FIELDS, bounds is {field: (min, max)}
+    """
+    def __init__(self, n, seed=0, dists=None, bounds=None, chunk_size=65536):
+        super(Workload, self).__init__()
+        self.n = n
+        self.seed = seed
+        self.dists = dict((name, spec) for name, (spec, lo, hi) in FIELDS.iteritems())
+        self.dists.update(dists or {})
+        self.bounds = dict((name, (lo, hi)) for name, (spec, lo, hi) in FIELDS.iteritems())
+        self.bounds.update(bounds or {})
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        """
+        yield {field: values} of chunk_size processes at a time, 'proc_num'
+        and 'arrival' included
+        """
+        samplers = OrderedDict((name, Sampler(self.dists[name], self.seed * len(FIELDS) + i, *self.bounds[name]))
+                               for i, name in enumerate(FIELDS))
+        t = 0
+        for first in xrange(0, self.n, self.chunk_size):
+            size = min(self.chunk_size, self.n - first)
+            chunk = dict((name, sampler.sample(size)) for name, sampler in samplers.iteritems())
+            # each process arrives interarrival ms before the next one, the first at 0
+            dt = chunk['interarrival']
+            if numpy is not None:
+                chunk['proc_num'] = numpy.arange(first + 1, first + size + 1)
+                chunk['arrival'] = t + numpy.cumsum(dt) - dt
+                t = int(chunk['arrival'][-1] + dt[-1])
+            else:
+                chunk['proc_num'] = range(first + 1, first + size + 1)
+                arrival = []
+                for each_dt in dt:
+                    arrival.append(t)
+                    t += each_dt
+                chunk['arrival'] = arrival
+            yield chunk
+
+    def iter_lines(self, fmt):
+        columns = ('proc_num',) + FORMATS[fmt]
+        for chunk in self.iter_chunks():
+            values = [chunk[name].tolist() if numpy is not None else chunk[name] for name in columns]
+            yield '\n'.join('|'.join(map(str, row)) for row in zip(*values)) + '\n'
+
+    def write(self, out, fmt='P3'):
+        out.write('# synthetic workload: %s processes, seed %s\n'%(self.n, self.seed))
+        out.write('# %s\n'%', '.join('%s=%s'%(name, self.dists[name]) for name in FIELDS))
+        out.write('#\n# <proc-num>|<%s>\n'%'>|<'.join(COLUMN_NAMES[name] for name in FORMATS[fmt]))
+        for lines in self.iter_lines(fmt):
+            out.write(lines)
+
+    def records(self, fmt='P3'):
+        """
+        yield the (proc-num, PCB) of the processes in arrival order, as the
+        loader of the simulator would read them from a file (e.g. the source of P3 run_proc)
+        """
+        for chunk in self.iter_chunks():
+            columns = [chunk[name].tolist() if numpy is not None else chunk[name]
+                       for name in ('proc_num', 'arrival', 'burst', 'num_burst', 'io', 'priority', 'memory')]
+            for proc_num, arrival, burst, num_burst, io, priority, memory in zip(*columns):
+                if fmt == 'P3':
+                    proc_num = str(proc_num)
+                    yield proc_num, PCB(proc_num, burst, num_burst, io, 0, arrival, memory, 3)
+                elif fmt == 'P2':
+                    yield proc_num, PCB(proc_num, burst, num_burst, io, priority)
+                else:
+                    yield proc_num, PCB(proc_num, burst, num_burst, io)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='generate a synthetic process file')
+    parser.add_argument('-n', type=int, default=1000, help='number of processes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', default='P3', choices=sorted(FORMATS))
+    for name in FIELDS:
+        parser.add_argument('--%s'%name.replace('_', '-'), dest=name, default=None,
+                            help='distribution, %s by default'%FIELDS[name][0])
+    parser.add_argument('--max-memory', type=int, default=256, help='memory units of the largest process')
+    parser.add_argument('-o', '--output', default=None, help='output file, stdout by default')
+    args = parser.parse_args()
+    dists = dict((name, getattr(args, name)) for name in FIELDS if getattr(args, name))
+    workload = Workload(args.n, args.seed, dists, {'memory': (1, args.max_memory)})
+    if args.output:
+        with open(args.output, 'w') as f:
+            workload.write(f, args.format)
+    else:
+        workload.write(sys.stdout, args.format)
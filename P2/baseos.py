@@ -1,381 +1,280 @@
 #!/usr/bin/python
 
-import time
-from copy import deepcopy
-from collections import deque, OrderedDict
+import heapq
+from collections import OrderedDict
 from indexed_priority_queue import IndexMinPQ
-from indexed_pq import IndexedPQ
+from indexed_pq import IndexedPQ, SortedIndexedPQ
+from pcb import PCB, ProcessArrays, burst_totals
+from events import TextSink, make_sink
+from devices import IOSystem
+from policies import FCFS, SRT, RR, PWA
 
 class BaseOS(object):
     """docstring for BaseOS"""
+    # log line of each event, see events.py
+    event_formats = {
+        'start': "time %(t)sms: Simulator started for %(algo)s [Q %(q)s",
+        'end': "time %(t)sms: Simulator for %(algo)s ended",
+        'dispatch': "time %(t)sms: P%(proc)s started using the CPU [Q %(q)s",
+        'burst_done': "time %(t)sms: P%(proc)s completed its CPU burst [Q %(q)s",
+        'io_start': "time %(t)sms: P%(proc)s performing I/O [Q %(q)s",
+        'io_done': "time %(t)sms: P%(proc)s completed I/O [Q %(q)s",
+        'preempt': "time %(t)sms: P%(proc)s preempted by P%(by)s [Q %(q)s",
+        'slice_expired': "time %(t)sms: P%(proc)s preempted due to time slice expiration [Q %(q)s",
+        'terminate': "time %(t)sms: P%(proc)s terminated [Q %(q)s",
+    }
+
     def __init__(self):
         super(BaseOS, self).__init__()
         self.process_table = OrderedDict() # process table
         self.t_cs = 13 # context switch cost
+        self.t_slice = 80 # time slice of RR
+        self.clock = 0 # virtual clock (ms), driven by events instead of the wall clock
+        self.io_queue = [] # min-heap of (I/O completion time, proc-num) of the blocked processes
+        self.io_devices = None # I/O devices "<name>:<channels>:<FIFO|ELEVATOR>[:<seek-time>],...", see devices.py, None for unlimited I/O
+        self.io_system = None # IOSystem of the run
+        self.policy = None # scheduling policy of the run, see policies.py
+        self.sink = TextSink(self.event_formats) # where the events go, EventSink() to drop them
+        self.pq_class = IndexedPQ # ready queue of SRT and PWA, IndexMinPQ and SortedIndexedPQ share its API
         self.avg_wait_time = 0.0
         self.avg_turnaround_time = 0.0
         self.switch_count = 0
         self.burst_count = 0
 
-    def load_process(self, filename):
+    def load_process(self, filename, compact=False):
+        """
+        compact: keep the process table as ProcessArrays (one column per field)
+        instead of one PCB per process, for big workloads
+        """
+        if compact and not isinstance(self.process_table, ProcessArrays):
+            self.process_table = ProcessArrays(self.process_table.itervalues())
         try:
             with open(filename, 'r') as f:
                 for each_line in f:
                     if each_line == '' or each_line[0] == '#':
                         continue
                     conf = each_line.rstrip('\n').split('|') # <proc-num>|<burst-time>|<num-burst>|<io-time>
-                    # process table {'proc-num':['burst-time', 'num-burst', 'io-time', 'status', 'eachstage-start-time']}
-                    self.process_table[int(conf[0])] = dict(zip(['burst_time', 'num_burst', 'io_time', 'priority', 'status', 'start_time', 'next_burst_time'], [int(x) for x in conf[1:]] + [0, 0, int(conf[1])]))
+                    # process table {proc-num: PCB(burst-time, num-burst, io-time, priority)}
+                    burst_time, num_burst, io_time, priority = [int(x) for x in conf[1:]]
+                    self.process_table[int(conf[0])] = PCB(int(conf[0]), burst_time, num_burst, io_time, priority)
         except Exception, e:
             print e
             assert False
         f.close()
 
     def run_proc(self, algo):
-        # copy process table
-        process_table = deepcopy(self.process_table) # copy both th parent and child object
+        # copy process table, the PCBs of the run are changed in place
+        process_table = OrderedDict((k, v.copy()) for k, v in self.process_table.iteritems())
+        self.io_system = IOSystem.parse(self.io_devices) if self.io_devices else None
+        self.policy = self.make_policy(algo)
+        self.run_policy(algo, process_table)
+
+    def make_policy(self, algo):
         if algo == 'FCFS':
-            self.run_proc_fcfs(process_table)
+            return FCFS()
         elif algo == 'SRT':
-            self.run_proc_srt(process_table)
+            return SRT(self.pq_class)
+        elif algo == 'RR':
+            return RR(self.t_slice)
         elif algo == 'PWA':
-            self.run_proc_pwa(process_table)
-        else:
-            raise ValueError('invalid arg: %s'%algo)
+            return PWA(self.pq_class)
+        raise ValueError('invalid arg: %s'%algo)
 
-    def run_proc_fcfs(self, process_table): # handle process queue
-        # stats
-        self.switch_count = 0
-        avg_burst_time = 0.0
-        self.avg_wait_time = 0.0
-        # add the process queue
-        process_queue = deque();
-        for proc_num in process_table.keys():
-            process_queue.append(proc_num)
-        # All "ties" are to be broken using process number order
-        process_table = OrderedDict(sorted(process_table.iteritems(), key=lambda d:d[0]))
-
-        print "time 0ms: Simulator started for FCFS [Q " + ("%s"%list(process_queue))[1:]
-        self.t0 = time.time()
-        while len(process_table):
-            if len(process_queue) == 0: # the CPU is idle
-                self.poll_io_fcfs(process_table, process_queue)
-            else:
-                # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
-                # poll io performance
-                current_process = process_queue.popleft()
-                self.avg_wait_time += (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-                t1 = time.time()
-                while int(1000*(time.time() - t1)) < self.t_cs:
-                    self.poll_io_fcfs(process_table, process_queue)
-                self.switch_count += 1
-                # switch to the next process
-                process_table[current_process]['status'] = 1 # actively using the CPU
-                process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                t = time.time()
-                print "time %sms: P%s started using the CPU [Q "%(int(1000*(t-self.t0)), current_process) + ("%s"%list(process_queue))[1:]
-                while int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'] < process_table[current_process]['burst_time']:
-                    self.poll_io_fcfs(process_table, process_queue) # poll io performance
-                # handle CPU
-                if process_table[current_process]['num_burst'] == 1: # it is the last CPU burst
-                    del process_table[current_process] # delete the completed process
-                    print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue))[1:]
-                else:
-                    if process_table[current_process]['io_time'] > 0:
-                        print "time %sms: P%s completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue))[1:]
-                        print "time %sms: P%s performing I/O [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue))[1:]
-                        process_table[current_process]['status'] = 2 # blocked on (or performing) I/O
-                        process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                    else:
-                        process_table[current_process]['status'] = 0 # ready to use the CPU
-                        process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                        process_table[current_process]['num_burst'] -= 1
-                        print "time %sms: P%s completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue))[1:]
-                        process_queue.append(current_process)
-        print "time %sms: Simulator for FCFS ended"%(int(1000*(time.time()-self.t0)))
-        # stat
-        burst_num = 0
-        for val in self.process_table.values():
-            avg_burst_time += (val['burst_time']*val['num_burst'])
-            burst_num += val['num_burst']
-        avg_burst_time /= burst_num
-        self.avg_wait_time /= burst_num
-        print "Algorithm FCFS"
-        print "-- average CPU burst time: %.2f ms"%avg_burst_time
-        print "-- average wait time: %.2f ms"%self.avg_wait_time
-        print "-- average turnaround time: %.2f ms"%(self.avg_wait_time + avg_burst_time + self.t_cs)
-        print "-- total number of context switches: %s"%self.switch_count
-
-    def run_proc_srt(self, process_table):
+    def run_policy(self, algo, process_table):
+        """
+        the simulation kernel: run the process table with self.policy up to
+        the end and print the statistics of the run
+        """
         self.avg_wait_time = 0.0
+        self.avg_turnaround_time = 0.0
         self.switch_count = 0
-        avg_burst_time = 0.0
         # add the process queue
-        process_queue = IndexMinPQ();
-        for proc_num, values in process_table.iteritems():
-            process_queue.insert(proc_num, values['burst_time']) # insert proc_num: cpu burst time
+        process_queue = self.policy.new_queue()
+        for values in process_table.itervalues():
+            self.policy.on_ready(process_queue, values)
         # All "ties" are to be broken using process number order
         process_table = OrderedDict(sorted(process_table.iteritems(), key=lambda d:d[0]))
 
-        print "time 0ms: Simulator started for SRT [Q " + ("%s"%list(process_queue.keys()))[1:]
-        self.t0 = time.time()
-        while len(process_table):
-            self.proc_srt_loop(process_table, process_queue)
-        print "time %sms: Simulator for SRT ended"%(int(1000*(time.time()-self.t0)))
-        # stat
-        burst_num = 0
-        for val in self.process_table.values():
-            avg_burst_time += (val['burst_time']*val['num_burst'])
-            burst_num += val['num_burst']
-        self.avg_turnaround_time = (self.avg_wait_time + self.t_cs*self.switch_count + avg_burst_time)/burst_num
-        avg_burst_time /= burst_num
-        self.avg_wait_time /= burst_num
-        print "Algorithm SRT"
-        print "-- average CPU burst time: %.2f ms"%avg_burst_time
-        print "-- average wait time: %.2f ms"%self.avg_wait_time
-        print "-- average turnaround time: %.2f ms"%self.avg_turnaround_time
-        print "-- total number of context switches: %s"%self.switch_count
-
-    def run_proc_pwa(self, process_table): # handle process queue
-        self.avg_wait_time = 0.0
-        self.switch_count = 0
-        avg_burst_time = 0.0
-        self.avg_turnaround_time = 0.0
-        self.starvation_count = dict(zip(process_table.keys(), [0 for x in process_table.keys()]))
-        # add the process queue
-        process_queue = IndexedPQ();
-        for proc_num, values in process_table.iteritems():
-            process_queue.insert(proc_num, values['priority'])
-        # All "ties" are to be broken using process number order
-        process_table = OrderedDict(sorted(process_table.iteritems(), key=lambda d:d[0]))
-        print "time 0ms: Simulator started for PWA [Q " + ("%s"%list(process_queue.keys()))[1:]
-        self.t0 = time.time()
-        while len(process_table):
-            self.proc_pwa_loop(process_table, process_queue)
-        print "time %sms: Simulator for PWA ended"%(int(1000*(time.time()-self.t0)))
+        self.sink.event(0, 'start', None, process_queue, algo=algo)
+        self.clock = 0
+        self.io_queue = []
+        try:
+            while len(process_table):
+                self.proc_loop(process_table, process_queue)
+            self.sink.event(self.clock, 'end', algo=algo)
+        finally:
+            self.sink.flush() # also the lines logged before an error
         # stat
-        burst_num = 0
-        for val in self.process_table.values():
-            avg_burst_time += (val['burst_time']*val['num_burst'])
-            burst_num += val['num_burst']
-        for k, v in self.starvation_count.items():
-            self.avg_wait_time += (v*(3*self.process_table[k]['burst_time']+1))
+        total_burst_time, burst_num = burst_totals(self.process_table)
+        avg_burst_time = float(total_burst_time)
+        self.avg_wait_time += self.policy.aged_wait_time(self.process_table)
         self.avg_turnaround_time = (self.avg_wait_time + self.t_cs*self.switch_count + avg_burst_time)/burst_num
         avg_burst_time /= burst_num
         self.avg_wait_time /= burst_num
-        print "Algorithm PWA"
+        print "Algorithm %s"%algo
         print "-- average CPU burst time: %.2f ms"%avg_burst_time
         print "-- average wait time: %.2f ms"%self.avg_wait_time
         print "-- average turnaround time: %.2f ms"%self.avg_turnaround_time
         print "-- total number of context switches: %s"%self.switch_count
+        self.print_io_stats()
 
-    def proc_srt_loop(self, process_table, process_queue, current_process=None):
-        if process_queue.isEmpty(): # the CPU is idle
-            self.poll_io_srt(process_table, process_queue) # preemption makes no sense in this case
-        else:
-            # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
-            # poll io performance
-            if not current_process:
-                current_process = process_queue.delMin()
-                self.avg_wait_time += (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-            t1 = time.time()
-            while int(1000*(time.time() - t1)) < self.t_cs:
-                self.poll_io_srt(process_table, process_queue) # preemption makes no sense in this case ???
-            self.switch_count += 1
+    def proc_loop(self, process_table, process_queue, current_process=None):
+        """
+        one scheduling point: dispatch the next process of the policy (or
+        current_process, which has just preempted the running one) and run it
+        until its burst ends, its time slice expires or it is preempted
+        """
+        policy = self.policy
+        if current_process is None and process_queue.isEmpty(): # the CPU is idle
+            self.poll_io(process_table, process_queue) # preemption makes no sense in this case
+            if process_queue.isEmpty() and len(process_table):
+                self.advance_clock(process_table) # jump to the next I/O completion
+            return
 
-            # switch to the next process
-            process_table[current_process]['status'] = 1 # actively using the CPU
-            process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-            print "time %sms: P%s started using the CPU [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
+        # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
+        if current_process is None:
+            current_process = policy.pick_next(process_queue)
+            self.avg_wait_time += (self.clock - process_table[current_process].start_time)
+        t1 = self.clock
+        while self.clock - t1 < self.t_cs:
+            self.poll_io(process_table, process_queue) # nothing to preempt during the context switch
+            self.advance_clock(process_table, t1 + self.t_cs)
+        self.switch_count += 1
 
-            while int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'] < process_table[current_process]['next_burst_time']:
-                ret_val = self.poll_io_srt(process_table, process_queue, current_process) # poll io performance, preemption may occur
-                if not ret_val == -1: # a preemption has occurred
-                    # context switch
-                    # poll io performance
-                    self.proc_srt_loop(process_table, process_queue, ret_val)
-                    return
-            # handle CPU
-            if process_table[current_process]['num_burst'] == 1: # it is the last CPU burst
-                del process_table[current_process] # delete the completed process
-                print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
-            else:
-                print "time %sms: P%s completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
-                process_table[current_process]['next_burst_time'] = process_table[current_process]['burst_time']
-                if process_table[current_process]['io_time'] > 0:
-                    print "time %sms: P%s performing I/O [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
-                    process_table[current_process]['status'] = 2 # blocked on (or performing) I/O
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                else:
-                    process_table[current_process]['status'] = 0 # ready to use the CPU
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[current_process]['num_burst'] -= 1
-                    process_queue.insert(current_process, process_table[current_process]['next_burst_time'])
+        # switch to the next process
+        pcb = process_table[current_process]
+        pcb.status = 1 # actively using the CPU
+        pcb.start_time = self.clock
+        self.sink.event(self.clock, 'dispatch', current_process, process_queue)
+        t_slice = policy.time_slice(process_queue, pcb)
+        burst_end = pcb.start_time + pcb.next_burst_time
+        slice_end = burst_end
+        if t_slice is not None:
+            slice_end = pcb.start_time + t_slice + 1 # the slice expires once it is exceeded
+        while self.clock < burst_end:
+            if t_slice is not None and not process_queue.isEmpty() and self.clock - pcb.start_time > t_slice:
+                # at least one process in the ready queue and slice time out, preemption occurs
+                policy.on_slice(process_queue, pcb)
+                self.requeue(pcb, process_queue) # run the remaining time next round
+                self.sink.event(self.clock, 'slice_expired', current_process, process_queue)
+                return
+            preempting = self.poll_io(process_table, process_queue, pcb) # poll io performance, preemption may occur
+            if preempting is not None: # a preemption has occurred, context switch to the preempting process
+                self.proc_loop(process_table, process_queue, preempting)
+                return
+            if self.clock < slice_end:
+                self.advance_clock(process_table, min(slice_end, burst_end))
+            elif process_queue.isEmpty(): # otherwise the expired slice is handled right away
+                self.advance_clock(process_table, burst_end)
 
-    def proc_pwa_loop(self, process_table, process_queue, current_process=None):
-        if process_queue.isEmpty(): # the CPU is idle
-            self.poll_io_pwa(process_table, process_queue, current_process) # preemption makes no sense in this case
+        # handle CPU
+        if pcb.num_burst == 1: # it is the last CPU burst
+            del process_table[current_process] # delete the completed process
+            self.sink.event(self.clock, 'terminate', current_process, process_queue)
         else:
-            # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
-            # poll io performance
-            if not current_process:
-                current_process = process_queue.delMin()
-                # stat
-                self.avg_wait_time += (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-            t1 = time.time()
-            while int(1000*(time.time() - t1)) < self.t_cs:
-                self.poll_io_pwa(process_table, process_queue, current_process) # preemption makes no sense in this case ???
-            # switch to the next process
-            print "time %sms: P%s started using the CPU [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
-            self.switch_count += 1
-            process_table[current_process]['status'] = 1 # actively using the CPU
-            process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-            while int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'] < process_table[current_process]['next_burst_time']:
-                ret_proc = self.poll_io_pwa(process_table, process_queue, current_process) # poll io performance, preemption may occur
-                if not ret_proc == -1: # a preemption has occurred
-                    # context switch
-                    # poll io performance
-                    self.proc_pwa_loop(process_table, process_queue, ret_proc)
-                    return
-            # handle CPU
-            if process_table[current_process]['num_burst'] == 1: # it is the last CPU burst
-                del process_table[current_process] # delete the completed process
-                print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
+            self.sink.event(self.clock, 'burst_done', current_process, process_queue)
+            pcb.next_burst_time = pcb.burst_time
+            if pcb.io_time > 0:
+                self.sink.event(self.clock, 'io_start', current_process, process_queue)
+                pcb.status = 2 # blocked on (or performing) I/O
+                pcb.start_time = self.clock
+                self.start_io(current_process, pcb.io_time)
             else:
-                print "time %sms: P%s completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
-                process_table[current_process]['next_burst_time'] = process_table[current_process]['burst_time']
-                if process_table[current_process]['io_time'] > 0:
-                    print "time %sms: P%s performing I/O [Q "%(int(1000*(time.time()-self.t0)), current_process) + ("%s"%list(process_queue.keys()))[1:]
-                    process_table[current_process]['status'] = 2 # blocked on (or performing) I/O
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                else:
-                    process_table[current_process]['status'] = 0 # ready to use the CPU
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[current_process]['num_burst'] -= 1
-                    process_queue.insert(current_process, process_table[current_process]['priority'])
+                pcb.status = 0 # ready to use the CPU
+                pcb.start_time = self.clock
+                pcb.num_burst -= 1
+                policy.on_ready(process_queue, pcb)
+
+    def requeue(self, pcb, process_queue):
+        # the running process goes back to the ready queue with the rest of its burst
+        pcb.next_burst_time -= self.clock - pcb.start_time
+        pcb.status = 0 # ready to use the CPU
+        pcb.start_time = self.clock
+        self.policy.on_ready(process_queue, pcb)
 
-    def poll_io_fcfs(self, process_table, process_queue):
-        # check IO performance (two processes complete io at the same time?)
-        for k, v in process_table.items():
-            if v['status'] == 2: #blocked on (or performing) I/O
-                if int(1000*(time.time()-self.t0)) - v['start_time'] >= v['io_time']:
-                    process_table[k]['status'] = 0 # ready to use the CPU
-                    process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[k]['num_burst'] -= 1
-                    if process_table[k]['num_burst'] > 0:
-                        print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue))[1:]
-                        process_queue.append(k)
-                    else:
-                        del process_table[k] # delete the completed process
-                        print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue))[1:]
+    def start_io(self, proc_num, io_time):
+        # the process blocks on I/O now, it completes after io_time unless it has to queue for a device
+        if self.io_system is None:
+            heapq.heappush(self.io_queue, (self.clock + io_time, proc_num))
+            return
+        for entry in self.io_system.start(self.clock, proc_num, io_time):
+            heapq.heappush(self.io_queue, entry)
 
-    def poll_io_srt(self, process_table, process_queue, current_process=None):
-        # check IO performance (two processes complete io at the same time?)
-        preemption_flag = False # preemption ties are broken using process number order
-                                # preemption occurs at most once in an io poll
-        preemption_process = -1
-        for k, v in process_table.items():
-            if v['status'] == 2: #blocked on (or performing) I/O
-                if int(1000*(time.time()-self.t0)) - v['start_time'] >= v['io_time']:
-                    process_table[k]['num_burst'] -= 1
-                    if process_table[k]['num_burst'] > 0:
-                        # preemptive
-                        if not current_process or preemption_flag:
-                            process_table[k]['status'] = 0 # ready to use the CPU
-                            process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                            process_queue.insert(k, process_table[k]['next_burst_time'])
-                            print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-                        else:
-                            current_proc_remaining_time = process_table[current_process]['next_burst_time'] - \
-                                    (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-                            if process_table[k]['next_burst_time'] < current_proc_remaining_time:
-                                # a preemption occurs
-                                print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-                                process_table[current_process]['status'] = 0 # ready to use the CPU
-                                process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                                process_table[current_process]['next_burst_time'] = current_proc_remaining_time
-                                process_queue.insert(current_process, current_proc_remaining_time) # run the remaining time next round
-                                process_table[k]['status'] = 3 # to avoid being polled io again
-                                preemption_flag = True
-                                preemption_process = k
-                                print "time %sms: P%s preempted by P%s [Q "%(int(1000*(time.time()-self.t0)), current_process, k) + ("%s"%list(process_queue.keys()))[1:]
-                            else:
-                                process_table[k]['status'] = 0 # ready to use the CPU
-                                process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                                process_queue.insert(k, process_table[k]['next_burst_time'])
-                                print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-                    else:
-                        del process_table[k] # delete the completed process
-                        print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-        return preemption_process
+    def end_io(self, proc_num, t_io):
+        # the I/O of the process completed at t_io, its device channel serves the next request
+        if self.io_system is not None:
+            for entry in self.io_system.complete(t_io, proc_num):
+                heapq.heappush(self.io_queue, entry)
+
+    def print_io_stats(self):
+        if self.io_system is not None:
+            for line in self.io_system.report(self.clock):
+                print line
+
+    def poll_io(self, process_table, process_queue, running=None):
+        """
+        make the processes done with their I/O ready again, ties are broken
+        using process number order, then those the policy promoted by now;
+        return the first one the policy lets preempt the running process (its
+        PCB if any), None if none does
+        """
+        policy = self.policy
+        preempting = None # preemption occurs at most once in an io poll
+        while self.io_queue and self.io_queue[0][0] <= self.clock:
+            t_io, k = heapq.heappop(self.io_queue)
+            self.end_io(k, t_io)
+            pcb = process_table[k]
+            pcb.num_burst -= 1
+            if pcb.num_burst <= 0:
+                del process_table[k] # delete the completed process
+                self.sink.event(self.clock, 'terminate', k, process_queue)
+            elif running is not None and preempting is None and \
+                    policy.should_preempt(pcb, running, running.next_burst_time - (self.clock - running.start_time)):
+                # a preemption occurs
+                self.sink.event(self.clock, 'io_done', k, process_queue)
+                self.requeue(running, process_queue)
+                pcb.status = 3 # dispatched right away, not queued
+                preempting = k
+                self.sink.event(self.clock, 'preempt', running.proc_num, process_queue, by=k)
+            else:
+                pcb.status = 0 # ready to use the CPU
+                pcb.start_time = self.clock
+                if policy.io_done_queued:
+                    policy.on_ready(process_queue, pcb)
+                    self.sink.event(self.clock, 'io_done', k, process_queue)
+                else:
+                    self.sink.event(self.clock, 'io_done', k, process_queue)
+                    policy.on_ready(process_queue, pcb)
+        for k in policy.on_tick(process_queue, process_table, self.clock):
+            pcb = process_table[k]
+            if running is not None and preempting is None and policy.should_preempt(pcb, running, 0):
+                # preemption occurs
+                self.requeue(running, process_queue)
+                process_queue.delete(k)
+                pcb.status = 3 # dispatched right away, not queued
+                preempting = k
+                self.sink.event(self.clock, 'preempt', running.proc_num, process_queue, by=k)
+            else:
+                pcb.start_time = self.clock # reset the start time for status 0
+                policy.on_ready(process_queue, pcb)
+        return preempting
 
-    def poll_io_pwa(self, process_table, process_queue, current_process):
-        multiplier = 3
-        preemption_flag = False # preemption ties are broken using process number order
-                                # preemption occurs at most once in an io poll
-        preemption_process = -1
-        # check IO performance (two processes complete io at the same time?)
-        for k, v in process_table.items():
-            if v['status'] == 2: # blocked on (or performing) I/O
-                if int(1000*(time.time()-self.t0)) - v['start_time'] >= v['io_time']:
-                    process_table[k]['num_burst'] -= 1
-                    if process_table[k]['num_burst'] > 0:
-                        # preemptive
-                        if not current_process or preemption_flag:
-                            process_table[k]['status'] = 0 # ready to use the CPU
-                            process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                            process_queue.insert(k, process_table[k]['priority'])
-                            print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-                        else:
-                            if process_table[k]['priority'] < process_table[current_process]['priority']:
-                                # a preemption occurs
-                                print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-                                current_proc_remaining_time = process_table[current_process]['next_burst_time'] - \
-                                    (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-                                process_table[current_process]['next_burst_time'] = current_proc_remaining_time
-                                process_table[current_process]['status'] = 0 # ready to use the CPU
-                                process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                                process_queue.insert(current_process, process_table[current_process]['priority'])
-                                process_table[k]['status'] = 3 # to avoid being polled io again
-                                preemption_flag = True
-                                preemption_process = k
-                                print "time %sms: P%s preempted by P%s [Q "%(int(1000*(time.time()-self.t0)), current_process, k) + ("%s"%list(process_queue.keys()))[1:]
-                            else:
-                                process_table[k]['status'] = 0 # ready to use the CPU
-                                process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                                process_queue.insert(k, process_table[k]['priority'])
-                                print "time %sms: P%s completed I/O [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-                    else:
-                        del process_table[k] # delete the completed process
-                        print "time %sms: P%s terminated [Q "%(int(1000*(time.time()-self.t0)), k) + ("%s"%list(process_queue.keys()))[1:]
-            if v['status'] == 0:
-                if int(1000*(time.time()-self.t0)) - v['start_time'] > multiplier*v['burst_time']:
-                    process_table[k]['priority'] -= 1;
-                    if process_table[k]['priority'] < 0:
-                        process_table[k]['priority'] = 0
-                    self.starvation_count[k] += 1
-                    # preemptive
-                    if not current_process or preemption_flag:
-                        process_queue.change(k, process_table[k]['priority'])
-                        process_table[k]['start_time'] = int(1000*(time.time()-self.t0)) # reset the start time for status 0
-                    else:
-                        if process_table[k]['priority'] < process_table[current_process]['priority']:
-                            # preemption occurs
-                            current_proc_remaining_time = process_table[current_process]['next_burst_time'] - \
-                                    (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-                            process_table[current_process]['next_burst_time'] = current_proc_remaining_time
-                            process_table[current_process]['status'] = 0 # ready to use the CPU
-                            process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                            process_queue.insert(current_process, process_table[current_process]['priority'])
-                            process_queue.delete(k)
-                            process_table[k]['status'] = 3 # to avoid being polled io again
-                            preemption_flag = True
-                            preemption_process = k
-                            print "time %sms: P%s preempted by P%s [Q "%(int(1000*(time.time()-self.t0)), current_process, k) + ("%s"%list(process_queue.keys()))[1:]
-                        else:
-                            process_queue.change(k, process_table[k]['priority'])
-                            process_table[k]['start_time'] = int(1000*(time.time()-self.t0)) # reset the start time for status 0
-        return preemption_process
+    def advance_clock(self, process_table, deadline=None):
+        """
+        jump the virtual clock straight to the next event (an I/O completion
+        or a promotion of the policy, e.g. a ready process starving long
+        enough to be aged) or to the deadline, whichever comes first
+        """
+        t_next = deadline
+        if self.io_queue and (t_next is None or self.io_queue[0][0] < t_next):
+            t_next = self.io_queue[0][0]
+        t_policy = self.policy.next_event(process_table)
+        if t_policy is not None and (t_next is None or t_policy < t_next):
+            t_next = t_policy
+        if t_next is None:
+            raise RuntimeError("time %sms: no pending event"%self.clock)
+        if t_next > self.clock:
+            self.clock = t_next
 
 if __name__ == '__main__':
     import sys
@@ -386,6 +285,8 @@ if __name__ == '__main__':
         print "ERROR: please input the filename"
         exit()
     bos.load_process(in_file)
+    if len(sys.argv) > 2:
+        bos.sink = make_sink(sys.argv[2], bos.event_formats) # text, jsonl:<file> or none
     # bos.load_process('processes.txt')
     bos.run_proc('FCFS')
     print '\n'
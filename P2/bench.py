@@ -0,0 +1,118 @@
+#!/usr/bin/python
+
+"""
+benchmark suite: IndexedPQ, SortedIndexedPQ, IndexMinPQ and the scheduler
+loops on fixed-seed workloads of increasing size, see ../benchmark.py
+
+    python bench.py -o before.json
+    python bench.py -o after.json --max-procs 1000000
+    python bench.py --compare before.json after.json
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import argparse
+from collections import OrderedDict
+from baseos import BaseOS
+from events import EventSink
+from indexed_pq import IndexedPQ, SortedIndexedPQ
+from indexed_priority_queue import IndexMinPQ
+from workload import Workload
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)) # ../benchmark.py
+from benchmark import timed, run_benchmarks, save, load, compare
+
+PROC_SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+PQ_CLASSES = {'IndexedPQ': IndexedPQ, 'SortedIndexedPQ': SortedIndexedPQ, 'IndexMinPQ': IndexMinPQ}
+SORTED_MAX_SIZE = 1000 # SortedIndexedPQ re-sorts on every update
+PWA_MAX_SIZE = 1000 # every ready process ages every 3 bursts, the aging work per burst grows with the queue
+
+class CountingSink(EventSink):
+    def __init__(self):
+        super(CountingSink, self).__init__()
+        self.count = 0
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        self.count += 1
+
+
+def bench_pq(size, seed, pq_class='IndexedPQ'):
+    # insert size random keys, change half of them, delMin them all
+    r = random.Random(seed)
+    keys = [r.randint(0, 1 << 20) for i in xrange(size)]
+    changed = [(r.randrange(size), r.randint(0, 1 << 20)) for i in xrange(size / 2)]
+    def op():
+        pq = PQ_CLASSES[pq_class]()
+        for k, key in enumerate(keys):
+            pq.insert(k, key)
+        for k, key in changed:
+            pq.change(k, key)
+        while not pq.isEmpty():
+            pq.delMin()
+    seconds, result = timed(op)
+    return OrderedDict([('ops_per_s', (2 * size + len(changed)) / seconds)])
+
+def bench_loop(size, seed, algo='FCFS', workdir=None):
+    # a whole run on a generated file, the events are counted but not formatted
+    filename = os.path.join(workdir, 'p2_%s_%s.txt'%(size, seed))
+    if not os.path.exists(filename):
+        with open(filename, 'w') as f:
+            Workload(size, seed).write(f, 'P2')
+    bos = BaseOS()
+    bos.load_process(filename)
+    def op():
+        bos.sink = CountingSink()
+        bos.run_proc(algo)
+        return bos.sink.count
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        seconds, events = timed(op)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return OrderedDict([('events_per_s', events / seconds), ('events', events)])
+
+def make_jobs(max_procs, seed, workdir):
+    jobs = []
+    for size in [n for n in PROC_SIZES if n <= max_procs]:
+        for name in sorted(PQ_CLASSES):
+            if name != 'SortedIndexedPQ' or size <= SORTED_MAX_SIZE:
+                jobs.append(('pq/%s'%name, bench_pq, size, seed, {'pq_class': name}))
+    for size in [n for n in PROC_SIZES if n <= max_procs]:
+        for algo in ('FCFS', 'SRT', 'PWA'):
+            if algo == 'PWA' and size > PWA_MAX_SIZE:
+                continue
+            jobs.append(('loop/%s'%algo, bench_loop, size, seed, {'algo': algo, 'workdir': workdir}))
+    return jobs
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='simulator benchmarks')
+    parser.add_argument('--max-procs', type=int, default=10000, help='largest workload, up to %s'%PROC_SIZES[-1])
+    parser.add_argument('--only', nargs='+', help='run the benchmarks whose name contains one of these')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--inline', action='store_true', help='no worker process per benchmark (peak memory is cumulative)')
+    parser.add_argument('-o', '--output', help='results json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='flag the regressions of NEW against OLD')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change flagged by --compare')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load(args.compare[0]), load(args.compare[1]), args.threshold)
+        for name, size, metric, old_value, new_value, change in regressions:
+            print "REGRESSION %s %s %s: %.0f -> %.0f (%+.1f%%)"%(name, size, metric, old_value, new_value, 100 * change)
+        print "%s regressions"%len(regressions)
+        sys.exit(1 if regressions else 0)
+
+    workdir = tempfile.mkdtemp(prefix='bench')
+    try:
+        jobs = make_jobs(args.max_procs, args.seed, workdir)
+        if args.only:
+            jobs = [job for job in jobs if any(x in job[0] for x in args.only)]
+        rows = run_benchmarks(jobs, not args.inline)
+    finally:
+        shutil.rmtree(workdir)
+    if args.output:
+        save(rows, args.output, args.seed)
@@ -0,0 +1,175 @@
+#!/usr/bin/python
+
+"""
+I/O device models
+
+without devices every I/O burst takes exactly io-time ms, as if there were
+as many I/O channels as processes; an IOSystem instead routes each burst to
+an IODevice with a limited number of channels, the bursts that find all of
+them busy wait in the device queue, served in FIFO or elevator order
+
+a device spec is "<name>:<channels>:<FIFO|ELEVATOR>[:<seek-time per track>]",
+several of them separated by commas, e.g. "disk:1:ELEVATOR:1,net:4:FIFO"
+"""
+
+import random
+from bisect import bisect_left, insort
+from collections import deque, OrderedDict
+
+class IODevice(object):
+    """
+    channels: I/O bursts served at the same time
+    discipline: FIFO, or ELEVATOR (the queued request closest to the head in
+                the current direction first, the direction is reversed at the end)
+    seek_time: ms per track the head moves (ELEVATOR), added to the io-time
+    """
+    disciplines = ('FIFO', 'ELEVATOR')
+
+    def __init__(self, name, channels=1, discipline='FIFO', tracks=200, seek_time=0):
+        super(IODevice, self).__init__()
+        if discipline not in self.disciplines:
+            raise ValueError('invalid I/O discipline arg: %s'%discipline)
+        self.name = name
+        self.channels = channels
+        self.discipline = discipline
+        self.tracks = tracks
+        self.seek_time = seek_time
+        self.free_channels = channels
+        self.fifo = deque() # (proc-num, io-time, track, queued since)
+        self.sorted = [] # (track, seq, proc-num, io-time, queued since), ELEVATOR
+        self.seq = 0
+        self.head = 0
+        self.direction = 1
+        # stats
+        self.requests = 0
+        self.busy_time = 0 # channel-ms
+        self.wait_time = 0 # ms spent in the device queue
+        self.max_depth = 0
+        self.depth_time = 0 # integral of the queue depth over time
+        self.t_last = 0
+
+    def depth(self):
+        return len(self.fifo) + len(self.sorted)
+
+    def submit(self, t, proc_num, io_time, track):
+        """
+        return the completion time of the request, None if it is queued
+        """
+        self._account(t)
+        self.requests += 1
+        if self.free_channels:
+            self.free_channels -= 1
+            return self._serve(t, io_time, track)
+        if self.discipline == 'FIFO':
+            self.fifo.append((proc_num, io_time, track, t))
+        else:
+            insort(self.sorted, (track, self.seq, proc_num, io_time, t))
+            self.seq += 1
+        self.max_depth = max(self.max_depth, self.depth())
+        return None
+
+    def release(self, t):
+        """
+        a channel is done at t, return (proc-num, completion time) of the
+        queued request it serves next, None if the queue is empty
+        """
+        self._account(t)
+        if not self.depth():
+            self.free_channels += 1
+            return None
+        if self.discipline == 'FIFO':
+            proc_num, io_time, track, since = self.fifo.popleft()
+        else:
+            track, seq, proc_num, io_time, since = self.sorted.pop(self._next_elevator())
+        t = max(t, since) # a request made after the channel was done starts on arrival
+        self.wait_time += t - since
+        return proc_num, self._serve(t, io_time, track)
+
+    def _next_elevator(self):
+        # index of the next request to serve (LOOK)
+        if self.direction > 0:
+            i = bisect_left(self.sorted, (self.head,))
+            if i < len(self.sorted):
+                return i
+            self.direction = -1
+            return len(self.sorted) - 1
+        i = bisect_left(self.sorted, (self.head + 1,)) - 1
+        if i >= 0:
+            return i
+        self.direction = 1
+        return 0
+
+    def _serve(self, t, io_time, track):
+        service = io_time
+        if self.discipline == 'ELEVATOR':
+            service += abs(track - self.head) * self.seek_time
+            self.head = track
+        self.busy_time += service
+        return t + service
+
+    def _account(self, t):
+        # a completion may be reported at its own time, after a request made
+        # later on, the clock of the device never goes backwards
+        if t > self.t_last:
+            self.depth_time += self.depth() * (t - self.t_last)
+            self.t_last = t
+
+    def stats(self, end_time):
+        self._account(end_time)
+        return OrderedDict([
+            ('utilization', float(self.busy_time) / (end_time * self.channels) if end_time else 0.0),
+            ('avg_depth', float(self.depth_time) / end_time if end_time else 0.0),
+            ('max_depth', self.max_depth),
+            ('avg_wait', float(self.wait_time) / self.requests if self.requests else 0.0),
+        ])
+
+
+class IOSystem(object):
+    """
+    the devices of a run, each process always uses the same device
+    (picked from its proc-num), each request gets a random track (seeded)
+    """
+    def __init__(self, devices, seed=0):
+        super(IOSystem, self).__init__()
+        self.devices = devices
+        self.random = random.Random(seed)
+        self.pending = {} # {proc-num: device} of the requests in progress
+
+    @classmethod
+    def parse(cls, spec, seed=0):
+        devices = []
+        for each_spec in spec.split(','):
+            fields = each_spec.strip().split(':')
+            devices.append(IODevice(fields[0], int(fields[1]) if len(fields) > 1 else 1,
+                                    fields[2].upper() if len(fields) > 2 else 'FIFO',
+                                    seek_time=int(fields[3]) if len(fields) > 3 else 0))
+        return cls(devices, seed)
+
+    def route(self, proc_num):
+        return self.devices[sum(ord(c) for c in str(proc_num)) % len(self.devices)]
+
+    def start(self, t, proc_num, io_time):
+        """
+        return the (completion time, proc-num) to schedule, if the request is served right away
+        """
+        device = self.route(proc_num)
+        self.pending[proc_num] = device
+        t_done = device.submit(t, proc_num, io_time, self.random.randrange(device.tracks))
+        return [] if t_done is None else [(t_done, proc_num)]
+
+    def complete(self, t, proc_num):
+        """
+        the request of the process completed at t, return the (completion
+        time, proc-num) of the request its channel serves next, if any
+        """
+        following = self.pending.pop(proc_num).release(t)
+        return [] if following is None else [(following[1], following[0])]
+
+    def report(self, end_time):
+        lines = []
+        for device in self.devices:
+            stats = device.stats(end_time)
+            lines.append("-- I/O device %s (%s channels, %s): %.2f%% busy, queue depth avg %.2f max %s, wait avg %.2f ms"%(
+                    device.name, device.channels, device.discipline, 100 * stats['utilization'],
+                    stats['avg_depth'], stats['max_depth'], stats['avg_wait']))
+        return lines
@@ -3,8 +3,109 @@
 from collections import OrderedDict
 
 class IndexedPQ(object):
+    """
+    indexed min priority queue backed by a binary heap:
+    each key (process number) is stored at most once with a value (priority),
+    ties are broken using the key order, insert/change/delete/delMin are O(log n)
+    """
     def __init__(self):
         super(IndexedPQ, self).__init__()
+        self.pq = [] # binary heap of (val, key)
+        self.qp = {} # store {key:position in pq}
+
+    def isEmpty(self):
+        return len(self.pq) == 0
+
+    def size(self):
+        return len(self.pq)
+
+    def contains(self, key):
+        return key in self.qp
+
+    def insert(self, key, val):
+        if key in self.qp:
+            self.change(key, val)
+            return
+        self.pq.append((val, key))
+        self.qp[key] = len(self.pq) - 1
+        self._swim(len(self.pq) - 1)
+
+    def change(self, key, val):
+        i = self.qp.get(key)
+        if i is None:
+            raise ValueError("Invalid key: %s"%key)
+        self.pq[i] = (val, key)
+        self._swim(i)
+        self._sink(self.qp[key])
+
+    def delete(self, key):
+        i = self.qp.pop(key)
+        last = self.pq.pop()
+        if i < len(self.pq):
+            self.pq[i] = last
+            self.qp[last[1]] = i
+            self._swim(i)
+            self._sink(self.qp[last[1]])
+
+    def minIndex(self):
+        return self.pq[0][1]
+
+    def min(self):
+        return self.pq[0][0]
+
+    def maxIndex(self):
+        # the key dispatched last, the maximum is one of the leaves, O(n)
+        return max(self.pq[len(self.pq) >> 1:])[1]
+
+    def delMin(self):
+        indexOfMin = self.pq[0][1]
+        self.delete(indexOfMin)
+        return indexOfMin
+
+    def show(self):
+        return [(key, val) for val, key in sorted(self.pq)]
+
+    def keys(self):
+        # priority order, the heap itself is left untouched
+        return [key for val, key in sorted(self.pq)]
+
+    def _swim(self, i):
+        pq, qp = self.pq, self.qp
+        item = pq[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not item < pq[parent]:
+                break
+            pq[i] = pq[parent]
+            qp[pq[i][1]] = i
+            i = parent
+        pq[i] = item
+        qp[item[1]] = i
+
+    def _sink(self, i):
+        pq, qp = self.pq, self.qp
+        N = len(pq)
+        item = pq[i]
+        while 2*i + 1 < N:
+            j = 2*i + 1
+            if j + 1 < N and pq[j + 1] < pq[j]:
+                j += 1
+            if not pq[j] < item:
+                break
+            pq[i] = pq[j]
+            qp[pq[i][1]] = i
+            i = j
+        pq[i] = item
+        qp[item[1]] = i
+
+
+class SortedIndexedPQ(object):
+    """
+    the former IndexedPQ: an OrderedDict re-sorted on every insert/change,
+    O(n log n) per update, kept for reference and comparison
+    """
+    def __init__(self):
+        super(SortedIndexedPQ, self).__init__()
         self.ipq = OrderedDict()
 
     def isEmpty(self):
@@ -13,6 +114,9 @@ class IndexedPQ(object):
     def size(self):
         return len(self.ipq)
 
+    def contains(self, key):
+        return key in self.ipq
+
     def insert(self, key, val):
         self.ipq[key] = val
         self.ipq = OrderedDict(sorted(self.ipq.iteritems(), cmp=self._cmp, key=lambda d:d))
@@ -31,7 +135,10 @@ class IndexedPQ(object):
         return self.ipq.keys()[0]
 
     def min(self):
-        return self.values()[0]
+        return self.ipq.values()[0]
+
+    def maxIndex(self):
+        return self.ipq.keys()[-1]
 
     def delMin(self):
         indexOfMin = self.ipq.keys()[0]
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+
+"""
+scheduling policies of the simulation kernel (BaseOS.run_policy) and of
+the SMP simulation (smp.py)
+
+the kernel owns the clock, the I/O and the log, a policy only owns the
+ready queue and the scheduling decisions:
+    new_queue()                             an empty ready queue
+    on_ready(queue, pcb)                    the process joins the ready queue (or gets its new
+                                            place if it is already queued)
+    pick_next(queue)                        remove and return the next process to dispatch
+    should_preempt(pcb, current, remaining) whether pcb, ready again, preempts the running
+                                            process, remaining is what is left of its burst
+    time_slice(queue, pcb)                  the time slice of the dispatched process, None for none
+    on_slice(queue, pcb)                    the process used up its slice while others are ready
+    on_tick(queue, process_table, clock)    the queued processes promoted by now (aging), they
+                                            may preempt the running process
+    next_event(process_table)               the time of the next promotion, None for none
+the SMP simulation keeps one queue per CPU and only uses key(), should_preempt()
+and t_slice; a new policy is a subclass added to BaseOS.make_policy
+"""
+
+import heapq
+from collections import deque
+from indexed_pq import IndexedPQ
+
+class Queue(deque):
+    def __init__(self):
+        super(Queue, self).__init__()
+
+    def isEmpty(self):
+        return len(self) == 0
+
+
+class Policy(object):
+    """
+    the base of the policies: a FIFO ready queue, no preemption
+    key: the ready queue order of a process, smaller first, seq is the
+    enqueue sequence number (FIFO order)
+    t_slice: time slice, None for none
+    aging: PWA aging, priority lowered once waiting longer than 3*burst_time
+    io_done_queued: the io_done log line lists the process in the ready queue
+    """
+    t_slice = None
+    aging = False
+    io_done_queued = False
+
+    def key(self, pcb, seq):
+        return seq
+
+    def new_queue(self):
+        return Queue()
+
+    def on_ready(self, queue, pcb):
+        queue.append(pcb.proc_num)
+
+    def pick_next(self, queue):
+        return queue.popleft()
+
+    def should_preempt(self, pcb, current, remaining):
+        return False
+
+    def time_slice(self, queue, pcb):
+        return self.t_slice
+
+    def on_slice(self, queue, pcb):
+        pass
+
+    def on_tick(self, queue, process_table, clock):
+        return ()
+
+    def next_event(self, process_table):
+        return None
+
+    def aged_wait_time(self, process_table):
+        # waiting time the start time resets of on_tick left out of the wait statistics
+        return 0
+
+
+class PriorityPolicy(Policy):
+    """
+    a ready queue in key order, ties are broken using process number order
+    pq_class: IndexedPQ or a queue with its API (IndexMinPQ, SortedIndexedPQ)
+    """
+    io_done_queued = True
+
+    def __init__(self, pq_class=IndexedPQ):
+        super(PriorityPolicy, self).__init__()
+        self.pq_class = pq_class
+
+    def new_queue(self):
+        return self.pq_class()
+
+    def on_ready(self, queue, pcb):
+        if queue.contains(pcb.proc_num):
+            queue.change(pcb.proc_num, self.key(pcb, None))
+        else:
+            queue.insert(pcb.proc_num, self.key(pcb, None))
+
+    def pick_next(self, queue):
+        return queue.delMin()
+
+
+class FCFS(Policy):
+    pass
+
+
+class SRT(PriorityPolicy):
+    def key(self, pcb, seq):
+        return pcb.next_burst_time
+
+    def should_preempt(self, pcb, current, remaining):
+        return pcb.next_burst_time < remaining
+
+
+class RR(Policy):
+    def __init__(self, t_slice):
+        super(RR, self).__init__()
+        self.t_slice = t_slice
+
+
+class PWA(PriorityPolicy):
+    """
+    preemptive priority with aging: a ready process waiting longer than
+    multiplier*burst_time has its priority number lowered by one (down to 0)
+    """
+    aging = True
+    multiplier = 3
+
+    def __init__(self, pq_class=IndexedPQ):
+        super(PWA, self).__init__(pq_class)
+        self.aging_queue = [] # min-heap of (aging time, proc-num, start time) of the ready processes
+        self.starvation_count = {} # {proc-num: times aged}
+
+    def key(self, pcb, seq):
+        return pcb.priority
+
+    def should_preempt(self, pcb, current, remaining):
+        return pcb.priority < current.priority
+
+    def on_ready(self, queue, pcb):
+        super(PWA, self).on_ready(queue, pcb)
+        self.schedule_aging(pcb)
+
+    def schedule_aging(self, pcb):
+        # the ready process is aged once it waits longer than multiplier*burst_time,
+        # the entry is stale as soon as its start time changes
+        heapq.heappush(self.aging_queue, (pcb.start_time + self.multiplier*pcb.burst_time + 1, pcb.proc_num, pcb.start_time))
+
+    def aging_valid(self, process_table, entry):
+        t_aging, k, start_time = entry
+        return k in process_table and process_table[k].status == 0 and process_table[k].start_time == start_time
+
+    def on_tick(self, queue, process_table, clock):
+        """
+        age the ready processes waiting longer than multiplier*burst_time, only
+        those due are popped from the aging queue, in process number order
+        """
+        due = set()
+        while self.aging_queue and self.aging_queue[0][0] <= clock:
+            entry = heapq.heappop(self.aging_queue)
+            if self.aging_valid(process_table, entry) and queue.contains(entry[1]):
+                due.add(entry[1])
+        due = sorted(due)
+        for k in due:
+            process_table[k].priority = max(process_table[k].priority - 1, 0)
+            self.starvation_count[k] = self.starvation_count.get(k, 0) + 1
+        return due
+
+    def next_event(self, process_table):
+        while self.aging_queue and not self.aging_valid(process_table, self.aging_queue[0]):
+            heapq.heappop(self.aging_queue) # stale
+        if self.aging_queue:
+            return self.aging_queue[0][0]
+        return None
+
+    def aged_wait_time(self, process_table):
+        return sum(v*(self.multiplier*process_table[k].burst_time + 1) for k, v in self.starvation_count.iteritems())
@@ -0,0 +1,410 @@
+#!/usr/bin/python
+
+"""
+multi-CPU (SMP) simulation of the project 2 workloads
+
+every CPU has its own ready queue and context switch accounting, a process
+that becomes ready again goes back to the CPU it last ran on, a new one to
+the least loaded CPU; the queues are evened out by
+    balance = None:       never
+    balance = 'steal':    an idle CPU takes a process from the longest queue
+    balance = 'periodic': every balance_period ms, processes are moved from
+                          the longest queues to the shortest ones
+the simulation is driven by a single heap of (time, rank, sequence, event) so
+that nothing is polled; the events of an instant are all handled before the
+idle CPUs are dispatched, in the order of the uniprocessor loop of BaseOS
+(ends of runs, arrivals in input order, I/O completions then agings in process
+number order), so that a run on 1 CPU reproduces BaseOS, e.g.
+
+    python smp.py processes.txt --algos SRT RR --cores 1 2 4 8 --balance steal
+"""
+
+import heapq
+import itertools
+from collections import OrderedDict
+from baseos import BaseOS
+from indexed_pq import IndexedPQ
+from devices import IOSystem
+from pcb import burst_totals
+
+
+class Core(object):
+    """
+    state: 'idle', 'switching' (context switch to current) or 'running'
+    token: invalidates the pending events of the core once it is preempted
+    next: the process that preempted the running one, dispatched right away
+    overtime: the time slice expired while nobody else was ready
+    """
+    def __init__(self, num):
+        super(Core, self).__init__()
+        self.num = num
+        self.queue = IndexedPQ()
+        self.current = None
+        self.next = None
+        self.state = 'idle'
+        self.overtime = False
+        self.token = 0
+        self.run_start = 0
+        self.switch_count = 0
+        self.busy_time = 0
+        self.cs_time = 0
+
+
+class SMPOS(BaseOS):
+    """
+    BaseOS with num_cores CPUs, see run_smp
+    """
+    event_formats = {
+        'start': "time %(t)sms: Simulator started for %(algo)s on %(cores)s CPUs",
+        'end': "time %(t)sms: Simulator for %(algo)s on %(cores)s CPUs ended",
+        'dispatch': "time %(t)sms: P%(proc)s started using CPU %(core)s [Q %(q)s",
+        'burst_done': "time %(t)sms: P%(proc)s completed its CPU burst on CPU %(core)s [Q %(q)s",
+        'io_start': "time %(t)sms: P%(proc)s performing I/O [Q %(q)s",
+        'io_done': "time %(t)sms: P%(proc)s completed I/O, ready on CPU %(core)s [Q %(q)s",
+        'preempt': "time %(t)sms: P%(proc)s preempted by P%(by)s on CPU %(core)s [Q %(q)s",
+        'slice_expired': "time %(t)sms: P%(proc)s preempted due to time slice expiration on CPU %(core)s [Q %(q)s",
+        'migrate': "time %(t)sms: P%(proc)s moved from CPU %(src)s to CPU %(core)s [Q %(q)s",
+        'terminate': "time %(t)sms: P%(proc)s terminated on CPU %(core)s [Q %(q)s",
+    }
+    event_ranks = {'switch_done': 0, 'run_end': 0, 'arrive': 1, 'io_done': 2, 'age': 3, 'balance': 4}
+
+    def __init__(self, num_cores=2):
+        super(SMPOS, self).__init__()
+        self.num_cores = num_cores
+        self.balance = 'steal' # None, 'steal' or 'periodic'
+        self.balance_period = 100
+        self.migrations = 0
+        self.cores = []
+
+    def run_smp(self, algo):
+        """
+        run the loaded processes with the algo policy on num_cores CPUs,
+        return the statistics of the run
+        """
+        if self.balance not in (None, 'steal', 'periodic'):
+            raise ValueError('invalid balance arg: %s'%self.balance)
+        self.policy = self.make_policy(algo)
+        self.io_system = IOSystem.parse(self.io_devices) if self.io_devices else None
+        self.table = OrderedDict((k, v.copy()) for k, v in self.process_table.iteritems()) # input order, as FCFS
+        self.cores = [Core(i) for i in range(self.num_cores)]
+        self.events = [] # min-heap of (time, rank, proc-num tie, seq, kind, arg, token)
+        self.seq = itertools.count()
+        self.home = {} # {proc-num: CPU it is queued on or last ran on}
+        self.age_token = {} # {proc-num: token of its pending aging event}
+        self.kicked = [] # CPUs to dispatch once the events of the instant are handled
+        self.clock = 0
+        self.migrations = 0
+        self.aging_count = 0
+        self.wait_time = 0
+        live = len(self.table)
+        self.sink.event(0, 'start', algo=algo, cores=self.num_cores)
+        for pcb in self.table.itervalues():
+            self.push(pcb.arrival_time, 'arrive', pcb.proc_num)
+        if self.balance == 'periodic':
+            self.push(self.balance_period, 'balance', None)
+
+        try:
+            while live:
+                if not self.events:
+                    raise RuntimeError("time %sms: no pending event"%self.clock)
+                self.clock = self.events[0][0]
+                while self.events and self.events[0][0] == self.clock:
+                    live -= self.handle(*heapq.heappop(self.events)[4:])
+                for core in self.cores:
+                    if core.overtime and not core.queue.isEmpty():
+                        self.preempt(core, 'slice_expired')
+                # dispatch the CPUs left idle by the events of the instant
+                while self.kicked:
+                    self.dispatch(self.kicked.pop())
+            self.sink.event(self.clock, 'end', algo=algo, cores=self.num_cores)
+        finally:
+            self.sink.flush() # also the lines logged before an error
+        return self.smp_stats(algo, self.wait_time)
+
+    def handle(self, kind, arg, token):
+        """
+        handle one event of the current instant, return 1 if a process terminated
+        """
+        if kind in ('switch_done', 'run_end'):
+            core = self.cores[arg]
+            if token != core.token: # the core was preempted meanwhile
+                return 0
+            if kind == 'switch_done':
+                self.start_run(core)
+                return 0
+            done = self.end_run(core)
+            if not core.queue.isEmpty():
+                # as on a single CPU, the next process is picked before the
+                # other events of the instant are seen
+                self.dispatch(core)
+            return done
+        if kind == 'arrive':
+            self.enqueue(min(self.cores, key=self.load), self.table[arg])
+        elif kind == 'io_done':
+            self.end_io(arg, self.clock)
+            self.enqueue(self.cores[self.home[arg]], self.table[arg], 'io_done')
+        elif kind == 'age':
+            self.age(arg, token)
+        elif kind == 'balance':
+            self.rebalance()
+            self.push(self.clock + self.balance_period, 'balance', None)
+        return 0
+
+    def push(self, t, kind, arg, token=None):
+        # same-time I/O completions and agings are handled in process number order
+        tie = arg if kind in ('io_done', 'age') else None
+        heapq.heappush(self.events, (t, self.event_ranks[kind], tie, next(self.seq), kind, arg, token))
+
+    def load(self, core):
+        return (core.queue.size() + (core.current is not None) + (core.next is not None), core.num)
+
+    def log(self, name, proc_num, core, **data):
+        self.sink.event(self.clock, name, proc_num, core.queue, core=core.num, **data)
+
+    def enqueue(self, core, pcb, name=None):
+        """
+        make the process ready on the core (and log the event name if any),
+        it may preempt the running process
+        """
+        pcb.status = 0 # ready to use the CPU
+        pcb.start_time = self.clock
+        core.queue.insert(pcb.proc_num, self.policy.key(pcb, next(self.seq)))
+        self.home[pcb.proc_num] = core.num
+        if name is not None:
+            self.log(name, pcb.proc_num, core)
+        if self.policy.aging:
+            self.schedule_aging(pcb)
+        if core.state == 'running':
+            remaining = core.current.next_burst_time - (self.clock - core.run_start)
+            if self.policy.should_preempt(pcb, core.current, remaining):
+                self.preempt(core, 'preempt', by=pcb.proc_num)
+                self.take_next(core, pcb)
+        self.kicked.append(core)
+        if self.balance == 'steal' and core.queue.size() > 1:
+            # wake up an idle CPU, it steals from the longest queue
+            for other in self.cores:
+                if other.state == 'idle' and other.queue.isEmpty():
+                    self.kicked.append(other)
+                    break
+
+    def preempt(self, core, name, **data):
+        pcb = core.current
+        ran = self.clock - core.run_start
+        pcb.next_burst_time -= ran
+        core.busy_time += ran
+        core.current = None
+        core.state = 'idle'
+        core.overtime = False
+        core.token += 1
+        self.enqueue(core, pcb)
+        self.log(name, pcb.proc_num, core, **data)
+
+    def take_next(self, core, pcb):
+        # the preempting process is dispatched right away, it does not wait in the queue
+        core.queue.delete(pcb.proc_num)
+        pcb.status = 3
+        core.next = pcb
+
+    def dispatch(self, core):
+        """
+        start a context switch to the next process of an idle core, the time
+        that process waited in the ready queue adds to wait_time
+        """
+        if core.state != 'idle':
+            return
+        if core.next is not None:
+            pcb, core.next = core.next, None
+        elif core.queue.isEmpty() and not (self.balance == 'steal' and self.steal(core)):
+            return
+        else:
+            pcb = self.table[core.queue.delMin()]
+            self.wait_time += self.clock - pcb.start_time
+        core.current = pcb
+        core.state = 'switching'
+        core.token += 1
+        core.switch_count += 1
+        core.cs_time += self.t_cs
+        self.push(self.clock + self.t_cs, 'switch_done', core.num, core.token)
+
+    def start_run(self, core):
+        pcb = core.current
+        core.state = 'running'
+        core.run_start = self.clock
+        core.overtime = False
+        pcb.status = 1 # actively using the CPU
+        self.log('dispatch', pcb.proc_num, core)
+        run_time = pcb.next_burst_time
+        if self.policy.t_slice is not None:
+            run_time = min(run_time, self.policy.t_slice + 1) # the slice expires once it is exceeded
+        self.push(self.clock + run_time, 'run_end', core.num, core.token)
+
+    def end_run(self, core):
+        """
+        the end of a slice or of the CPU burst, return 1 if the process terminated
+        """
+        pcb = core.current
+        ran = self.clock - core.run_start
+        if ran < pcb.next_burst_time: # slice expiration
+            if core.queue.isEmpty():
+                # nobody else is ready, keep running until the burst ends or
+                # a process becomes ready, see run_smp
+                core.overtime = True
+                self.push(core.run_start + pcb.next_burst_time, 'run_end', core.num, core.token)
+                return 0
+            self.preempt(core, 'slice_expired')
+            return 0
+        core.busy_time += ran
+        core.current = None
+        core.state = 'idle'
+        core.overtime = False
+        self.kicked.append(core)
+        if pcb.num_burst == 1: # it is the last CPU burst
+            del self.table[pcb.proc_num]
+            self.log('terminate', pcb.proc_num, core)
+            return 1
+        pcb.num_burst -= 1
+        pcb.next_burst_time = pcb.burst_time
+        self.log('burst_done', pcb.proc_num, core)
+        if pcb.io_time > 0:
+            pcb.status = 2 # blocked on (or performing) I/O
+            pcb.start_time = self.clock
+            self.start_io(pcb.proc_num, pcb.io_time)
+            self.log('io_start', pcb.proc_num, core)
+        else:
+            self.enqueue(core, pcb)
+        return 0
+
+    def start_io(self, proc_num, io_time):
+        # as in BaseOS, through the device model if any, the completions are events
+        if self.io_system is None:
+            self.push(self.clock + io_time, 'io_done', proc_num)
+            return
+        for t_io, k in self.io_system.start(self.clock, proc_num, io_time):
+            self.push(t_io, 'io_done', k)
+
+    def end_io(self, proc_num, t_io):
+        if self.io_system is not None:
+            for t_next, k in self.io_system.complete(t_io, proc_num):
+                self.push(t_next, 'io_done', k)
+
+    def steal(self, thief):
+        # move one process from the longest queue (of a CPU that is not about
+        # to dispatch it itself) to the idle thief
+        victim = max(self.cores, key=lambda core: core.queue.size())
+        if victim is thief or victim.queue.size() < (2 if victim.state == 'idle' else 1):
+            return False
+        self.migrate(victim, thief)
+        return True
+
+    def rebalance(self):
+        while True:
+            longest = max(self.cores, key=self.load)
+            shortest = min(self.cores, key=self.load)
+            if self.load(longest)[0] - self.load(shortest)[0] <= 1 or longest.queue.isEmpty():
+                break
+            self.migrate(longest, shortest)
+        self.kicked.extend(self.cores)
+
+    def migrate(self, src, dst):
+        # the process src would dispatch last
+        k = src.queue.maxIndex()
+        src.queue.delete(k)
+        pcb = self.table[k]
+        dst.queue.insert(k, self.policy.key(pcb, next(self.seq)))
+        self.home[k] = dst.num
+        self.migrations += 1
+        self.log('migrate', k, dst, src=src.num)
+
+    def schedule_aging(self, pcb):
+        multiplier = 3 # as in PWA.schedule_aging
+        token = self.age_token.get(pcb.proc_num, 0) + 1
+        self.age_token[pcb.proc_num] = token
+        self.push(self.clock + multiplier*pcb.burst_time + 1, 'age', pcb.proc_num, token)
+
+    def age(self, k, token):
+        # only the last aging event of a process still waiting is valid
+        pcb = self.table.get(k)
+        if pcb is None or pcb.status != 0 or self.age_token.get(k) != token:
+            return
+        core = self.cores[self.home[k]]
+        if not core.queue.contains(k):
+            return
+        if pcb.priority > 0:
+            pcb.priority -= 1
+            core.queue.change(k, self.policy.key(pcb, next(self.seq)))
+        self.aging_count += 1
+        self.wait_time += self.clock - pcb.start_time
+        if core.state == 'running' and self.policy.should_preempt(pcb, core.current, 0):
+            self.preempt(core, 'preempt', by=k)
+            self.take_next(core, pcb)
+        else:
+            pcb.start_time = self.clock # its wait so far is accounted for
+            self.schedule_aging(pcb)
+        self.kicked.append(core)
+
+    def smp_stats(self, algo, wait_time):
+        total_burst_time, burst_num = burst_totals(self.process_table)
+        switch_count = sum(core.switch_count for core in self.cores)
+        busy = [core.busy_time for core in self.cores]
+        mean_busy = float(sum(busy)) / len(busy)
+        stats = OrderedDict([
+            ('algo', algo),
+            ('cores', self.num_cores),
+            ('balance', self.balance),
+            ('end_time', self.clock),
+            ('avg_burst_time', float(total_burst_time) / burst_num),
+            ('avg_wait_time', float(wait_time) / burst_num),
+            ('avg_turnaround_time', float(wait_time + self.t_cs*switch_count + total_burst_time) / burst_num),
+            ('switch_count', switch_count),
+            ('migrations', self.migrations),
+            ('cpu_utilization', float(sum(busy)) / (self.clock * self.num_cores) if self.clock else 0.0),
+            ('imbalance', (max(busy) - min(busy)) / mean_busy if mean_busy else 0.0), # spread of the busy times
+        ])
+        if self.io_system is not None:
+            for device in self.io_system.devices:
+                for name, value in device.stats(self.clock).iteritems():
+                    stats['io_%s_%s'%(device.name, name)] = value
+        print "Algorithm %s on %s CPUs (balance: %s)"%(algo, self.num_cores, self.balance)
+        print "-- average CPU burst time: %.2f ms"%stats['avg_burst_time']
+        print "-- average wait time: %.2f ms"%stats['avg_wait_time']
+        print "-- average turnaround time: %.2f ms"%stats['avg_turnaround_time']
+        print "-- total number of context switches: %s"%switch_count
+        print "-- migrations: %s, CPU utilization: %.2f%%, load imbalance: %.2f"%(
+                self.migrations, 100 * stats['cpu_utilization'], stats['imbalance'])
+        for core in self.cores:
+            print "-- CPU %s: %s context switches (%s ms), busy %s ms"%(core.num, core.switch_count, core.cs_time, core.busy_time)
+        self.print_io_stats()
+        return stats
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from events import EventSink, make_sink
+    parser = argparse.ArgumentParser(description='SMP simulation')
+    parser.add_argument('workload', help='process file')
+    parser.add_argument('--algos', nargs='+', default=['FCFS', 'SRT', 'RR', 'PWA'])
+    parser.add_argument('--cores', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--balance', choices=['none', 'steal', 'periodic'], default='steal')
+    parser.add_argument('--balance-period', type=int, default=100)
+    parser.add_argument('--t-slice', type=int, default=80)
+    parser.add_argument('--io-devices', help='I/O devices, e.g. disk:1:ELEVATOR:1,net:2:FIFO (see devices.py)')
+    parser.add_argument('--log', action='store_true', help='print the event log of every run')
+    parser.add_argument('--event-log', help='text, jsonl:<file> or none, overrides --log (see events.py)')
+    args = parser.parse_args()
+    if args.event_log:
+        sink = make_sink(args.event_log, SMPOS.event_formats) # one log for all the runs
+
+    for algo in args.algos:
+        for num_cores in args.cores:
+            smp = SMPOS(num_cores)
+            smp.load_process(args.workload)
+            smp.balance = None if args.balance == 'none' else args.balance
+            smp.balance_period = args.balance_period
+            smp.t_slice = args.t_slice
+            smp.io_devices = args.io_devices
+            if args.event_log:
+                smp.sink = sink
+            elif not args.log:
+                smp.sink = EventSink()
+            smp.run_smp(algo)
+            print
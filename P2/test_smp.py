@@ -0,0 +1,54 @@
+#!/usr/bin/python
+
+"""
+the SMP simulator on a single CPU, run from P2/: python -m unittest test_smp
+"""
+
+import os
+import sys
+import unittest
+from baseos import BaseOS
+from smp import SMPOS
+from events import EventSink
+
+class SingleCoreTest(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def run_both(self, algo, io_devices=None):
+        bos = BaseOS()
+        bos.sink = EventSink()
+        bos.io_devices = io_devices
+        bos.load_process('processes.txt')
+        bos.run_proc(algo)
+        smp = SMPOS(1)
+        smp.sink = EventSink()
+        smp.io_devices = io_devices
+        smp.load_process('processes.txt')
+        return bos, smp.run_smp(algo)
+
+    def test_one_core_is_baseos(self):
+        for algo in ('FCFS', 'SRT', 'RR', 'PWA'):
+            bos, stats = self.run_both(algo)
+            self.assertAlmostEqual(stats['avg_wait_time'], bos.avg_wait_time, msg=algo)
+            self.assertAlmostEqual(stats['avg_turnaround_time'], bos.avg_turnaround_time, msg=algo)
+            self.assertEqual(stats['switch_count'], bos.switch_count, algo)
+            self.assertEqual(stats['end_time'], bos.clock, algo)
+
+    def test_io_devices(self):
+        # the bursts queue for the devices as on a single CPU
+        for algo in ('FCFS', 'SRT', 'RR', 'PWA'):
+            bos, stats = self.run_both(algo, 'disk:1:ELEVATOR:1,net:2:FIFO')
+            self.assertAlmostEqual(stats['avg_wait_time'], bos.avg_wait_time, msg=algo)
+            self.assertEqual(stats['end_time'], bos.clock, algo)
+            for device in bos.io_system.devices:
+                for name, value in device.stats(bos.clock).iteritems():
+                    self.assertEqual(stats['io_%s_%s'%(device.name, name)], value, (algo, device.name, name))
+
+if __name__ == '__main__':
+    unittest.main()
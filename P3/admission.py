@@ -0,0 +1,57 @@
+#!/usr/bin/python
+
+"""
+admission of the processes the memory cannot take yet
+
+a process that does not fit, even after defragmentation, waits in the
+AdmissionQueue of the run (status 3) instead of aborting it; BaseOS only
+retries the queue when a terminating process frees memory, and admits the
+waiting processes in order for as long as the first one fits:
+    FIFO        arrival order, the first one holds the others back
+    Smallest    the least memory first, ties are broken using arrival order
+"""
+
+import heapq
+from collections import deque
+
+class AdmissionQueue(object):
+    orders = ('FIFO', 'Smallest')
+
+    def __init__(self, order='FIFO'):
+        super(AdmissionQueue, self).__init__()
+        if order not in self.orders:
+            raise ValueError('invalid admission order arg: %s'%order)
+        self.order = order
+        self.entries = [] if order == 'Smallest' else deque() # (memory, seq, proc-num), a min-heap for Smallest
+        self.seq = 0
+        self.since = {} # {proc-num: waiting since}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, proc_num, memory, t):
+        entry = (memory, self.seq, proc_num)
+        self.seq += 1
+        if self.order == 'Smallest':
+            heapq.heappush(self.entries, entry)
+        else:
+            self.entries.append(entry)
+        self.since[proc_num] = t
+
+    def peek(self):
+        # (proc-num, memory) of the first waiting process
+        memory, seq, proc_num = self.entries[0]
+        return proc_num, memory
+
+    def pop(self, t):
+        # remove the first waiting process, return how long it waited
+        if self.order == 'Smallest':
+            memory, seq, proc_num = heapq.heappop(self.entries)
+        else:
+            memory, seq, proc_num = self.entries.popleft()
+        return t - self.since.pop(proc_num)
+
+    def keys(self):
+        # the waiting processes in admission order
+        return [proc_num for memory, seq, proc_num in sorted(self.entries)] if self.order == 'Smallest' else \
+               [proc_num for memory, seq, proc_num in self.entries]
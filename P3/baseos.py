@@ -1,9 +1,20 @@
 #!/usr/bin/python
 
-import time
-from copy import deepcopy
-from collections import deque, OrderedDict
-from indexed_priority_queue import IndexMinPQ
+import math
+import heapq
+import itertools
+from collections import OrderedDict
+from mem_pool import MemPool
+from paging import PagedMemory
+from admission import AdmissionQueue
+from defrag import defrag_algos, apply_moves, compact_step
+from pcb import PCB, ProcessArrays, iter_arrivals
+from events import TextSink, make_sink
+from stats import RunRecorder, summarize
+from devices import IOSystem
+from policies import SRT, RR, MLFQ
+import snapshot
+from profiler import profile_run
 
 class BaseOS(object):
     """
@@ -14,410 +25,738 @@ class BaseOS(object):
     (d) blocked on (or performing) I/O; and --> 2
     (e) exiting the system (i.e., memory deallocation). --> 4
     """
+    config_keys = ('t_cs', 't_slice', 't_memmove', 'mem_units_per_line', 'mem_line_num', 'mem_graph_lines', 'defrag_algo', 'report_percentiles',
+                   'mlfq_levels', 'mlfq_quanta', 'mlfq_boost', 'io_devices', 'checkpoint_every', 'checkpoint_file',
+                   'profile', 'profile_top', 'memory_mode', 'page_size', 'tlb_entries', 't_page_ref', 't_page_fault',
+                   'admission_order', 't_cs_same', 't_cs_cold', 'cs_warmth_decay', 'cs_skip_same')
+    # the run state saved in a snapshot besides the process table, ready queue and memory pool, see snapshot.py
+    snapshot_attrs = ('clock', 't_pseudo_elapsed', 'io_queue', 'io_system', 'policy', 'defrag_count', 'defrag_moved_units',
+                      'defrag_idle_units', 'switch_count', 'burst_count', 'total_burst_time', 'recorder',
+                      'next_arrival', 'arrivals_pulled', 'next_checkpoint', 'paging', 'page_fault_time',
+                      'admission_queue', 'admission_waits', 'admission_wait_time', 'switch_time', 'switches_skipped',
+                      'last_process', 'cpu_left')
+    # methods timed by profile, see profiler.py
+    profile_phases = ('new_arrival_proc', 'admit_waiting', 'poll_io', 'advance_clock', 'memory_placement', 'defrag_plan', 'defragm',
+                      'defrag_idle', 'recycle_memory', 'start_io', 'end_io', 'print_mem_graph', 'draw_mem_graph',
+                      'checkpoint')
+    # log line of each event, see events.py
+    event_formats = {
+        'start': "time %(t)sms: Simulator started for %(algo)s and %(placement_algo)s",
+        'end': "time %(t)sms: Simulator for %(algo)s and %(placement_algo)s ended",
+        'admit': "time %(t)sms: Process '%(proc)s' added to system [Q %(q)s",
+        'no_memory': "time %(t)sms: Process '%(proc)s' unable to be added; lack of memory",
+        'admission_wait': "time %(t)sms: Process '%(proc)s' waiting for memory (%(units)s units, %(waiting)s waiting)",
+        'defrag_start': "time %(t)sms: Starting defragmentation (suspending all processes)",
+        'defrag_end': "time %(t)sms: Completed defragmentation (moved %(units)s memory units)",
+        'dispatch': "time %(t)sms: Process '%(proc)s' started using the CPU [Q %(q)s",
+        'burst_done': "time %(t)sms: Process '%(proc)s' completed its CPU burst [Q %(q)s",
+        'io_start': "time %(t)sms: Process '%(proc)s' performing I/O [Q %(q)s",
+        'io_done': "time %(t)sms: Process '%(proc)s' completed I/O [Q %(q)s",
+        'preempt': "time %(t)sms: Process '%(proc)s' preempted by Process '%(by)s' [Q %(q)s",
+        'slice_expired': "time %(t)sms: Process '%(proc)s' preempted due to time slice expiration [Q %(q)s",
+        'terminate': "time %(t)sms: Process '%(proc)s' terminated [Q %(q)s",
+        'boost': "time %(t)sms: Priority boost, all processes moved to level 0 [Q %(q)s",
+        'page_fault': "time %(t)sms: Process '%(proc)s' page fault on page %(page)s [Q %(q)s",
+        'page_in': "time %(t)sms: Process '%(proc)s' page %(page)s loaded [Q %(q)s",
+    }
+
     def __init__(self):
         super(BaseOS, self).__init__()
         self.process_table = OrderedDict() # process table
         self.t_cs = 13 # context switch cost
+        self.t_cs_same = None # cost of a switch back to the process that left the CPU last, None for t_cs
+        self.t_cs_cold = 0 # extra cost of refilling the caches (and TLB) of a process that has gone cold
+        self.cs_warmth_decay = 100 # the caches of a process off the CPU for t ms are cold by 1 - exp(-t/cs_warmth_decay), 0 for always cold
+        self.cs_skip_same = 0 # 1 to skip the switch altogether when the process that left the CPU last is dispatched again
         self.t_slice = 80 # time slice for Round Robin algorithm
+        self.mlfq_levels = 3 # MLFQ levels, level 0 is dispatched first
+        self.mlfq_quanta = None # quantum of each level: None for t_slice doubled at every level, a number for all levels or "q0,q1,..."
+        self.mlfq_boost = 1000 # period of the MLFQ priority boost, 0 for none
         self.t_memmove = 10 # the time to move one unit of memory
+        self.mem_units_per_line = 32 # memory pool geometry
+        self.mem_line_num = 8
+        self.mem_graph_lines = None # lines of the memory graph to print, None for all, 0 for none
+        self.memory_mode = 'contiguous' # contiguous (MemPool) or paged (PagedMemory, the placement algorithm names the replacement one)
+        self.page_size = 4 # units per page (paged)
+        self.tlb_entries = 8
+        self.t_page_ref = 10 # CPU time between two memory references of a burst (paged)
+        self.t_page_fault = 50 # the time to load a page
+        self.paging = None # PagedMemory of the run in paged mode, see paging.py
+        self.page_fault_time = 0 # time spent blocked on page faults
+        self.admission_order = 'FIFO' # FIFO or Smallest, the order the processes waiting for memory are admitted in
+        self.admission_queue = AdmissionQueue() # processes waiting for memory, see admission.py
+        self.admission_waits = 0
+        self.admission_wait_time = 0
+        self.clock = 0 # virtual clock (ms), driven by events instead of the wall clock
+        self.io_queue = [] # min-heap of (I/O completion time, proc-num) of the blocked processes
+        self.io_devices = None # I/O devices "<name>:<channels>:<FIFO|ELEVATOR>[:<seek-time>],...", see devices.py, None for unlimited I/O
+        self.io_system = None # IOSystem of the run
+        self.policy = None # scheduling policy of the run, see policies.py
+        self.sink = TextSink(self.event_formats) # where the events go, EventSink() to drop them (statistics only)
         self.t_pseudo_elapsed = 0 # while defragmentation is running, all processes are essentially placed in a suspended state, using pseudo elapsed time to simulate it
+        self.defrag_algo = 'Full' # Full, LowEnd, HighEnd, Smallest, Cheapest or Incremental, see defrag.py
+        self.defrag_count = 0
+        self.defrag_moved_units = 0 # moved while all processes are suspended
+        self.defrag_idle_units = 0 # moved in the background while the CPU is idle (Incremental)
+        self.report_percentiles = 0 # print the tail latencies and utilizations after the averages
         self.avg_wait_time = 0.0
         self.avg_turnaround_time = 0.0
         self.switch_count = 0
-        self.burst_count = 0
+        self.switch_time = 0 # time spent switching
+        self.switches_skipped = 0 # dispatches of the previous process without a switch (cs_skip_same)
+        self.last_process = None # the process that left the CPU last
+        self.cpu_left = {} # {proc-num: time it last left the CPU}
+        self.burst_count = 0 # CPU bursts of the processes arrived so far
+        self.total_burst_time = 0
+        self.recorder = RunRecorder() # per-burst and per-process records of the run, see stats.py
+        self.arrival_stream = iter(()) # process records yet to arrive, in arrival order
+        self.next_arrival = None # look-ahead record of arrival_stream
+        self.arrivals_pulled = 0 # records read from arrival_stream, next_arrival included
+        self.checkpoint_every = 0 # save a snapshot every that many ms of the clock, 0 for none
+        self.checkpoint_file = 'checkpoint.snap' # a %(t)s in the name keeps one file per snapshot
+        self.next_checkpoint = 0
+        self.profile = 0 # 1 to print the time spent in each phase after a run, 2 to also run it under cProfile
+        self.profile_top = 20 # functions of the cProfile report
+
+    def load_process(self, filename, compact=False):
+        """
+        compact: keep the process table as ProcessArrays (one column per field)
+        instead of one PCB per process, for big workloads
+        """
+        if compact and not isinstance(self.process_table, ProcessArrays):
+            self.process_table = ProcessArrays(self.process_table.itervalues())
+        try:
+            for proc_num, values in self.iter_process(filename):
+                self.process_table[proc_num] = values
+        except Exception, e:
+            print e
+            assert False
+
+    def iter_process(self, filename):
+        """
+        yield the (proc-num, record) of the process file one line at a time,
+        it can be passed to run_proc directly if the file is in arrival order
+        """
+        with open(filename, 'r') as f:
+            for each_line in f:
+                if each_line == '' or each_line[0] == '#':
+                    continue
+                conf = each_line.rstrip('\n').split('|') # <proc-num>|<arrival-time>|<burst-time>|<num-burst>|<io-time>|<memory>
+                # process table {proc-num: PCB(arrival-time, burst-time, num-burst, io-time, memory)}, waiting to be admitted
+                arrival_time, burst_time, num_burst, io_time, memory = [int(x) for x in conf[1:]]
+                yield conf[0], PCB(conf[0], burst_time, num_burst, io_time, 0, arrival_time, memory, 3)
 
-    def load_process(self, filename):
+    def load_config(self, filename):
+        """
+        override the simulator parameters with <name>=<value> lines
+        """
         try:
             with open(filename, 'r') as f:
                 for each_line in f:
+                    each_line = each_line.strip()
                     if each_line == '' or each_line[0] == '#':
                         continue
-                    conf = each_line.rstrip('\n').split('|') # <proc-num>|<arrival-time>|<burst-time>|<num-burst>|<io-time>|<memory>
-                    # process table {'proc-num':['arrival-time', 'burst-time', 'num-burst', 'memory', 'io-time', 'status', 'eachstage-start-time']}
-                    self.process_table[conf[0]] = dict(zip(['arrival_time', 'burst_time', 'num_burst', 'io_time', 'memory', 'status', 'start_time', 'next_burst_time'], [int(x) for x in conf[1:]] + [3, 0, int(conf[2])]))
+                    name, value = [x.strip() for x in each_line.split('=', 1)]
+                    if name == 'event_log': # where the events go, see events.make_sink
+                        self.sink = make_sink(value, self.event_formats)
+                        continue
+                    if name not in self.config_keys:
+                        raise ValueError('invalid config arg: %s'%name)
+                    if value == 'None':
+                        value = None
+                    elif value.lstrip('-').isdigit():
+                        value = int(value)
+                    setattr(self, name, value)
         except Exception, e:
             print e
             assert False
-        f.close()
 
-    def run_proc(self, algo, placement_algo):
+    def run_proc(self, algo, placement_algo, source=None):
+        """
+        source: iterable of (proc-num, record) in arrival order (e.g. iter_process),
+        admitted lazily as the clock advances, the loaded process table by default
+        """
         # memory pool
-        memory_pool = MemPool(32, 8) # 32 units per line, 8 lines, total 256 units
+        if self.memory_mode == 'contiguous':
+            memory_pool = MemPool(self.mem_units_per_line, self.mem_line_num) # 32 units per line, 8 lines, total 256 units by default
+            self.paging = None
+        elif self.memory_mode == 'paged':
+            memory_pool = PagedMemory(self.mem_units_per_line, self.mem_line_num, placement_algo,
+                                      self.page_size, self.tlb_entries, self.t_page_ref)
+            self.paging = memory_pool
+        else:
+            raise ValueError('invalid memory mode arg: %s'%self.memory_mode)
+        self.page_fault_time = 0
+        self.admission_queue = AdmissionQueue(self.admission_order)
+        self.admission_waits = 0
+        self.admission_wait_time = 0
         self.t_pseudo_elapsed = 0 # reset
-        # copy process table
-        process_table = deepcopy(self.process_table) # copy both th parent and child object
-        # All "ties" are to be broken using process number order
-        process_table = OrderedDict(sorted(process_table.iteritems(), key=lambda d:d[0]))
-
-        if algo == 'RR': # Round Robin
-            self.run_proc_rr(process_table, memory_pool, placement_algo)
-        elif algo == 'SRT': # Shortest Remaining time
-            self.run_proc_srt(process_table, memory_pool, placement_algo)
+        self.defrag_count = 0
+        self.defrag_moved_units = 0
+        self.defrag_idle_units = 0
+        self.burst_count = 0
+        self.total_burst_time = 0
+        self.recorder = RunRecorder()
+        self.io_system = IOSystem.parse(self.io_devices) if self.io_devices else None
+        self.policy = self.make_policy(algo)
+        if source is None:
+            # copy the PCBs of the process table one by one as they arrive
+            source = iter_arrivals(self.process_table)
+        self.arrival_stream = iter(source)
+        self.next_arrival = None
+        self.arrivals_pulled = 0
+        self.next_checkpoint = self.checkpoint_every
+        self.pull_arrival()
+        # only the arrived processes are kept in the process table of the run
+        process_table = OrderedDict()
+
+        return self.dispatch_run(algo, process_table, memory_pool, placement_algo)
+
+    def dispatch_run(self, algo, process_table, memory_pool, placement_algo, process_queue=None):
+        # process_queue is only given to resume a run, see resume()
+        if self.profile:
+            return profile_run(self, '%s and %s'%(algo, placement_algo), self.run_policy,
+                               algo, process_table, memory_pool, placement_algo, process_queue)
+        return self.run_policy(algo, process_table, memory_pool, placement_algo, process_queue)
+
+    def make_policy(self, algo):
+        if algo == 'SRT': # Shortest Remaining time
+            return SRT()
+        elif algo == 'RR': # Round Robin
+            return RR(self.t_slice)
+        elif algo == 'MLFQ': # Multilevel Feedback Queue
+            return MLFQ(self.mlfq_quantum_list(), self.mlfq_boost)
         else:
             raise ValueError('invalid arg: %s'%algo)
 
-    def run_proc_srt(self, process_table, memory_pool, placement_algo):
-        self.avg_wait_time = 0.0
-        self.switch_count = 0
-        avg_burst_time = 0.0
-
-        print "time 0ms: Simulator started for SRT and %s"%placement_algo
-        self.t0 = time.time()
+    def mlfq_quantum_list(self):
+        if self.mlfq_quanta is None:
+            return [self.t_slice << level for level in range(self.mlfq_levels)]
+        if isinstance(self.mlfq_quanta, int):
+            return [self.mlfq_quanta] * self.mlfq_levels
+        return [int(x) for x in str(self.mlfq_quanta).split(',')]
 
-        # at the very begining when no process has arrived
-        process_queue = IndexMinPQ();
-        self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-
-        while len(process_table):
-            self.proc_srt_loop(process_table, process_queue, memory_pool, placement_algo)
-        print "time %sms: Simulator for SRT and %s ended"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, placement_algo)
-        # stat
-        burst_num = 0
-        for val in self.process_table.values():
-            avg_burst_time += (val['burst_time']*val['num_burst'])
-            burst_num += val['num_burst']
-        self.avg_turnaround_time = (self.avg_wait_time + self.t_cs*self.switch_count + avg_burst_time + self.t_pseudo_elapsed)/burst_num
-        avg_burst_time /= burst_num
-        self.avg_wait_time /= burst_num
-        print "Algorithm SRT %s"%placement_algo
-        print "-- average CPU burst time: %.2f ms"%avg_burst_time
-        print "-- average wait time: %.2f ms"%self.avg_wait_time
-        print "-- average turnaround time: %.2f ms"%self.avg_turnaround_time
-        print "-- total number of context switches: %s"%self.switch_count
-
-    def run_proc_rr(self, process_table, memory_pool, placement_algo): # handle process queue
-        # stats
-        self.switch_count = 0
+    def run_policy(self, algo, process_table, memory_pool, placement_algo, process_queue=None):
+        """
+        the simulation kernel: run the arriving processes with self.policy up
+        to the end, print and return the statistics of the run
+        """
         avg_burst_time = 0.0
-        self.avg_wait_time = 0.0
-
-        print "time 0ms: Simulator started for RR and %s"%placement_algo
-        self.t0 = time.time()
-
-        # at the very begining when no process has arrived
-        process_queue = Queue();
-        self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
+        try:
+            if process_queue is None: # a new run, not resumed from a snapshot
+                self.switch_count = 0
+                self.switch_time = 0
+                self.switches_skipped = 0
+                self.last_process = None
+                self.cpu_left = {}
+                self.sink.event(0, 'start', algo=algo, placement_algo=placement_algo)
+                self.clock = 0
+                self.io_queue = []
+                # at the very begining when no process has arrived
+                process_queue = self.policy.new_queue()
+                self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
 
-        while len(process_table):
-            self.proc_rr_loop(process_table, process_queue, memory_pool, placement_algo)
-        print "time %sms: Simulator for RR and %s ended"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, placement_algo)
+            while len(process_table) or self.next_arrival is not None:
+                self.proc_loop(process_table, process_queue, memory_pool, placement_algo)
+                if self.checkpoint_every and self.clock >= self.next_checkpoint:
+                    self.checkpoint(algo, placement_algo, process_table, process_queue, memory_pool)
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'end', algo=algo, placement_algo=placement_algo)
+        finally:
+            self.sink.flush() # also the lines logged before an error
         # stat
-        burst_num = 0
-        for val in self.process_table.values():
-            avg_burst_time += (val['burst_time']*val['num_burst'])
-            burst_num += val['num_burst']
-        self.avg_turnaround_time = (self.avg_wait_time + self.t_cs*self.switch_count + avg_burst_time + self.t_pseudo_elapsed)/burst_num
+        avg_burst_time = float(self.total_burst_time)
+        burst_num = self.burst_count
+        self.avg_wait_time = float(self.recorder.total_wait())
+        self.avg_turnaround_time = (self.avg_wait_time + self.switch_time + avg_burst_time + self.t_pseudo_elapsed +
+                                    self.page_fault_time + self.admission_wait_time)/burst_num
         avg_burst_time /= burst_num
         self.avg_wait_time /= burst_num
-        print "Algorithm RR and %s"%placement_algo
+        print "Algorithm %s and %s"%(algo, placement_algo)
         print "-- average CPU burst time: %.2f ms"%avg_burst_time
         print "-- average wait time: %.2f ms"%self.avg_wait_time
         print "-- average turnaround time: %.2f ms"%self.avg_turnaround_time
         print "-- total number of context switches: %s"%self.switch_count
-
-    def proc_srt_loop(self, process_table, process_queue, memory_pool, placement_algo, current_process=None):
-        if process_queue.isEmpty(): # the CPU is idle
+        self.print_switch_stats()
+        self.print_defrag_stats()
+        self.print_io_stats()
+        self.print_paging_stats()
+        self.print_admission_stats()
+        stats = self.run_stats(algo, placement_algo, avg_burst_time)
+        self.print_percentiles(stats)
+        return stats
+
+    def proc_loop(self, process_table, process_queue, memory_pool, placement_algo, current_process=None):
+        """
+        one scheduling point: dispatch the next process of the policy (or
+        current_process, which has just preempted the running one) and run it
+        until its burst ends, its time slice expires or it is preempted
+        """
+        policy = self.policy
+        self.poll_policy(process_queue)
+        if current_process is None and process_queue.isEmpty(): # the CPU is idle
             self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-            self.poll_io_srt(process_table, process_queue) # preemption makes no sense in this case
+            self.poll_io(process_table, process_queue) # preemption makes no sense in this case
+            if process_queue.isEmpty() and (len(process_table) or self.next_arrival is not None):
+                t_idle = self.clock
+                self.advance_clock(process_table) # jump to the next arrival or I/O completion
+                self.defrag_idle(memory_pool, self.clock - t_idle)
+            return
+
+        # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
+        if current_process is None:
+            current_process = policy.pick_next(process_queue)
+            self.recorder.dispatch(current_process, self.clock)
+        t_cs = self.switch_cost(current_process)
+        if t_cs is None: # the previous process goes on, no switch
+            self.switches_skipped += 1
         else:
-            # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
-            # poll io performance
-            if not current_process:
-                current_process = process_queue.delMin()
-                self.avg_wait_time += (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-            t1 = time.time()
-            while int(1000*(time.time() - t1)) < self.t_cs:
+            t1 = self.clock
+            while self.clock - t1 < t_cs:
                 self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-                self.poll_io_srt(process_table, process_queue) # preemption makes no sense in this case ???
+                self.poll_io(process_table, process_queue) # nothing to preempt during the context switch
+                self.advance_clock(process_table, t1 + t_cs)
             self.switch_count += 1
-
-            # switch to the next process
-            process_table[current_process]['status'] = 1 # actively using the CPU
-            process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-            print "time %sms: Process '%s' started using the CPU [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue.keys()))[1:]
-
-            while int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'] < process_table[current_process]['next_burst_time']:
-                self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-                ret_val = self.poll_io_srt(process_table, process_queue, current_process) # poll io performance, preemption may occur
-                if not ret_val == -1: # a preemption has occurred
-                    # context switch
-                    # poll io performance
-                    self.proc_srt_loop(process_table, process_queue, memory_pool, placement_algo, ret_val)
-                    return
-            # handle CPU
-            if process_table[current_process]['num_burst'] == 1: # it is the last CPU burst
-                # recycle memory
-                self.recycle_memory(memory_pool, current_process)
-                del process_table[current_process] # delete the completed process
-                print "time %sms: Process '%s' terminated [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue.keys()))[1:]
-            else:
-                print "time %sms: Process '%s' completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue.keys()))[1:]
-                process_table[current_process]['next_burst_time'] = process_table[current_process]['burst_time']
-                if process_table[current_process]['io_time'] > 0:
-                    print "time %sms: Process '%s' performing I/O [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue.keys()))[1:]
-                    process_table[current_process]['status'] = 2 # blocked on (or performing) I/O
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                else:
-                    process_table[current_process]['status'] = 0 # ready to use the CPU
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[current_process]['num_burst'] -= 1
-                    process_queue.insert(current_process, process_table[current_process]['next_burst_time'])
-
-    def proc_rr_loop(self, process_table, process_queue, memory_pool, placement_algo):
-        if len(process_queue) == 0: # the CPU is idle
+            self.switch_time += t_cs
+
+        # switch to the next process
+        pcb = process_table[current_process]
+        pcb.status = 1 # actively using the CPU
+        pcb.start_time = self.clock
+        self.sink.event(self.clock + self.t_pseudo_elapsed, 'dispatch', current_process, process_queue)
+        t_slice = policy.time_slice(process_queue, pcb)
+        burst_end = pcb.start_time + pcb.next_burst_time
+        run_end = burst_end # up to the next page fault in paged mode
+        if self.paging is not None:
+            self.paging.switch(current_process)
+            t_fault = self.paging.next_fault(pcb)
+            if t_fault is not None:
+                run_end = pcb.start_time + t_fault
+        slice_end = burst_end
+        if t_slice is not None:
+            slice_end = pcb.start_time + t_slice + 1 # the slice expires once it is exceeded
+        while self.clock < run_end:
+            if t_slice is not None and not process_queue.isEmpty() and self.clock - pcb.start_time > t_slice:
+                # at least one process in the ready queue and slice time out, preemption occurs
+                policy.on_slice(process_queue, pcb)
+                self.requeue(pcb, process_queue) # run the remaining time next round
+                self.sink.event(self.clock + self.t_pseudo_elapsed, 'slice_expired', current_process, process_queue)
+                return
             self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-            self.poll_io_rr(process_table, process_queue)
+            preempting = self.poll_io(process_table, process_queue, pcb) # poll io performance, preemption may occur
+            if preempting is not None: # a preemption has occurred, context switch to the preempting process
+                self.proc_loop(process_table, process_queue, memory_pool, placement_algo, preempting)
+                return
+            if self.clock < slice_end:
+                self.advance_clock(process_table, min(slice_end, run_end))
+            elif process_queue.isEmpty(): # otherwise the expired slice is handled right away
+                self.advance_clock(process_table, run_end)
+        if run_end < burst_end:
+            self.page_fault(pcb, process_queue)
+            return
+
+        # handle CPU
+        if self.paging is not None:
+            self.paging.run(pcb, self.clock - pcb.start_time)
+        self.leave_cpu(current_process)
+        self.recorder.end_burst(current_process, self.clock)
+        if pcb.num_burst == 1: # it is the last CPU burst
+            self.recycle_memory(memory_pool, current_process)
+            self.recorder.exit(pcb.arrival_time, self.clock)
+            policy.on_exit(process_queue, pcb)
+            del process_table[current_process] # delete the completed process
+            del self.cpu_left[current_process]
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'terminate', current_process, process_queue)
+            if len(self.admission_queue):
+                self.admit_waiting(process_table, process_queue, memory_pool, placement_algo) # memory was freed
         else:
-            # context switch: the process of storing and restoring the state (more specifically, the execution context) of a process
-            # poll io performance
-            current_process = process_queue.popleft()
-            self.avg_wait_time += (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-            t1 = time.time()
-            while int(1000*(time.time() - t1)) < self.t_cs:
-                self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-                self.poll_io_rr(process_table, process_queue)
-
-            self.switch_count += 1
-            # switch to the next process
-            process_table[current_process]['status'] = 1 # actively using the CPU
-            process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-            t = time.time()
-            print "time %sms: Process '%s' started using the CPU [Q "%(int(1000*(t-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue))[1:]
-            while int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'] < process_table[current_process]['next_burst_time']:
-                if len(process_queue) and int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'] > self.t_slice: # at least one process in the ready queue and slice time out
-                    # preemption occurs
-                    current_proc_remaining_time = process_table[current_process]['next_burst_time'] - \
-                            (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-                    process_table[current_process]['status'] = 0 # ready to use the CPU
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[current_process]['next_burst_time'] = current_proc_remaining_time
-                    process_queue.insert(current_process) # run the remaining time next round
-                    print "time %sms: Process '%s' preempted due to time slice expiration [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue))[1:]
-                    return
-                self.new_arrival_proc(process_table, process_queue, memory_pool, placement_algo)
-                self.poll_io_rr(process_table, process_queue) # poll io performance
-            # handle CPU
-            if process_table[current_process]['num_burst'] == 1: # it is the last CPU burst
-                self.recycle_memory(memory_pool, current_process)
-                del process_table[current_process] # delete the completed process
-                print "time %sms: Process '%s' terminated [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue))[1:]
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'burst_done', current_process, process_queue)
+            pcb.next_burst_time = pcb.burst_time
+            if pcb.io_time > 0:
+                self.sink.event(self.clock + self.t_pseudo_elapsed, 'io_start', current_process, process_queue)
+                pcb.status = 2 # blocked on (or performing) I/O
+                pcb.start_time = self.clock
+                self.start_io(current_process, pcb.io_time)
             else:
-                if process_table[current_process]['io_time'] > 0:
-                    print "time %sms: Process '%s' completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue))[1:]
-                    print "time %sms: Process '%s' performing I/O [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue))[1:]
-                    process_table[current_process]['status'] = 2 # blocked on (or performing) I/O
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                else:
-                    process_table[current_process]['status'] = 0 # ready to use the CPU
-                    process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[current_process]['num_burst'] -= 1
-                    print "time %sms: Process '%s' completed its CPU burst [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process) + ("%s"%list(process_queue))[1:]
-                    process_queue.insert(current_process)
-
-    def poll_io_srt(self, process_table, process_queue, current_process=None):
-        # check IO performance (two processes complete io at the same time?)
-        preemption_flag = False # preemption ties are broken using process number order
-                                # preemption occurs at most once in an io poll
-        preemption_process = -1
-        for k, v in process_table.items():
-            if v['status'] == 2: #blocked on (or performing) I/O
-                if int(1000*(time.time()-self.t0)) - v['start_time'] >= v['io_time']:
-                    process_table[k]['num_burst'] -= 1
-                    # preemptive
-                    if not current_process or preemption_flag:
-                        process_table[k]['status'] = 0 # ready to use the CPU
-                        process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                        process_queue.insert(k, process_table[k]['next_burst_time'])
-                        print "time %sms: Process '%s' completed I/O [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, k) + ("%s"%list(process_queue.keys()))[1:]
-                    else:
-                        current_proc_remaining_time = process_table[current_process]['next_burst_time'] - \
-                                (int(1000*(time.time()-self.t0)) - process_table[current_process]['start_time'])
-                        if process_table[k]['next_burst_time'] < current_proc_remaining_time:
-                            # a preemption occurs
-                            print "time %sms: Process '%s' completed I/O [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, k) + ("%s"%list(process_queue.keys()))[1:]
-                            process_table[current_process]['status'] = 0 # ready to use the CPU
-                            process_table[current_process]['start_time'] = int(1000*(time.time()-self.t0))
-                            process_table[current_process]['next_burst_time'] = current_proc_remaining_time
-                            process_queue.insert(current_process, current_proc_remaining_time) # run the remaining time next round
-                            process_table[k]['status'] = -1 # to avoid being polled io again
-                            preemption_flag = True
-                            preemption_process = k
-                            print "time %sms: Process '%s' preempted by Process '%s' [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, current_process, k) + ("%s"%list(process_queue.keys()))[1:]
-                        else:
-                            process_table[k]['status'] = 0 # ready to use the CPU
-                            process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                            process_queue.insert(k, process_table[k]['next_burst_time'])
-                            print "time %sms: Process '%s' completed I/O [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, k) + ("%s"%list(process_queue.keys()))[1:]
-        return preemption_process
-
-    def poll_io_rr(self, process_table, process_queue):
-        # check IO performance (two processes complete io at the same time?)
-        for k, v in process_table.items():
-            if v['status'] == 2: #blocked on (or performing) I/O
-                if int(1000*(time.time()-self.t0)) - v['start_time'] >= v['io_time']:
-                    process_table[k]['status'] = 0 # ready to use the CPU
-                    process_table[k]['start_time'] = int(1000*(time.time()-self.t0))
-                    process_table[k]['num_burst'] -= 1
-                    print "time %sms: Process '%s' completed I/O [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, k) + ("%s"%list(process_queue))[1:]
-                    process_queue.insert(k)
+                pcb.status = 0 # ready to use the CPU
+                pcb.start_time = self.clock
+                pcb.num_burst -= 1
+                policy.on_ready(process_queue, pcb)
+                self.recorder.ready(current_process, self.clock)
+
+    def requeue(self, pcb, process_queue):
+        # the running process goes back to the ready queue with the rest of its burst
+        if self.paging is not None:
+            self.paging.run(pcb, self.clock - pcb.start_time)
+        pcb.next_burst_time -= self.clock - pcb.start_time
+        self.leave_cpu(pcb.proc_num)
+        pcb.status = 0 # ready to use the CPU
+        pcb.start_time = self.clock
+        self.policy.on_ready(process_queue, pcb)
+        self.recorder.requeue(pcb.proc_num, self.clock)
+
+    def switch_cost(self, proc_num):
+        """
+        the time to switch to the process: t_cs_same if it left the CPU last,
+        t_cs otherwise, plus t_cs_cold scaled by how cold its caches have gone
+        since it left the CPU (fully cold if it never ran); None if the switch
+        is skipped (cs_skip_same)
+        """
+        same = proc_num == self.last_process
+        if same and self.cs_skip_same:
+            return None
+        t_cs = self.t_cs_same if same and self.t_cs_same is not None else self.t_cs
+        if self.t_cs_cold:
+            coldness = 1.0
+            if proc_num in self.cpu_left and self.cs_warmth_decay:
+                coldness = 1 - math.exp(-float(self.clock - self.cpu_left[proc_num]) / self.cs_warmth_decay)
+            t_cs += int(round(self.t_cs_cold * coldness))
+        return t_cs
+
+    def leave_cpu(self, proc_num):
+        # the running process gives up the CPU (end of the burst, slice, preemption, page fault)
+        self.last_process = proc_num
+        self.cpu_left[proc_num] = self.clock
+
+    def page_fault(self, pcb, process_queue):
+        # the running process references a page that is not resident, it blocks until the page is loaded
+        self.paging.run(pcb, self.clock - pcb.start_time)
+        pcb.next_burst_time -= self.clock - pcb.start_time
+        self.leave_cpu(pcb.proc_num)
+        page = self.paging.fault(pcb)
+        self.recorder.memory(self.clock, self.paging.total_units - self.paging.free_units())
+        self.sink.event(self.clock + self.t_pseudo_elapsed, 'page_fault', pcb.proc_num, process_queue, page=page)
+        pcb.status = 2 # blocked on (or performing) I/O
+        pcb.start_time = self.clock
+        self.start_io(pcb.proc_num, self.t_page_fault) # page-ins queue for the I/O devices as the I/O bursts do
+
+    def start_io(self, proc_num, io_time):
+        # the process blocks on I/O now, it completes after io_time unless it has to queue for a device
+        if self.io_system is None:
+            heapq.heappush(self.io_queue, (self.clock + io_time, proc_num))
+            return
+        for entry in self.io_system.start(self.clock, proc_num, io_time):
+            heapq.heappush(self.io_queue, entry)
+
+    def end_io(self, proc_num, t_io):
+        # the I/O of the process completed at t_io, its device channel serves the next request
+        if self.io_system is not None:
+            for entry in self.io_system.complete(t_io, proc_num):
+                heapq.heappush(self.io_queue, entry)
+
+    def poll_io(self, process_table, process_queue, running=None):
+        """
+        make the processes done with their I/O ready again, ties are broken
+        using process number order; return the first one the policy lets
+        preempt the running process (its PCB if any), None if none does
+        """
+        policy = self.policy
+        self.poll_policy(process_queue) # a boost due by now, e.g. in the middle of a slice
+        preempting = None # preemption occurs at most once in an io poll
+        while self.io_queue and self.io_queue[0][0] <= self.clock:
+            t_io, k = heapq.heappop(self.io_queue)
+            self.end_io(k, t_io)
+            pcb = process_table[k]
+            page = self.paging.loaded(k) if self.paging is not None else None
+            if page is not None: # a page fault was serviced, the burst goes on
+                self.page_fault_time += self.clock - pcb.start_time
+                self.recorder.requeue(k, self.clock)
+                event, info = 'page_in', {'page': page}
+            else:
+                self.recorder.ready(k, self.clock)
+                pcb.num_burst -= 1
+                event, info = 'io_done', {}
+            if running is not None and preempting is None and \
+                    policy.should_preempt(pcb, running, running.next_burst_time - (self.clock - running.start_time)):
+                # a preemption occurs
+                self.sink.event(self.clock + self.t_pseudo_elapsed, event, k, process_queue, **info)
+                self.requeue(running, process_queue)
+                pcb.status = -1 # dispatched right away, not queued
+                preempting = k
+                self.sink.event(self.clock + self.t_pseudo_elapsed, 'preempt', running.proc_num, process_queue, by=k)
+                continue
+            pcb.status = 0 # ready to use the CPU
+            pcb.start_time = self.clock
+            if policy.io_done_queued:
+                policy.on_ready(process_queue, pcb)
+                self.sink.event(self.clock + self.t_pseudo_elapsed, event, k, process_queue, **info)
+            else:
+                self.sink.event(self.clock + self.t_pseudo_elapsed, event, k, process_queue, **info)
+                policy.on_ready(process_queue, pcb)
+        return preempting
+
+    def poll_policy(self, process_queue):
+        if self.policy.on_schedule(process_queue, self.clock):
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'boost', None, process_queue)
 
     def new_arrival_proc(self, process_table, process_queue, memory_pool, placement_algo):
         """
         handle new incomming processes
         """
-        for proc_num, values in process_table.iteritems():
-            if values['status'] == 3 and values['arrival_time'] <= int(1000*(time.time()-self.t0)):
-                # allocatinig memory for the process
-                ret = self.memory_placement(memory_pool, [proc_num, values['memory']], placement_algo)
-                memory_graph = self.draw_mem_graph(memory_pool)
-                if ret == -1: # no suitable free partition is available
-                    print "time %sms: Process '%s' unable to be added; lack of memory"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, proc_num)
-                    print "time %sms: Starting defragmentation (suspending all processes)"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed)
-                    print "time %sms: Simulated Memory:"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed)
-                    print memory_graph
-                    # do defragmentation
-                    ret, moved_units = self.defragm()
-                    # simulate the elapsed time of defragmentation
-                    self.t_pseudo_elapsed += self.t_memmove * moved_units
-                    print "time %sms: Completed defragmentation (moved %s memory units)"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, moved_units)
-                    print "time %sms: Simulated Memory:"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed)
-                    print self.draw_mem_graph(memory_pool)
-                    if ret == 0:
-                        process_queue.insert(proc_num, values['burst_time']) # insert proc_num: cpu burst time
-                        process_table[proc_num]['status'] = 0 # ready to use the CPU
-                        print "time %sms: Process '%s' added to system [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, proc_num) + ("%s"%list(process_queue.keys()))[1:]
-                    else:
-                        raise "time %sms: defragmentation failed!"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed)
-                        # to do
-                else:
-                    process_queue.insert(proc_num, values['burst_time']) # insert proc_num: cpu burst time
-                    process_table[proc_num]['status'] = 0 # ready to use the CPU
-                    print "time %sms: Process '%s' added to system [Q "%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed, proc_num) + ("%s"%list(process_queue.keys()))[1:]
-                    print "time %sms: Simulated Memory:"%(int(1000*(time.time()-self.t0)) + self.t_pseudo_elapsed)
-                    print memory_graph
+        if self.next_arrival is None or self.next_arrival[1].arrival_time > self.clock:
+            return
+        arrived = []
+        while self.next_arrival is not None and self.next_arrival[1].arrival_time <= self.clock:
+            arrived.append(self.next_arrival)
+            self.pull_arrival()
+        for proc_num, values in sorted(arrived, key=lambda d:d[0]): # ties are broken using process number order
+            process_table[proc_num] = values
+            self.burst_count += values.num_burst
+            self.total_burst_time += values.burst_time*values.num_burst
+            if self.paging is None and values.memory > memory_pool.total_units:
+                raise ValueError("Process '%s' needs %s memory units, the pool only has %s"%(proc_num, values.memory, memory_pool.total_units))
+            if len(self.admission_queue): # the processes waiting for memory come first
+                self.wait_admission(proc_num, values, process_queue)
+                self.admit_waiting(process_table, process_queue, memory_pool, placement_algo)
+            elif not self.admit(process_table, process_queue, memory_pool, placement_algo, proc_num, values):
+                self.wait_admission(proc_num, values, process_queue)
+
+    def admit(self, process_table, process_queue, memory_pool, placement_algo, proc_num, values):
+        """
+        allocate the memory of the process, defragmenting it if need be, and
+        make the process ready; False if it does not fit even then
+        """
+        # allocatinig memory for the process
+        ret = self.memory_placement(memory_pool, [proc_num, values.memory], placement_algo)
+        placed = ret == 0
+        if not placed: # no suitable free partition is available
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'no_memory', proc_num)
+            if self.paging is not None or memory_pool.free_units() < values.memory: # moving partitions cannot help
+                return False
+            plan = self.defrag_plan(memory_pool, values.memory)
+            if plan[0] == -1: # no defragmentation takes place, nothing is logged
+                return False
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'defrag_start')
+            self.print_mem_graph(memory_pool)
+            # do defragmentation
+            ret, moved_units = self.defragm(memory_pool, [proc_num, values.memory], plan)
+            # simulate the elapsed time of defragmentation
+            self.t_pseudo_elapsed += self.t_memmove * moved_units
+            self.sink.event(self.clock + self.t_pseudo_elapsed, 'defrag_end', units=moved_units)
+            self.print_mem_graph(memory_pool)
+        process_table[proc_num].status = 0 # ready to use the CPU
+        process_table[proc_num].start_time = self.clock # waiting since its admission
+        self.policy.on_ready(process_queue, values)
+        self.recorder.ready(proc_num, self.clock)
+        self.recorder.memory(self.clock, memory_pool.total_units - memory_pool.free_units())
+        self.sink.event(self.clock + self.t_pseudo_elapsed, 'admit', proc_num, process_queue)
+        if placed:
+            self.print_mem_graph(memory_pool) # otherwise it was printed after the defragmentation
+        return True
+
+    def wait_admission(self, proc_num, values, process_queue):
+        # the process stays out of the system (status 3) until the memory can take it
+        self.admission_queue.push(proc_num, values.memory, self.clock)
+        self.admission_waits += 1
+        self.sink.event(self.clock + self.t_pseudo_elapsed, 'admission_wait', proc_num, process_queue,
+                        units=values.memory, waiting=len(self.admission_queue))
+
+    def admit_waiting(self, process_table, process_queue, memory_pool, placement_algo):
+        # admit the processes waiting for memory in order, for as long as the first one fits
+        queue = self.admission_queue
+        while len(queue):
+            proc_num, memory = queue.peek()
+            if (self.paging is None and memory_pool.free_units() < memory) or \
+                    not self.admit(process_table, process_queue, memory_pool, placement_algo, proc_num, process_table[proc_num]):
+                break
+            self.admission_wait_time += queue.pop(self.clock)
+
+    def advance_clock(self, process_table, deadline=None):
+        """
+        jump the virtual clock straight to the next event (an arrival, an I/O
+        completion or a deadline of the policy, e.g. an MLFQ boost) or to the
+        deadline, whichever comes first
+        """
+        t_next = deadline
+        if self.io_queue and (t_next is None or self.io_queue[0][0] < t_next):
+            t_next = self.io_queue[0][0]
+        if self.next_arrival is not None and (t_next is None or self.next_arrival[1].arrival_time < t_next):
+            t_next = self.next_arrival[1].arrival_time
+        if t_next is None: # the deadlines of the policy alone cannot keep the run going
+            raise RuntimeError("time %sms: no pending event"%(self.clock + self.t_pseudo_elapsed))
+        t_policy = self.policy.next_event()
+        if t_policy is not None and self.clock < t_policy < t_next:
+            t_next = t_policy
+        if t_next > self.clock:
+            self.clock = t_next
+
+    def pull_arrival(self):
+        # advance the look-ahead record of the arrival stream
+        last = self.next_arrival
+        self.next_arrival = next(self.arrival_stream, None)
+        if self.next_arrival is not None:
+            self.arrivals_pulled += 1
+        if last is not None and self.next_arrival is not None and self.next_arrival[1].arrival_time < last[1].arrival_time:
+            raise ValueError("Process '%s' arrives before Process '%s', the stream is not in arrival order"%(self.next_arrival[0], last[0]))
+
+    def snapshot(self, algo, placement_algo, process_table, process_queue, memory_pool):
+        """
+        the state of the run at a scheduling point, see snapshot.py
+        """
+        return {
+            'algo': algo,
+            'placement_algo': placement_algo,
+            'process_table': process_table,
+            'process_queue': process_queue,
+            'memory_pool': memory_pool,
+            'config': dict((name, getattr(self, name)) for name in self.config_keys),
+            'attrs': dict((name, getattr(self, name)) for name in self.snapshot_attrs),
+        }
+
+    def checkpoint(self, algo, placement_algo, process_table, process_queue, memory_pool):
+        # the log so far is flushed, so that it ends where a resumed run starts
+        self.sink.flush()
+        self.next_checkpoint = (self.clock / self.checkpoint_every + 1) * self.checkpoint_every
+        filename = self.checkpoint_file
+        if '%(t)' in filename:
+            filename = filename%{'t': self.clock + self.t_pseudo_elapsed}
+        snapshot.save(self.snapshot(algo, placement_algo, process_table, process_queue, memory_pool), filename)
+
+    def resume(self, state, source=None):
+        """
+        continue a run from a snapshot (or its file name) up to its end, and
+        return its results as run_proc does; source is the arrival stream the
+        run was started with, the loaded process table by default
+        """
+        if isinstance(state, basestring):
+            state = snapshot.load(state)
+        for name, value in state['config'].iteritems():
+            setattr(self, name, value)
+        for name, value in state['attrs'].iteritems():
+            setattr(self, name, value)
+        if source is None:
+            source = iter_arrivals(self.process_table)
+        # skip the records the run had already read
+        self.arrival_stream = itertools.islice(iter(source), self.arrivals_pulled, None)
+        return self.dispatch_run(state['algo'], state['process_table'], state['memory_pool'],
+                                 state['placement_algo'], state['process_queue'])
 
     def memory_placement(self, memory_pool, proc_info, algo):
-        _start = 0
-        last_used = -1
-        ret = -1
-        if algo == 'FirstFit':
-            for values in memory_pool.locator.values():
-                if values['start'] - _start >= proc_info[1]:
-                    memory_pool.locator[proc_info[0]] = {'start':_start, 'size':proc_info[1]}
-                    ret = 0
-                    break
-                else:
-                    _start = values['start'] + values['size']
-            if ret == -1:
-                last_used = values['start'] + values['size'] - 1 if len(memory_pool.locator) else -1
-                if memory_pool.units_per_line * memory_pool.line_num - last_used -1 >= proc_info[1]:
-                    memory_pool.locator[proc_info[0]] = {'start': last_used + 1, 'size': proc_info[1]}
-                    ret = 0
-        elif algo == 'NextFit':
-            if memory_pool.recent_proc and \
-                memory_pool.locator.has_key(memory_pool.recent_proc):
-                # if the most recently placed process has been terminated
-                # (i.e., the corresponding memory has been recycled,
-                # then we use FirstFit algo)
-                recent = memory_pool.locator[memory_pool.recent_proc]
-                _start = recent['start'] + recent['size']
-            for values in memory_pool.locator.values():
-                if values['start'] <= _start:
-                    continue
-                if values['start'] - _start >= proc_info[1]:
-                    memory_pool.locator[proc_info[0]] = {'start':_start, 'size':proc_info[1]}
-                    memory_pool.recent_proc = proc_info[0]
-                    ret = 0
-                    break
-                else:
-                    _start = values['start'] + values['size']
-            if ret == -1:
-                last_used = values['start'] + values['size'] - 1 if len(memory_pool.locator) else -1
-                if memory_pool.units_per_line * memory_pool.line_num - last_used -1 >= proc_info[1]:
-                    memory_pool.locator[proc_info[0]] = {'start': last_used + 1, 'size': proc_info[1]}
-                    memory_pool.recent_proc = proc_info[0]
-                    ret = 0
-        elif algo == 'BestFit':
-            best_start = 0
-            min_internal_fragm = float('inf')
-            for values in memory_pool.locator.values():
-                internal_fragm = values['start'] - _start - proc_info[1]
-                if internal_fragm >= 0:
-                    if min_internal_fragm > internal_fragm:
-                        min_internal_fragm = internal_fragm
-                        best_start = _start
-                    ret = 0
-                _start = values['start'] + values['size']
-            if ret == -1:
-                last_used = values['start'] + values['size'] - 1 if len(memory_pool.locator) else -1
-                if memory_pool.units_per_line * memory_pool.line_num - last_used -1 >= proc_info[1]:
-                    memory_pool.locator[proc_info[0]] = {'start': last_used + 1, 'size': proc_info[1]}
-                    ret = 0
-            else:
-                memory_pool.locator[proc_info[0]] = {'start': best_start, 'size': proc_info[1]}
-        else:
-            raise ValueError('invalid memory placement arg: %s'%algo)
-
-        if ret == 0: # reorder
-            memory_pool.locator = OrderedDict(sorted(memory_pool.locator.iteritems(), key=lambda d:d[1]['start']))
-        return ret
-
-    def defragm(self, memory_pool, proc_info):
-        _start = 0
-        ret = -1
-        moved_units = 0
-        for proc_num, values in memory_pool.locator.items():
-            if memory_pool.locator[proc_num]['start'] > _start:
-                memory_pool.locator[proc_num]['start'] = _start
-                moved_units += values['size']
-            _start = memory_pool.locator[proc_num]['start'] + values['size']
-        # allocate memory for the new process
-        if memory_pool.units_per_line * memory_pool.line_num - _start >= proc_info[1]:
-            memory_pool.locator[proc_info[0]] = {'start': _start, 'size': proc_info[1]}
-            # reorder
-            memory_pool.locator = OrderedDict(sorted(memory_pool.locator.iteritems(), key=lambda d:d[1]['start']))
-            ret = 0
-        return ret, moved_units
+        if memory_pool.allocate(proc_info[0], proc_info[1], algo) == -1:
+            return -1
+        return 0
 
-    def recycle_memory(self, memory_pool, proc_num):
-        del memory_pool.locator[proc_num]
-
-    def draw_mem_graph(self, memory_pool):
-        # draw memory graph
-        body = [ '.' for x in range(memory_pool.line_num * memory_pool.units_per_line)]
-        # body = [memory_pool.units_per_line * '.' for x in range(memory_pool.line_num)]
-        for proc_num, values in memory_pool.locator.items():
-            body[values['start'] : values['start'] + values['size']] = [str(proc_num) for x in range(values['size'])]
-
-        body2 = []
-        for i in range(memory_pool.line_num):
-            body2.extend(body[i * memory_pool.units_per_line: (i + 1) * memory_pool.units_per_line] + ['\r\n'])
-        body2 = ''.join(body2)
-        memory_graph = memory_pool.units_per_line * '=' + '\r\n' + \
-                            body2 + memory_pool.units_per_line * '='
-        return memory_graph
+    def defrag_plan(self, memory_pool, size):
+        # (hole_start, moves) of the defrag_algo strategy, see defrag.py
+        if self.defrag_algo not in defrag_algos:
+            raise ValueError('invalid defragmentation arg: %s'%self.defrag_algo)
+        return defrag_algos[self.defrag_algo](memory_pool, size)
 
+    def defragm(self, memory_pool, proc_info, plan=None):
+        """
+        open a hole for the process with the defrag_algo strategy (or the plan
+        made for it already) and place it there,
+        return (0 or -1 if the process still does not fit, memory units moved)
+        """
+        hole_start, moves = plan or self.defrag_plan(memory_pool, proc_info[1])
+        if hole_start == -1: # moving partitions cannot help
+            return -1, 0
+        moved_units = apply_moves(memory_pool, moves)
+        memory_pool.place(proc_info[0], hole_start, proc_info[1])
+        self.defrag_count += 1
+        self.defrag_moved_units += moved_units
+        return 0, moved_units
+
+    def defrag_idle(self, memory_pool, t_idle):
+        # Incremental: compact as many units as the idle CPU time allows, no process is suspended
+        if self.defrag_algo == 'Incremental' and t_idle > 0 and self.paging is None:
+            self.defrag_idle_units += compact_step(memory_pool, t_idle / self.t_memmove)
+
+    def run_stats(self, algo, placement_algo, avg_burst_time):
+        # the results of the last run, as returned by run_proc
+        stats = OrderedDict([
+            ('algo', algo),
+            ('placement_algo', placement_algo),
+            ('end_time', self.clock + self.t_pseudo_elapsed),
+            ('avg_burst_time', avg_burst_time),
+            ('avg_wait_time', self.avg_wait_time),
+            ('avg_turnaround_time', self.avg_turnaround_time),
+            ('switch_count', self.switch_count),
+            ('switch_time', self.switch_time),
+            ('switches_skipped', self.switches_skipped),
+            ('defrag_count', self.defrag_count),
+            ('defrag_moved_units', self.defrag_moved_units),
+            ('defrag_idle_units', self.defrag_idle_units),
+            ('page_fault_time', self.page_fault_time),
+            ('admission_waits', self.admission_waits),
+            ('admission_wait_time', self.admission_wait_time),
+        ])
+        # the paging columns are there in contiguous mode too (zeros), so that the rows of a batch line up
+        stats.update(self.paging.stats() if self.paging is not None else PagedMemory.empty_stats())
+        stats.update(summarize(self.recorder, self.clock, self.total_burst_time, self.mem_units_per_line * self.mem_line_num))
+        if self.io_system is not None:
+            for device in self.io_system.devices:
+                for name, value in device.stats(self.clock).iteritems():
+                    stats['io_%s_%s'%(device.name, name)] = value
+        return stats
+
+    def print_switch_stats(self):
+        # only when the switch costs differ from t_cs
+        if self.switch_time != self.t_cs*self.switch_count or self.switches_skipped:
+            print "-- context switch time: %s ms (%.2f ms per switch), %s switches skipped"%(
+                    self.switch_time, float(self.switch_time) / self.switch_count if self.switch_count else 0.0,
+                    self.switches_skipped)
+
+    def print_defrag_stats(self):
+        if self.defrag_count or self.defrag_idle_units:
+            print "-- defragmentation (%s): %s runs, %s units moved, %s ms stalled, %s units moved while idle"%(
+                    self.defrag_algo, self.defrag_count, self.defrag_moved_units,
+                    self.t_memmove * self.defrag_moved_units, self.defrag_idle_units)
+
+    def print_io_stats(self):
+        if self.io_system is not None:
+            for line in self.io_system.report(self.clock):
+                print line
+
+    def print_paging_stats(self):
+        if self.paging is not None:
+            stats = self.paging.stats()
+            print "-- paging (%s, %s frames): %s page faults, %s evictions, %.2f%% fault rate, %.2f%% TLB hit rate, %s ms blocked"%(
+                    self.paging.algo, self.paging.frame_num, stats['page_faults'], stats['page_evictions'],
+                    100 * stats['page_fault_rate'], 100 * stats['tlb_hit_rate'], self.page_fault_time)
+
+    def print_admission_stats(self):
+        if self.admission_waits:
+            print "-- admission (%s): %s processes waited for memory, %s ms in total"%(
+                    self.admission_order, self.admission_waits, self.admission_wait_time)
+
+    def print_percentiles(self, stats):
+        if self.report_percentiles:
+            for name in ('wait', 'burst_turnaround', 'proc_turnaround'):
+                print "-- %s time p50/p95/p99: %.2f/%.2f/%.2f ms"%(name.replace('_', ' '),
+                        stats['p50_%s'%name], stats['p95_%s'%name], stats['p99_%s'%name])
+            print "-- throughput: %.2f processes/s, CPU utilization: %.2f%%, memory utilization: %.2f%% (peak %.2f%%)"%(
+                    stats['throughput'], 100 * stats['cpu_utilization'],
+                    100 * stats['mem_utilization'], 100 * stats['peak_mem_utilization'])
 
-class MemPool(object):
-    def __init__(self, units_per_line, line_num):
-        super(MemPool, self).__init__()
-        self.units_per_line = units_per_line
-        self.line_num = line_num
-        self.locator = OrderedDict()
-        self.recent_proc = None
-
-class Queue(deque):
-    def __init__(self):
-        super(Queue, self).__init__()
+    def recycle_memory(self, memory_pool, proc_num):
+        memory_pool.free(proc_num)
+        self.recorder.memory(self.clock, memory_pool.total_units - memory_pool.free_units())
 
-    def insert(self, k, v=None):
+    def draw_mem_graph(self, memory_pool, first_line=0, num_lines=None):
         """
-        just for compatibility
+        draw lines [first_line, first_line + num_lines) of the memory graph
+        from the run-length segments of the pool, all lines by default; one
+        cell per unit, the first character of the proc-num (e.g. '1' for 123)
         """
-        self.append(k)
+        units_per_line = memory_pool.units_per_line
+        if num_lines is None:
+            num_lines = memory_pool.line_num - first_line
+        lo = first_line * units_per_line
+        hi = min(lo + num_lines * units_per_line, memory_pool.total_units)
+        body2 = ''
+        for line_lo in xrange(lo, hi, units_per_line):
+            segments = memory_pool.segments(line_lo, min(line_lo + units_per_line, hi))
+            body2 += ''.join(('.' if proc_num is None else str(proc_num)[0]) * size for start, size, proc_num in segments) + '\r\n'
+        memory_graph = units_per_line * '=' + '\r\n' + \
+                            body2 + units_per_line * '='
+        return memory_graph
 
-    def keys(self):
-        return list(self)
+    def print_mem_graph(self, memory_pool):
+        # the graph is only rendered for a text log, mem_graph_lines limits it to a window
+        if self.mem_graph_lines == 0 or not self.sink.renders_text:
+            return
+        self.sink.write("time %sms: Simulated Memory:"%(self.clock + self.t_pseudo_elapsed))
+        self.sink.write(self.draw_mem_graph(memory_pool, 0, self.mem_graph_lines))
 
 if __name__ == '__main__':
     import sys
@@ -429,14 +768,15 @@ if __name__ == '__main__':
         # print "ERROR: please input the filename"
         # exit()
     bos.load_process(in_file)
-    bos.run_proc('SRT', 'FirstFit')
-    print '\n'
-    bos.run_proc('SRT', 'NextFit')
-    print '\n'
-    bos.run_proc('SRT', 'BestFit')
-    print '\n'
-    bos.run_proc('RR', 'FirstFit')
-    print '\n'
-    bos.run_proc('RR', 'NextFit')
-    print '\n'
-    bos.run_proc('RR', 'BestFit')
+    if len(sys.argv) > 2:
+        bos.load_config(sys.argv[2])
+    if len(sys.argv) > 3:
+        bos.sink = make_sink(sys.argv[3], bos.event_formats) # text, jsonl:<file> or none
+    if bos.memory_mode == 'paged':
+        placement_algos = PagedMemory.replacement_algos
+    else:
+        placement_algos = ('FirstFit', 'NextFit', 'BestFit')
+    for i, (algo, placement_algo) in enumerate(itertools.product(('SRT', 'RR'), placement_algos)):
+        if i:
+            print '\n'
+        bos.run_proc(algo, placement_algo)
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+
+"""
+run the simulator over a grid of workloads x algorithms x placement
+algorithms x parameters on a multiprocessing pool, and write a single
+results table (csv), one row per combination, e.g.
+
+    python batch_run.py processes.txt --algos SRT RR --t-slice 40 80 160 -o results.csv
+    python batch_run.py processes.txt --algos RR --t-slice 20 40 80 160 --t-cs-cold 0 20 40
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
+from baseos import BaseOS
+from mem_pool import MemPool
+from paging import PagedMemory
+from defrag import defrag_algos
+from events import EventSink
+
+# grid axes that map onto BaseOS attributes
+PARAM_AXES = ('t_cs', 't_cs_same', 't_cs_cold', 't_slice', 't_memmove', 'defrag_algo')
+
+def make_jobs(workloads, algos, placement_algos, params, config=None, stream=False):
+    """
+    the cartesian product of the axes, params is {attribute: [values]}
+    """
+    axes = [(name, params[name]) for name in PARAM_AXES if params.get(name)]
+    jobs = []
+    for workload, algo, placement_algo in itertools.product(workloads, algos, placement_algos):
+        for values in itertools.product(*[each_values for name, each_values in axes]):
+            job = OrderedDict([('workload', workload), ('algo', algo), ('placement_algo', placement_algo)])
+            job.update(zip([name for name, each_values in axes], values))
+            job['config'] = config
+            job['stream'] = stream
+            jobs.append(job)
+    return jobs
+
+def run_job(job):
+    """
+    run one combination with the event log discarded, return its results row
+    """
+    bos = BaseOS()
+    bos.sink = EventSink() # events are not even formatted
+    source = None
+    if job['stream']: # the file is in arrival order, read it as the simulation goes
+        source = bos.iter_process(job['workload'])
+    else:
+        bos.load_process(job['workload'])
+    if job['config']:
+        bos.load_config(job['config'])
+    for name in PARAM_AXES:
+        if name in job:
+            setattr(bos, name, job[name])
+    if job['placement_algo'] in PagedMemory.replacement_algos:
+        bos.memory_mode = 'paged'
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    t0 = time.time()
+    try:
+        stats = bos.run_proc(job['algo'], job['placement_algo'], source)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    row = OrderedDict((k, job[k]) for k in ('workload', 'algo', 'placement_algo'))
+    for name in PARAM_AXES:
+        row[name] = getattr(bos, name)
+    row.update(stats)
+    row['wall_ms'] = 1000*(time.time() - t0)
+    return row
+
+def run_batch(jobs, processes=None):
+    if processes == 1:
+        return map(run_job, jobs)
+    pool = Pool(processes or cpu_count())
+    try:
+        # imap keeps the job order, chunks amortize the IPC of short runs
+        return list(pool.imap(run_job, jobs, chunksize=max(1, len(jobs) / (8 * (processes or cpu_count())))))
+    finally:
+        pool.close()
+        pool.join()
+
+def write_table(rows, out):
+    if not rows:
+        return
+    writer = csv.writer(out)
+    writer.writerow(rows[0].keys())
+    for row in rows:
+        writer.writerow([('%.2f'%v if isinstance(v, float) else v) for v in row.values()])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='batch simulation runner')
+    parser.add_argument('workloads', nargs='+', help='process files')
+    parser.add_argument('--algos', nargs='+', default=['SRT', 'RR'])
+    parser.add_argument('--placements', nargs='+', default=['FirstFit', 'NextFit', 'BestFit'], choices=MemPool.placement_algos + PagedMemory.replacement_algos,
+                        help='placement algorithms, or page replacement ones for paged memory')
+    parser.add_argument('--t-cs', nargs='+', type=int)
+    parser.add_argument('--t-cs-same', nargs='+', type=int)
+    parser.add_argument('--t-cs-cold', nargs='+', type=int)
+    parser.add_argument('--t-slice', nargs='+', type=int)
+    parser.add_argument('--t-memmove', nargs='+', type=int)
+    parser.add_argument('--defrag-algos', nargs='+', choices=sorted(defrag_algos))
+    parser.add_argument('--config', help='base configuration file, see config.txt')
+    parser.add_argument('--stream', action='store_true', help='stream the workloads (in arrival order) instead of loading them')
+    parser.add_argument('-j', '--jobs', type=int, help='worker processes, all CPUs by default')
+    parser.add_argument('-o', '--output', default='-', help='results csv, stdout by default')
+    args = parser.parse_args()
+
+    params = {'t_cs': args.t_cs, 't_cs_same': args.t_cs_same, 't_cs_cold': args.t_cs_cold, 't_slice': args.t_slice, 't_memmove': args.t_memmove, 'defrag_algo': args.defrag_algos}
+    jobs = make_jobs(args.workloads, args.algos, args.placements, params, args.config, args.stream)
+    t0 = time.time()
+    rows = run_batch(jobs, args.jobs)
+    if args.output == '-':
+        write_table(rows, sys.stdout)
+    else:
+        with open(args.output, 'wb') as out:
+            write_table(rows, out)
+    sys.stderr.write('%s runs in %.2f s\n'%(len(rows), time.time() - t0))
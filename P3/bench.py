@@ -0,0 +1,173 @@
+#!/usr/bin/python
+
+"""
+benchmark suite: IndexMinPQ, memory placement, defragmentation and the
+scheduler loops on fixed-seed workloads of increasing size, see ../benchmark.py
+
+    python bench.py -o before.json
+    python bench.py -o after.json --max-procs 1000000 --max-units 16777216
+    python bench.py --compare before.json after.json
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import argparse
+from collections import OrderedDict
+from baseos import BaseOS
+from mem_pool import MemPool
+from defrag import defrag_algos
+from events import EventSink
+from indexed_priority_queue import IndexMinPQ
+from workload import Workload
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)) # ../benchmark.py
+from benchmark import timed, run_benchmarks, save, load, compare
+
+PROC_SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+UNIT_SIZES = (256, 4096, 65536, 1048576, 16777216)
+UNITS_PER_LINE = 256
+
+class CountingSink(EventSink):
+    def __init__(self):
+        super(CountingSink, self).__init__()
+        self.count = 0
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        self.count += 1
+
+
+def bench_pq(size, seed, compact=False):
+    # insert size random keys, change half of them, delMin them all
+    r = random.Random(seed)
+    keys = [r.randint(0, 1 << 20) for i in xrange(size)]
+    changed = [(r.randrange(size), r.randint(0, 1 << 20)) for i in xrange(size / 2)]
+    def op():
+        pq = IndexMinPQ(size if compact else None)
+        for k, key in enumerate(keys):
+            pq.insert(k, key)
+        for k, key in changed:
+            pq.change(k, key)
+        while not pq.isEmpty():
+            pq.delMin()
+    seconds, result = timed(op)
+    return OrderedDict([('ops_per_s', (2 * size + len(changed)) / seconds)])
+
+def random_block(r):
+    return r.randint(1, 64)
+
+def filled_pool(size, r, fill=0.9):
+    memory_pool = MemPool(min(size, UNITS_PER_LINE), max(1, size / UNITS_PER_LINE))
+    proc_num = 0
+    while memory_pool.free_units() > (1 - fill) * memory_pool.total_units:
+        block = min(random_block(r), memory_pool.largest_hole())
+        memory_pool.allocate(proc_num, block, 'FirstFit')
+        proc_num += 1
+    return memory_pool, proc_num
+
+def bench_placement(size, seed, algo='FirstFit', ops=20000):
+    # steady state of a 90% full pool: free a random process, place a new one
+    bos = BaseOS()
+    def setup():
+        r = random.Random(seed)
+        memory_pool, proc_num = filled_pool(size, r)
+        requests = [(proc_num + i, r.random(), random_block(r)) for i in xrange(ops)]
+        return memory_pool, memory_pool.locator.keys(), requests
+    def op(state):
+        memory_pool, resident, requests = state
+        failed = 0
+        for proc_num, x, block in requests:
+            j = int(x * len(resident))
+            memory_pool.free(resident[j])
+            resident[j] = resident[-1]
+            resident.pop()
+            if bos.memory_placement(memory_pool, [proc_num, block], algo) == -1:
+                failed += 1
+            else:
+                resident.append(proc_num)
+        return failed
+    seconds, failed = timed(op, setup, max_time=5.0)
+    return OrderedDict([('ops_per_s', ops / seconds), ('failed', failed)])
+
+def bench_defrag(size, seed, algo='Full'):
+    # one defragmentation of a full pool with every other process freed
+    bos = BaseOS()
+    bos.defrag_algo = algo
+    def setup():
+        memory_pool, proc_num = filled_pool(size, random.Random(seed), fill=1.0)
+        for i in xrange(0, proc_num, 2):
+            memory_pool.free(i)
+        return memory_pool, [proc_num, min(2 * memory_pool.largest_hole(), memory_pool.free_units())]
+    def op(state):
+        return bos.defragm(*state)[1]
+    seconds, moved_units = timed(op, setup, max_time=2.0) # the setup dominates on big pools
+    return OrderedDict([('ops_per_s', 1 / seconds), ('units_per_s', moved_units / seconds), ('moved_units', moved_units)])
+
+def bench_loop(size, seed, algo='SRT', workdir=None):
+    # a whole run streamed from a generated file, the events are counted but not formatted
+    filename = os.path.join(workdir, 'p3_%s_%s.txt'%(size, seed))
+    if not os.path.exists(filename):
+        with open(filename, 'w') as f:
+            Workload(size, seed, {'interarrival': 'exp:1000', 'memory': 'uniform:1:16'}).write(f, 'P3')
+    bos = BaseOS()
+    bos.mem_graph_lines = 0
+    bos.mem_line_num = 32 # 1024 units
+    def op():
+        bos.sink = CountingSink()
+        bos.run_proc(algo, 'FirstFit', bos.iter_process(filename))
+        return bos.sink.count
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        seconds, events = timed(op)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return OrderedDict([('events_per_s', events / seconds), ('events', events)])
+
+def make_jobs(max_procs, max_units, seed, workdir):
+    jobs = []
+    for size in [n for n in PROC_SIZES if n <= max_procs]:
+        jobs.append(('pq/IndexMinPQ', bench_pq, size, seed, {}))
+        jobs.append(('pq/IndexMinPQ-compact', bench_pq, size, seed, {'compact': True}))
+    for size in [n for n in UNIT_SIZES if n <= max_units]:
+        for algo in MemPool.placement_algos:
+            jobs.append(('placement/%s'%algo, bench_placement, size, seed, {'algo': algo}))
+        for algo in sorted(defrag_algos):
+            if algo != 'Incremental': # same plan as LowEnd
+                jobs.append(('defrag/%s'%algo, bench_defrag, size, seed, {'algo': algo}))
+    for size in [n for n in PROC_SIZES if n <= max_procs]:
+        for algo in ('SRT', 'RR', 'MLFQ'):
+            jobs.append(('loop/%s'%algo, bench_loop, size, seed, {'algo': algo, 'workdir': workdir}))
+    return jobs
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='simulator benchmarks')
+    parser.add_argument('--max-procs', type=int, default=10000, help='largest workload, up to %s'%PROC_SIZES[-1])
+    parser.add_argument('--max-units', type=int, default=1048576, help='largest memory pool, up to %s'%UNIT_SIZES[-1])
+    parser.add_argument('--only', nargs='+', help='run the benchmarks whose name contains one of these')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--inline', action='store_true', help='no worker process per benchmark (peak memory is cumulative)')
+    parser.add_argument('-o', '--output', help='results json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='flag the regressions of NEW against OLD')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change flagged by --compare')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load(args.compare[0]), load(args.compare[1]), args.threshold)
+        for name, size, metric, old_value, new_value, change in regressions:
+            print "REGRESSION %s %s %s: %.0f -> %.0f (%+.1f%%)"%(name, size, metric, old_value, new_value, 100 * change)
+        print "%s regressions"%len(regressions)
+        sys.exit(1 if regressions else 0)
+
+    workdir = tempfile.mkdtemp(prefix='bench')
+    try:
+        jobs = make_jobs(args.max_procs, args.max_units, args.seed, workdir)
+        if args.only:
+            jobs = [job for job in jobs if any(x in job[0] for x in args.only)]
+        rows = run_benchmarks(jobs, not args.inline)
+    finally:
+        shutil.rmtree(workdir)
+    if args.output:
+        save(rows, args.output, args.seed)
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+
+"""
+defragmentation strategies for MemPool
+
+each plan_* function looks for a way to open a hole of at least `size`
+contiguous units without touching the pool, and returns (hole_start, moves):
+moves is the list of (proc-num, new start) to apply in order, hole_start is
+where the hole will begin afterwards (-1 if the strategy cannot open one)
+the cost of a plan is the number of units it moves, see moved_units()
+"""
+
+def plan_full(memory_pool, size):
+    """
+    slide every partition toward address 0 (the original defragmentation)
+    """
+    _start = 0
+    moves = []
+    for start, psize, proc_num in memory_pool.partitions():
+        if start > _start:
+            moves.append((proc_num, _start))
+        _start += psize
+    if memory_pool.total_units - _start >= size:
+        return _start, moves
+    return -1, moves
+
+def plan_low_end(memory_pool, size):
+    """
+    slide partitions toward address 0 in address order,
+    stop as soon as the hole behind the compacted ones is large enough
+    """
+    _start = 0
+    moves = []
+    for start, psize, proc_num in memory_pool.partitions():
+        if start - _start >= size:
+            return _start, moves
+        if start > _start:
+            moves.append((proc_num, _start))
+        _start += psize
+    if memory_pool.total_units - _start >= size:
+        return _start, moves
+    return -1, moves
+
+def plan_high_end(memory_pool, size):
+    """
+    slide partitions toward the top of the pool in reverse address order,
+    stop as soon as the hole below the compacted ones is large enough
+    """
+    _end = memory_pool.total_units
+    moves = []
+    for start, psize, proc_num in reversed(list(memory_pool.partitions())):
+        if _end - (start + psize) >= size:
+            return _end - size, moves
+        if start + psize < _end:
+            moves.append((proc_num, _end - psize))
+        _end -= psize
+    if _end >= size:
+        return _end - size, moves
+    return -1, moves
+
+def plan_smallest(memory_pool, size):
+    """
+    pick the window of consecutive segments with the fewest resident units
+    whose partitions can be moved into the holes outside of it,
+    then slide only those (smallest) blocks out of the way; a full compaction
+    if no window can be cleared (the holes outside are too small)
+    """
+    segs = list(memory_pool.segments())
+    candidates = []
+    j = 0
+    length = 0
+    used = 0
+    for i in range(len(segs)):
+        while j < len(segs) and length < size:
+            length += segs[j][1]
+            if segs[j][2] is not None:
+                used += segs[j][1]
+            j += 1
+        if length < size:
+            break
+        candidates.append((used, segs[i][0], i, j))
+        length -= segs[i][1]
+        if segs[i][2] is not None:
+            used -= segs[i][1]
+    for used, hole_start, i, j in sorted(candidates):
+        moves = _evict(segs, i, j)
+        if moves is not None:
+            return hole_start, moves
+    return plan_full(memory_pool, size)
+
+def plan_cheapest(memory_pool, size):
+    """
+    the plan moving the fewest units among all the strategies above
+    """
+    best = (-1, [])
+    best_cost = None
+    for plan in (plan_low_end, plan_high_end, plan_smallest, plan_full):
+        hole_start, moves = plan(memory_pool, size)
+        if hole_start == -1:
+            continue
+        cost = moved_units(memory_pool, moves)
+        if best_cost is None or cost < best_cost:
+            best, best_cost = (hole_start, moves), cost
+    return best
+
+def moved_units(memory_pool, moves):
+    return sum(memory_pool.locator[proc_num]['size'] for proc_num, new_start in moves)
+
+def apply_moves(memory_pool, moves):
+    units = 0
+    for proc_num, new_start in moves:
+        units += memory_pool.locator[proc_num]['size']
+        memory_pool.move(proc_num, new_start)
+    return units
+
+def compact_step(memory_pool, budget):
+    """
+    incremental compaction toward address 0 moving at most `budget` units,
+    whole partitions only, return the units actually moved
+    """
+    _start = 0
+    units = 0
+    for start, psize, proc_num in list(memory_pool.partitions()):
+        if start > _start:
+            if psize > budget - units:
+                break
+            memory_pool.move(proc_num, _start)
+            units += psize
+        _start += psize
+    return units
+
+# Incremental compacts in the background while the CPU is idle (see
+# BaseOS.defrag_idle) and falls back to LowEnd when a placement still fails
+defrag_algos = {
+    'Full': plan_full,
+    'LowEnd': plan_low_end,
+    'HighEnd': plan_high_end,
+    'Smallest': plan_smallest,
+    'Cheapest': plan_cheapest,
+    'Incremental': plan_low_end,
+}
+
+def _evict(segs, i, j):
+    # move the partitions of segs[i:j] into the holes outside of it,
+    # largest first, each into the smallest hole that fits
+    holes = [[start, size] for k, (start, size, proc_num) in enumerate(segs) if proc_num is None and not i <= k < j]
+    moves = []
+    for start, size, proc_num in sorted([seg for seg in segs[i:j] if seg[2] is not None], key=lambda seg: -seg[1]):
+        fits = [hole for hole in holes if hole[1] >= size]
+        if not fits:
+            return None
+        hole = min(fits, key=lambda hole: (hole[1], hole[0]))
+        moves.append((proc_num, hole[0]))
+        hole[0] += size
+        hole[1] -= size
+    return moves
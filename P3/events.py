@@ -0,0 +1,127 @@
+#!/usr/bin/python
+
+"""
+event sinks of the simulator
+
+BaseOS reports every event as sink.event(t, name, proc, queue, **data)
+instead of printing it, the sink decides what (if anything) to format:
+    EventSink: drops the events, only the statistics are printed ("stats only")
+    TextSink:  today's log lines, rendered from a {name: format} table and
+               written in batches, the ready queue is only listed if the
+               format shows it
+    JsonlSink: one JSON object per event, the ready queue only on request
+the batches are written on flush(), which BaseOS calls once a run ends, be it
+normally or with an error; make_sink() picks the sink of an event_log setting
+"""
+
+import sys
+import json
+
+class EventSink(object):
+    """
+    null sink, also the base class of the others
+    """
+    renders_text = False # whether write() output (e.g. memory graphs) is kept
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        pass
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+def queue_keys(queue):
+    # the ready queue in dispatch order, whatever its type
+    return queue.keys() if hasattr(queue, 'keys') else list(queue)
+
+
+class TextSink(EventSink):
+    """
+    formats: {event name: format}, formats use %(t)s, %(proc)s, %(q)s and the
+    event data; out is resolved at every flush (sys.stdout by default) so that
+    redirecting sys.stdout still works
+    """
+    renders_text = True
+
+    def __init__(self, formats, out=None, buffer_lines=4096):
+        super(TextSink, self).__init__()
+        self.formats = formats
+        self.shows_queue = dict((name, '%(q)' in fmt) for name, fmt in formats.iteritems())
+        self.out = out
+        self.buffer_lines = buffer_lines
+        self.lines = []
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        data['t'] = t
+        data['proc'] = proc
+        if self.shows_queue[name]:
+            data['q'] = ("%s"%queue_keys(queue))[1:]
+        self.write(self.formats[name]%data)
+
+    def write(self, text):
+        self.lines.append(text)
+        if len(self.lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            out = self.out or sys.stdout
+            out.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+
+
+class JsonlSink(EventSink):
+    """
+    structured log: {"t", "event", "proc", [ "q", ] data...} per line
+    """
+    def __init__(self, out, with_queue=False, buffer_lines=4096):
+        super(JsonlSink, self).__init__()
+        self.out = out
+        self.with_queue = with_queue
+        self.buffer_lines = buffer_lines
+        self.lines = []
+        self.encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        data['t'] = t
+        data['event'] = name
+        if proc is not None:
+            data['proc'] = proc
+        if self.with_queue and queue is not None:
+            data['q'] = queue_keys(queue)
+        self.lines.append(self.encode(data))
+        if len(self.lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.out.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+
+    def close(self):
+        self.flush()
+        if self.out is not sys.stdout:
+            self.out.close()
+
+
+def make_sink(spec, formats):
+    """
+    the sink of an event_log setting:
+        text            the log lines on stdout (the default)
+        jsonl:<file>    one JSON object per event in <file>, '-' for stdout
+        none            no log, only the statistics
+    """
+    if spec is None or spec == 'text':
+        return TextSink(formats)
+    if spec == 'none':
+        return EventSink()
+    if spec.startswith('jsonl:'):
+        filename = spec[len('jsonl:'):]
+        return JsonlSink(sys.stdout if filename == '-' else open(filename, 'w'))
+    raise ValueError('invalid event log arg: %s'%spec)
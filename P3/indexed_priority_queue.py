@@ -1,13 +1,51 @@
 #!/usr/bin/python
 
+from array import array
+
+def default_rank(k, key):
+    # a module function rather than a lambda, so that the queue can be pickled (snapshots)
+    return (key, k)
+
 class IndexMinPQ(object):
     """docstring for resizing IndexMinPQ:
     does not support repeated indices (k)
+
+    max_n: if given, indices are integers in [0, max_n) (the range grows on
+           demand) and the index is stored in compact arrays instead of dicts
+    key:   function (k, key) -> value actually compared, the default (key, k)
+           breaks ties using the index order; a tuple key works the same way
     """
-    def __init__(self):
-        self.__pq = [0] # store indices (k)
-        self.__qp = {None:0} # store {index:sequence num}
-        self.__keys = {} # store {index:element}
+    def __init__(self, max_n=None, key=None):
+        self.__max_n = max_n
+        self.__rank = key if key is not None else default_rank
+        if max_n is None:
+            self.__pq = [None] # store indices (k), 1-based
+            self.__qp = {} # store {index:sequence num}
+            self.__keys = {} # store {index:element}
+            self.__ranks = {} # store {index:compared value}
+        else:
+            self.__pq = array('l', [0])
+            self.__qp = array('l', [0]) * max_n # 0 means not on the queue
+            self.__keys = [None] * max_n
+            self.__ranks = [None] * max_n
+
+    @classmethod
+    def heapify(cls, items, max_n=None, key=None):
+        """
+        bulk construction from (k, key) pairs in O(n)
+        """
+        impq = cls(max_n, key)
+        for k, each_key in items:
+            if impq.contains(k):
+                raise ValueError("Repeated index: %s"%k)
+            impq.__reserve(k)
+            impq.__pq.append(k)
+            impq.__qp[k] = impq.size()
+            impq.__keys[k] = each_key
+            impq.__ranks[k] = impq.__rank(k, each_key)
+        for i in range(impq.size()/2, 0, -1):
+            impq.__sink(i)
+        return impq
 
     def isEmpty(self):
         return len(self.__pq) - 1 == 0
@@ -15,59 +53,109 @@ class IndexMinPQ(object):
     def size(self):
         return len(self.__pq) - 1
 
-    def constains(self, k):
-        return k in self.__qp
+    def contains(self, k):
+        if self.__max_n is None:
+            return k in self.__qp
+        return 0 <= k < len(self.__qp) and self.__qp[k] != 0
+
+    constains = contains # former (misspelled) name
 
     def insert(self, k, key):
+        if self.contains(k):
+            raise ValueError("Repeated index: %s"%k)
+        self.__reserve(k)
         self.__pq.append(k)
         N = self.size()
         self.__qp[k] = N
         self.__keys[k] = key
+        self.__ranks[k] = self.__rank(k, key)
         self.__swim(N)
 
     def change(self, k, key):
+        if not self.contains(k):
+            raise ValueError("Invalid index: %s"%k)
+        t = self.__qp[k]
         self.__keys[k] = key
-        t = self.__qp.get(k)
-        if t is None:
-            print "Change Error"
-        else:
-            self.__swim(t)
-            self.__sink(t)
+        self.__ranks[k] = self.__rank(k, key)
+        self.__swim(t)
+        self.__sink(self.__qp[k])
+
+    def decrease_key(self, k, key):
+        if not self.contains(k):
+            raise ValueError("Invalid index: %s"%k)
+        rank = self.__rank(k, key)
+        if rank > self.__ranks[k]:
+            raise ValueError("Key of %s would increase"%k)
+        self.__keys[k] = key
+        self.__ranks[k] = rank
+        self.__swim(self.__qp[k])
+
+    def increase_key(self, k, key):
+        if not self.contains(k):
+            raise ValueError("Invalid index: %s"%k)
+        rank = self.__rank(k, key)
+        if rank < self.__ranks[k]:
+            raise ValueError("Key of %s would decrease"%k)
+        self.__keys[k] = key
+        self.__ranks[k] = rank
+        self.__sink(self.__qp[k])
 
     def delete(self, k):
-        t = self.__qp.get(k)
-        if t is None:
-            print "Change Error"
-        else:
-            self.__exch(t, self.size())
-            del self.__pq[-1]
-            del self.__qp[k]
-            del self.__keys[k]
+        if not self.contains(k):
+            raise ValueError("Invalid index: %s"%k)
+        t = self.__qp[k]
+        self.__exch(t, self.size())
+        self.__pq.pop()
+        self.__forget(k)
+        if t <= self.size():
             self.__swim(t)
             self.__sink(t)
 
+    def keyOf(self, k):
+        return self.__keys[k]
+
     def minIndex(self):
         return self.__pq[1]
 
     def min(self):
         return self.__keys[self.__pq[1]]
 
+    def maxIndex(self):
+        # the index dispatched last, the maximum is one of the leaves, O(n)
+        return max(self.__pq[self.size()/2 + 1:], key=self.__ranks.__getitem__)
+
     def delMin(self):
         indexOfMin = self.__pq[1]
         self.__exch(1, self.size())
-        del self.__pq[-1]
-        del self.__qp[indexOfMin]
-        del self.__keys[indexOfMin]
+        self.__pq.pop()
+        self.__forget(indexOfMin)
         self.__sink(1)
         return indexOfMin
 
     def show(self):
-        for i in range(1, self.size()+1):
-            print str(self.__pq[i]) + ":" + str(self.__keys[self.__pq[i]])
+        for k in self.keys():
+            print str(k) + ":" + str(self.__keys[k])
 
     def keys(self):
-        # to be implemented
-        return self.__pq[1:]
+        # priority order, the heap itself is left untouched
+        return sorted(self.__pq[1:], key=self.__ranks.__getitem__)
+
+    def __reserve(self, k):
+        if self.__max_n is not None and k >= len(self.__qp):
+            grow = max(k + 1, 2*len(self.__qp)) - len(self.__qp)
+            self.__qp.extend(array('l', [0]) * grow)
+            self.__keys.extend([None] * grow)
+            self.__ranks.extend([None] * grow)
+
+    def __forget(self, k):
+        if self.__max_n is None:
+            del self.__qp[k]
+            del self.__keys[k]
+            del self.__ranks[k]
+        else:
+            self.__qp[k] = 0
+            self.__keys[k] = None
+            self.__ranks[k] = None
 
     def __swim(self, k):
         while k > 1 and self.__more(k/2, k):
@@ -86,10 +174,10 @@ class IndexMinPQ(object):
             k = j
 
     def __more(self, i, j):
-        return self.__keys[self.__pq[i]] > self.__keys[self.__pq[j]] # to be generalized
+        return self.__ranks[self.__pq[i]] > self.__ranks[self.__pq[j]]
 
     def __less(self, i, j):
-        return self.__keys[self.__pq[i]] < self.__keys[self.__pq[j]] # to be generalized
+        return self.__ranks[self.__pq[i]] < self.__ranks[self.__pq[j]]
 
     def __exch(self, i, j):
         self.__pq[i], self.__pq[j] = self.__pq[j], self.__pq[i]
@@ -114,6 +202,11 @@ if __name__ == '__main__':
     for i in range(5):
         print impq.delMin()
     impq.show()
-    print impq.constains(9)
+    print impq.contains(9)
     print impq.min()
     print impq.minIndex()
+    # integer indices in array storage, built in O(n), ties broken by index
+    impq = IndexMinPQ.heapify([(i, i % 3) for i in range(10)], max_n=10)
+    impq.decrease_key(9, -1)
+    impq.increase_key(0, 5)
+    print impq.keys()
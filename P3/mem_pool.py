@@ -0,0 +1,215 @@
+#!/usr/bin/python
+
+from bisect import bisect_left, bisect_right, insort
+
+class MemPool(object):
+    """
+    contiguous memory of units_per_line * line_num units, kept as run-length
+    partitions and holes so that its size does not grow with the pool
+
+    locator: {proc-num: {'start', 'size'}} of the resident processes
+    the free holes are indexed so that no placement scans the locator or the holes:
+        hole_starts, hole_size: sorted hole starts and {start: size} (address order)
+        hole_max: sparse segment tree over the addresses, {node: largest hole
+                  starting in its range}, leaves at tree_base + start, the
+                  first hole that fits at or after an address (FirstFit and
+                  NextFit) is found in O(log total_units)
+        hole_sizes: sorted (size, start) (size order, BestFit and WorstFit)
+    used_starts, owner: sorted partition starts and {start: proc-num}
+    lookups are O(log n) bisections, list insertions/deletions are memmoves
+    """
+    placement_algos = ('FirstFit', 'NextFit', 'BestFit', 'WorstFit')
+
+    def __init__(self, units_per_line, line_num):
+        super(MemPool, self).__init__()
+        self.units_per_line = units_per_line
+        self.line_num = line_num
+        self.total_units = units_per_line * line_num
+        self.locator = {}
+        self.recent_proc = None
+        self.used_starts = []
+        self.owner = {}
+        self.hole_starts = []
+        self.hole_size = {}
+        self.hole_sizes = []
+        self.hole_max = {}
+        self.tree_base = 1
+        while self.tree_base < self.total_units:
+            self.tree_base <<= 1
+        self.free_total = 0
+        self._add_hole(0, self.total_units)
+
+    def free_units(self):
+        return self.free_total
+
+    def largest_hole(self):
+        return self.hole_sizes[-1][0] if self.hole_sizes else 0
+
+    def allocate(self, proc_num, size, algo):
+        """
+        place the process in a free hole chosen by algo,
+        return the start of its partition or -1 if no hole is large enough
+        """
+        if algo not in self.placement_algos:
+            raise ValueError('invalid memory placement arg: %s'%algo)
+        if size > self.largest_hole():
+            return -1
+        if algo == 'FirstFit':
+            start = self._first_fit(size, 0)
+        elif algo == 'NextFit':
+            # continue from the end of the most recently placed process,
+            # from the beginning if it has been terminated, and wrap around
+            rover = 0
+            if self.recent_proc is not None and self.recent_proc in self.locator:
+                recent = self.locator[self.recent_proc]
+                rover = recent['start'] + recent['size']
+            start = self._first_fit(size, rover)
+            if start == -1:
+                start = self._first_fit(size, 0)
+            self.recent_proc = proc_num
+        elif algo == 'BestFit':
+            # the smallest hole that fits, ties are broken using the address order
+            start = self.hole_sizes[bisect_left(self.hole_sizes, (size, -1))][1]
+        else: # WorstFit
+            start = self.hole_sizes[bisect_left(self.hole_sizes, (self.hole_sizes[-1][0], -1))][1]
+        self.place(proc_num, start, size)
+        return start
+
+    def place(self, proc_num, start, size):
+        """
+        carve [start, start + size) out of the free hole containing it
+        """
+        i = bisect_right(self.hole_starts, start) - 1
+        if i < 0:
+            raise ValueError('no free hole at %s'%start)
+        hole_start = self.hole_starts[i]
+        hole_end = hole_start + self.hole_size[hole_start]
+        if start + size > hole_end:
+            raise ValueError('no free hole of %s units at %s'%(size, start))
+        self._remove_hole(hole_start)
+        if start > hole_start:
+            self._add_hole(hole_start, start - hole_start)
+        if hole_end > start + size:
+            self._add_hole(start + size, hole_end - start - size)
+        self.locator[proc_num] = {'start': start, 'size': size}
+        insort(self.used_starts, start)
+        self.owner[start] = proc_num
+
+    def free(self, proc_num):
+        """
+        release the partition of the process, coalescing it with the adjacent holes
+        """
+        values = self.locator.pop(proc_num)
+        start, end = values['start'], values['start'] + values['size']
+        del self.used_starts[bisect_left(self.used_starts, start)]
+        del self.owner[start]
+        i = bisect_left(self.hole_starts, start)
+        if i < len(self.hole_starts) and self.hole_starts[i] == end: # the next hole
+            end += self._remove_hole(end)
+        if i > 0:
+            prev_start = self.hole_starts[i - 1]
+            if prev_start + self.hole_size[prev_start] == start: # the previous hole
+                self._remove_hole(prev_start)
+                start = prev_start
+        self._add_hole(start, end - start)
+
+    def move(self, proc_num, new_start):
+        size = self.locator[proc_num]['size']
+        self.free(proc_num)
+        self.place(proc_num, new_start, size)
+
+    def partitions(self):
+        """
+        the resident processes in address order: (start, size, proc-num)
+        """
+        for start in self.used_starts:
+            proc_num = self.owner[start]
+            yield start, self.locator[proc_num]['size'], proc_num
+
+    def segments(self, lo=0, hi=None):
+        """
+        run-length view of the units [lo, hi) in address order:
+        (start, size, proc-num), proc-num is None for free units
+        """
+        if hi is None:
+            hi = self.total_units
+        i = max(bisect_right(self.used_starts, lo) - 1, 0)
+        pos = lo
+        while pos < hi:
+            if i < len(self.used_starts) and self.used_starts[i] < hi:
+                start = self.used_starts[i]
+                proc_num = self.owner[start]
+                end = min(start + self.locator[proc_num]['size'], hi)
+                i += 1
+                if end <= pos:
+                    continue
+                if start > pos:
+                    yield pos, start - pos, None
+                    pos = start
+                yield pos, end - pos, proc_num
+                pos = end
+            else:
+                yield pos, hi - pos, None
+                pos = hi
+
+    def holes(self):
+        """
+        the free holes in address order: (start, size)
+        """
+        for start in self.hole_starts:
+            yield start, self.hole_size[start]
+
+    def _first_fit(self, size, rover):
+        # the first hole starting at or after rover with at least size units, -1 if none
+        tree = self.hole_max
+        if rover >= self.total_units or tree.get(1, 0) < size:
+            return -1
+        i = self.tree_base + rover
+        if tree.get(i, 0) < size:
+            # climb until a right sibling (later addresses) holds a hole that fits
+            while True:
+                if i == 1:
+                    return -1
+                if not i & 1 and tree.get(i + 1, 0) >= size:
+                    i += 1
+                    break
+                i >>= 1
+            # then descend to its leftmost such hole
+            while i < self.tree_base:
+                i <<= 1
+                if tree.get(i, 0) < size:
+                    i += 1
+        return i - self.tree_base
+
+    def _set_hole_max(self, start, size):
+        tree = self.hole_max
+        i = self.tree_base + start
+        if size:
+            tree[i] = size
+        else:
+            del tree[i]
+        i >>= 1
+        while i:
+            m = max(tree.get(2*i, 0), tree.get(2*i + 1, 0))
+            if tree.get(i, 0) == m:
+                break # the ancestors are up to date
+            if m:
+                tree[i] = m
+            else:
+                del tree[i]
+            i >>= 1
+
+    def _add_hole(self, start, size):
+        insort(self.hole_starts, start)
+        self.hole_size[start] = size
+        insort(self.hole_sizes, (size, start))
+        self._set_hole_max(start, size)
+        self.free_total += size
+
+    def _remove_hole(self, start):
+        size = self.hole_size.pop(start)
+        del self.hole_starts[bisect_left(self.hole_starts, start)]
+        del self.hole_sizes[bisect_left(self.hole_sizes, (size, start))]
+        self._set_hole_max(start, 0)
+        self.free_total -= size
+        return size
@@ -0,0 +1,320 @@
+#!/usr/bin/python
+
+"""
+paged virtual memory
+
+PagedMemory is the memory of a run in paged mode (BaseOS.memory_mode =
+'paged') in place of MemPool: the pool is cut into frames of page_size
+units, a process is admitted without any (nothing is ever defragmented,
+but at most one process per frame is admitted), each of its pages is loaded
+into a frame on its first reference and, once no frame is free, the
+replacement algorithm takes one back:
+    FIFO    the page loaded first
+    LRU     the page referenced least recently
+    Clock   second chance: the first page the hand finds with its reference bit clear
+    OPT     the page referenced again the latest (Belady), as seen by the
+            reference string of its own process: the interleaving of the
+            processes is not known in advance
+every process has a page table, and a TLB of tlb_entries translations,
+flushed on every switch to another process (no address space ids), caches
+the ones of the running process; a TLB miss costs no simulated time (a
+page walk takes nanoseconds, the clock counts milliseconds), only its rate
+is reported
+
+the CPU bursts reference memory: one reference every t_page_ref ms of CPU
+time, drawn from the pages of the process by reference_string(); a burst
+runs up to its next reference to a page that is not resident, where BaseOS
+blocks the process on a page-fault I/O (t_page_fault) and resumes the
+burst once the page is loaded; the frame stays pinned (never replaced)
+until the process has made that reference, otherwise the processes could
+take each other's pages back before using them forever, and with no more
+processes than frames there is always a frame left to replace
+"""
+
+import sys
+import zlib
+import itertools
+from array import array
+from collections import OrderedDict
+from replacement import FrameList, iter_reference_string
+
+def reference_string(seed, pages, length, locality=0.9, window=4):
+    # the first length references of iter_reference_string
+    return array('l', itertools.islice(iter_reference_string(seed, pages, locality, window), length))
+
+def next_uses(refs):
+    """
+    for each reference, the index of the next reference to the same page,
+    len(refs) if there is none (OPT)
+    """
+    nxt = array('l', [0]) * len(refs)
+    last = {}
+    for i in xrange(len(refs) - 1, -1, -1):
+        nxt[i] = last.get(refs[i], len(refs))
+        last[refs[i]] = i
+    return nxt
+
+
+class AddressSpace(object):
+    """
+    the pages of a process: page_table maps them to frames (-1 if not
+    resident), refs is its reference string, refs_per_burst references per
+    CPU burst, built on the first dispatch
+    """
+    def __init__(self, pages):
+        super(AddressSpace, self).__init__()
+        self.pages = pages
+        self.page_table = array('l', [-1]) * pages
+        self.refs = None
+        self.next_use = None
+        self.refs_per_burst = 0
+        self.num_burst = 0
+        self.pos = 0 # index of the next reference
+
+
+class PagedMemory(object):
+    """
+    frames of page_size units out of units_per_line * line_num units, with
+    the geometry of MemPool for the memory graph
+    """
+    replacement_algos = ('FIFO', 'LRU', 'Clock', 'OPT')
+
+    def __init__(self, units_per_line, line_num, algo='LRU', page_size=4, tlb_entries=8, t_page_ref=10):
+        super(PagedMemory, self).__init__()
+        if algo not in self.replacement_algos:
+            raise ValueError('invalid replacement arg: %s'%algo)
+        self.units_per_line = units_per_line
+        self.line_num = line_num
+        self.total_units = units_per_line * line_num
+        self.algo = algo
+        self.page_size = page_size
+        self.tlb_entries = tlb_entries
+        self.t_page_ref = t_page_ref
+        self.frame_num = self.total_units / page_size
+        self.frame_proc = [None] * self.frame_num # owner of each frame
+        self.frame_page = array('l', [-1]) * self.frame_num
+        self.free_frames = range(self.frame_num - 1, -1, -1) # popped from the end, lowest first
+        self.spaces = {} # {proc-num: AddressSpace} of the admitted processes
+        self.loading = {} # {proc-num: page} of the processes blocked on a page fault
+        self.pinned = set() # frames loaded on a fault whose reference is yet to be made
+        # replacement state
+        self.order = FrameList(self.frame_num) # frames in load order (FIFO), least recently referenced first (LRU)
+        self.ref_bit = array('b', [0]) * self.frame_num # (Clock)
+        self.hand = 0
+        self.frame_next_use = array('l', [0]) * self.frame_num # index of the next reference to the page in its reference string (OPT)
+        # TLB of the running process: {page: frame}, least recently used first
+        self.tlb = OrderedDict()
+        self.tlb_proc = None
+        self.references = 0
+        self.faults = 0
+        self.evictions = 0
+        self.tlb_hits = 0
+
+    def free_units(self):
+        return len(self.free_frames) * self.page_size
+
+    def allocate(self, proc_num, size, algo=None):
+        """
+        admit the process with a page table of size units, no frame is
+        allocated until its pages are referenced; -1 if there are already
+        as many processes as frames
+        """
+        if len(self.spaces) >= self.frame_num:
+            return -1
+        self.spaces[proc_num] = AddressSpace(max(1, -(-size // self.page_size)))
+        return 0
+
+    def free(self, proc_num):
+        space = self.spaces.pop(proc_num)
+        for frame in space.page_table:
+            if frame != -1:
+                self._release(frame)
+        if self.tlb_proc == proc_num:
+            self.tlb.clear()
+            self.tlb_proc = None
+
+    def segments(self, lo=0, hi=None):
+        """
+        (start, size, proc-num or None) runs of units in [lo, hi)
+        """
+        if hi is None:
+            hi = self.total_units
+        run_start, run_proc = lo, None
+        for frame in xrange(lo / self.page_size, -(-hi // self.page_size)):
+            start = max(lo, frame * self.page_size)
+            proc_num = self.frame_proc[frame] if frame < self.frame_num else None # the units left over by the frames are free
+            if start == lo:
+                run_proc = proc_num
+            elif proc_num != run_proc:
+                yield run_start, start - run_start, run_proc
+                run_start, run_proc = start, proc_num
+        if hi > lo:
+            yield run_start, hi - run_start, run_proc
+
+    def switch(self, proc_num):
+        # a context switch to another process flushes the TLB
+        if proc_num != self.tlb_proc:
+            self.tlb.clear()
+            self.tlb_proc = proc_num
+
+    def next_fault(self, pcb):
+        """
+        the CPU time from the point the current burst of the process has
+        reached to its next reference to a page that is not resident, None
+        if there is none before the end of the burst
+        """
+        space = self._space(pcb)
+        offset = pcb.burst_time - pcb.next_burst_time
+        first = self._burst_first(space, pcb)
+        for k in xrange(-(-offset // self.t_page_ref), space.refs_per_burst):
+            if space.page_table[space.refs[first + k]] == -1:
+                return k * self.t_page_ref - offset
+        return None
+
+    def run(self, pcb, ran):
+        """
+        the process ran for ran ms from the point its current burst had
+        reached: make its references of that time, all to resident pages
+        """
+        space = self._space(pcb)
+        offset = pcb.burst_time - pcb.next_burst_time
+        first = self._burst_first(space, pcb)
+        t_ref = self.t_page_ref
+        for k in xrange(-(-offset // t_ref), min(-(-(offset + ran) // t_ref), space.refs_per_burst)):
+            self._reference(space, first + k)
+
+    def fault(self, pcb):
+        """
+        start loading the page the process references at the point its
+        burst has reached into a frame, a free one or a replaced one,
+        return the page
+        """
+        space = self._space(pcb)
+        offset = pcb.burst_time - pcb.next_burst_time
+        i = self._burst_first(space, pcb) + -(-offset // self.t_page_ref)
+        page = space.refs[i]
+        space.pos = i
+        if self.free_frames:
+            frame = self.free_frames.pop()
+        else:
+            frame = self._victim()
+            victim_space = self.spaces[self.frame_proc[frame]]
+            victim_space.page_table[self.frame_page[frame]] = -1
+            if self.frame_proc[frame] == self.tlb_proc:
+                self.tlb.pop(self.frame_page[frame], None)
+            self._drop(frame)
+            self.evictions += 1
+        self.faults += 1
+        self.frame_proc[frame] = pcb.proc_num
+        self.frame_page[frame] = page
+        space.page_table[page] = frame
+        self.pinned.add(frame)
+        self._load(frame, space.next_use[i] if space.next_use is not None else 0)
+        self.loading[pcb.proc_num] = page
+        return page
+
+    def loaded(self, proc_num):
+        """
+        the page the process was blocked on if its fault was being
+        serviced (it is loaded now), None otherwise
+        """
+        return self.loading.pop(proc_num, None)
+
+    def stats(self):
+        stats = self.empty_stats()
+        stats['page_references'] = self.references
+        stats['page_faults'] = self.faults
+        stats['page_evictions'] = self.evictions
+        if self.references:
+            stats['page_fault_rate'] = float(self.faults) / self.references
+            stats['tlb_hit_rate'] = float(self.tlb_hits) / self.references
+        return stats
+
+    @staticmethod
+    def empty_stats():
+        # the statistics of a run without paging
+        return OrderedDict([('page_references', 0), ('page_faults', 0), ('page_evictions', 0),
+                            ('page_fault_rate', 0.0), ('tlb_hit_rate', 0.0)])
+
+    def _space(self, pcb):
+        space = self.spaces[pcb.proc_num]
+        if space.refs is None:
+            # the whole reference string of the process, seeded by its name, known from its first dispatch
+            space.refs_per_burst = -(-pcb.burst_time // self.t_page_ref)
+            space.num_burst = pcb.num_burst
+            space.refs = reference_string(zlib.crc32(str(pcb.proc_num)), space.pages, space.refs_per_burst * pcb.num_burst)
+            if self.algo == 'OPT':
+                space.next_use = next_uses(space.refs)
+        return space
+
+    def _burst_first(self, space, pcb):
+        # index of the first reference of the current burst
+        return (space.num_burst - pcb.num_burst) * space.refs_per_burst
+
+    def _reference(self, space, i):
+        page = space.refs[i]
+        space.pos = i + 1
+        self.references += 1
+        frame = self.tlb.get(page)
+        if frame is not None:
+            self.tlb_hits += 1
+            del self.tlb[page]
+        else:
+            frame = space.page_table[page]
+            self.pinned.discard(frame) # the faulting reference is made (a page just loaded is never in the TLB)
+            if len(self.tlb) >= self.tlb_entries:
+                self.tlb.popitem(last=False)
+        self.tlb[page] = frame
+        if self.algo == 'LRU':
+            self.order.touch(frame)
+        elif self.algo == 'Clock':
+            self.ref_bit[frame] = 1
+        elif self.algo == 'OPT':
+            self.frame_next_use[frame] = space.next_use[i]
+
+    def _load(self, frame, next_use):
+        if self.algo in ('FIFO', 'LRU'):
+            self.order.append(frame)
+        elif self.algo == 'Clock':
+            self.ref_bit[frame] = 1
+        else:
+            self.frame_next_use[frame] = next_use
+
+    def _drop(self, frame):
+        if self.algo in ('FIFO', 'LRU'):
+            self.order.remove(frame)
+        elif self.algo == 'Clock':
+            self.ref_bit[frame] = 0
+
+    def _release(self, frame):
+        self._drop(frame)
+        self.pinned.discard(frame)
+        self.frame_proc[frame] = None
+        self.frame_page[frame] = -1
+        self.free_frames.append(frame)
+
+    def _victim(self):
+        # the pinned frames are skipped, there is always another one (at most one per process is pinned)
+        pinned = self.pinned
+        if self.algo in ('FIFO', 'LRU'):
+            for frame in self.order:
+                if frame not in pinned:
+                    return frame
+        if self.algo == 'Clock':
+            while self.ref_bit[self.hand] or self.hand in pinned:
+                self.ref_bit[self.hand] = 0
+                self.hand = (self.hand + 1) % self.frame_num
+            frame = self.hand
+            self.hand = (self.hand + 1) % self.frame_num
+            return frame
+        # OPT: the page whose owner is the farthest from its next use, ties are broken using frame order
+        victim, farthest = 0, -1
+        for frame in xrange(self.frame_num):
+            if frame in pinned:
+                continue
+            space = self.spaces[self.frame_proc[frame]]
+            next_use = self.frame_next_use[frame]
+            distance = next_use - space.pos if next_use < len(space.refs) else sys.maxint
+            if distance > farthest:
+                victim, farthest = frame, distance
+        return victim
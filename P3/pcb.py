@@ -0,0 +1,165 @@
+#!/usr/bin/python
+
+"""
+process control blocks
+
+PCB is one process with fixed attribute slots instead of a per-process dict,
+ProcessArrays keeps a whole (loaded) process table as one column per field
+for big workloads, and only builds PCBs for the processes actually read
+"""
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class PCB(object):
+    """
+    status is -1 to 4, see BaseOS; next_burst_time is the remaining time of
+    the current CPU burst once it has been preempted
+    """
+    __slots__ = ('proc_num', 'arrival_time', 'burst_time', 'num_burst', 'io_time',
+                 'priority', 'memory', 'status', 'start_time', 'next_burst_time')
+
+    def __init__(self, proc_num, burst_time, num_burst, io_time, priority=0, arrival_time=0, memory=0, status=0):
+        self.proc_num = proc_num
+        self.arrival_time = arrival_time
+        self.burst_time = burst_time
+        self.num_burst = num_burst
+        self.io_time = io_time
+        self.priority = priority
+        self.memory = memory
+        self.status = status
+        self.start_time = 0
+        self.next_burst_time = burst_time
+
+    def copy(self):
+        pcb = PCB.__new__(PCB)
+        for name in PCB.__slots__:
+            setattr(pcb, name, getattr(self, name))
+        return pcb
+
+    def __getstate__(self):
+        # no __dict__ to pickle (batch runs, snapshots)
+        return tuple(getattr(self, name) for name in PCB.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(PCB.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return 'PCB(%s)'%', '.join('%s=%r'%(name, getattr(self, name)) for name in PCB.__slots__)
+
+
+class ProcessArrays(object):
+    """
+    struct-of-arrays process table: one array('l') column per field, read
+    like a {proc-num: PCB} table, each read builds a fresh PCB from its row
+    column() is a zero-copy numpy view when numpy is installed
+    """
+    fields = ('arrival_time', 'burst_time', 'num_burst', 'io_time', 'priority', 'memory', 'status')
+
+    def __init__(self, pcbs=()):
+        super(ProcessArrays, self).__init__()
+        self.proc_nums = []
+        self.columns = dict((name, array('l')) for name in self.fields)
+        self.rows = {} # {proc-num: row}
+        for pcb in pcbs:
+            self.append(pcb)
+
+    def append(self, pcb):
+        if pcb.proc_num in self.rows:
+            raise ValueError("Repeated process: %s"%pcb.proc_num)
+        self.rows[pcb.proc_num] = len(self.proc_nums)
+        self.proc_nums.append(pcb.proc_num)
+        for name in self.fields:
+            self.columns[name].append(getattr(pcb, name))
+
+    def __setitem__(self, proc_num, pcb):
+        # loading a process again overwrites its row, as with a dict
+        i = self.rows.get(proc_num)
+        if i is None:
+            self.append(pcb)
+            return
+        for name in self.fields:
+            self.columns[name][i] = getattr(pcb, name)
+
+    def pcb(self, i):
+        columns = self.columns
+        return PCB(self.proc_nums[i], columns['burst_time'][i], columns['num_burst'][i], columns['io_time'][i],
+                   columns['priority'][i], columns['arrival_time'][i], columns['memory'][i], columns['status'][i])
+
+    def column(self, name):
+        if numpy is None:
+            return self.columns[name]
+        return numpy.frombuffer(self.columns[name], dtype=numpy.int_)
+
+    def burst_totals(self):
+        # (total CPU burst time, number of CPU bursts)
+        if numpy is None:
+            return sum(b*n for b, n in zip(self.columns['burst_time'], self.columns['num_burst'])), sum(self.columns['num_burst'])
+        num_burst = self.column('num_burst')
+        return int(numpy.dot(self.column('burst_time'), num_burst)), int(num_burst.sum())
+
+    def arrival_order(self):
+        # row indices in (arrival time, proc-num) order
+        arrival_time = self.columns['arrival_time']
+        return sorted(xrange(len(self.proc_nums)), key=lambda i: (arrival_time[i], self.proc_nums[i]))
+
+    def __len__(self):
+        return len(self.proc_nums)
+
+    def __iter__(self):
+        return iter(self.proc_nums)
+
+    def __contains__(self, proc_num):
+        return proc_num in self.rows
+
+    def __getitem__(self, proc_num):
+        return self.pcb(self.rows[proc_num])
+
+    def keys(self):
+        return list(self.proc_nums)
+
+    def iteritems(self):
+        for i, proc_num in enumerate(self.proc_nums):
+            yield proc_num, self.pcb(i)
+
+    def itervalues(self):
+        for i in xrange(len(self.proc_nums)):
+            yield self.pcb(i)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+
+def burst_totals(process_table):
+    """
+    (total CPU burst time, number of CPU bursts) of a process table,
+    vectorized for ProcessArrays
+    """
+    if isinstance(process_table, ProcessArrays):
+        return process_table.burst_totals()
+    total_burst_time = 0
+    burst_num = 0
+    for pcb in process_table.itervalues():
+        total_burst_time += pcb.burst_time*pcb.num_burst
+        burst_num += pcb.num_burst
+    return total_burst_time, burst_num
+
+def iter_arrivals(process_table):
+    """
+    yield a fresh (proc-num, PCB) of every process in (arrival time, proc-num)
+    order, the table itself is left untouched
+    """
+    if isinstance(process_table, ProcessArrays):
+        for i in process_table.arrival_order():
+            yield process_table.proc_nums[i], process_table.pcb(i)
+        return
+    for proc_num, pcb in sorted(process_table.iteritems(), key=lambda d:(d[1].arrival_time, d[0])):
+        yield proc_num, pcb.copy()
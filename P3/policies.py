@@ -0,0 +1,204 @@
+#!/usr/bin/python
+
+"""
+scheduling policies of the simulation kernel (BaseOS.run_policy)
+
+the kernel owns the clock, the arrivals, the I/O, the memory and the log,
+a policy only owns the ready queue and the scheduling decisions:
+    new_queue()                             an empty ready queue
+    on_ready(queue, pcb)                    the process joins the ready queue
+    pick_next(queue)                        remove and return the next process to dispatch
+    should_preempt(pcb, current, remaining) whether pcb, ready again, preempts the running
+                                            process, remaining is what is left of its burst
+    time_slice(queue, pcb)                  the time slice of the dispatched process, None for none
+    on_slice(queue, pcb)                    the process used up its slice while others are ready
+    on_exit(queue, pcb)                     the process terminated
+    on_schedule(queue, clock)               at every scheduling point, True if the queue was boosted
+    next_event()                            the time on_schedule has something to do by, None for never,
+                                            the clock stops there (as at an I/O completion)
+a new policy is a subclass added to BaseOS.make_policy
+"""
+
+from collections import deque
+from indexed_priority_queue import IndexMinPQ
+
+class Queue(deque):
+    def __init__(self):
+        super(Queue, self).__init__()
+
+    def __reduce__(self):
+        # deque would call Queue(items) when unpickled (snapshots)
+        return (Queue, (), None, iter(self))
+
+    def isEmpty(self):
+        return len(self) == 0
+
+    def insert(self, k, v=None):
+        """
+        just for compatibility
+        """
+        self.append(k)
+
+    def keys(self):
+        return list(self)
+
+class MultilevelQueue(object):
+    """
+    ready queue of MLFQ: one deque per level, level 0 first, and a bitmap of
+    the non-empty levels, so that popleft() finds the first one in O(1)
+    quanta: the time quantum of each level
+    """
+    def __init__(self, quanta):
+        super(MultilevelQueue, self).__init__()
+        self.quanta = quanta
+        self.queues = [deque() for q in quanta]
+        self.bitmap = 0 # bit i is set if queues[i] is not empty
+        self.count = 0
+        self.level = {} # {proc-num: level}, new processes start at level 0
+
+    def __len__(self):
+        return self.count
+
+    def isEmpty(self):
+        return self.count == 0
+
+    def insert(self, k, v=None):
+        """
+        append at the current level of the process, v is ignored (compatibility)
+        """
+        level = self.level.setdefault(k, 0)
+        self.queues[level].append(k)
+        self.bitmap |= 1 << level
+        self.count += 1
+
+    def popleft(self):
+        level = (self.bitmap & -self.bitmap).bit_length() - 1 # lowest set bit
+        queue = self.queues[level]
+        k = queue.popleft()
+        if not queue:
+            self.bitmap &= ~(1 << level)
+        self.count -= 1
+        return k
+
+    def quantum(self, k):
+        return self.quanta[self.level.get(k, 0)]
+
+    def demote(self, k):
+        self.level[k] = min(self.level.get(k, 0) + 1, len(self.queues) - 1)
+
+    def forget(self, k):
+        self.level.pop(k, None)
+
+    def boost(self):
+        # every process back to level 0, the ready ones keep their order
+        for queue in self.queues[1:]:
+            self.queues[0].extend(queue)
+            queue.clear()
+        if self.count:
+            self.bitmap = 1
+        for k in self.level:
+            self.level[k] = 0
+
+    def keys(self):
+        return [k for queue in self.queues for k in queue]
+
+
+class Policy(object):
+    """
+    the base of the policies: a FIFO ready queue, no preemption, no time slice
+    io_done_queued: the io_done log line lists the process in the ready queue
+    """
+    io_done_queued = False
+
+    def new_queue(self):
+        return Queue()
+
+    def on_ready(self, queue, pcb):
+        queue.append(pcb.proc_num)
+
+    def pick_next(self, queue):
+        return queue.popleft()
+
+    def should_preempt(self, pcb, current, remaining):
+        return False
+
+    def time_slice(self, queue, pcb):
+        return None
+
+    def on_slice(self, queue, pcb):
+        pass
+
+    def on_exit(self, queue, pcb):
+        pass
+
+    def on_schedule(self, queue, clock):
+        return False
+
+    def next_event(self):
+        return None
+
+
+class SRT(Policy):
+    io_done_queued = True
+
+    def new_queue(self):
+        return IndexMinPQ()
+
+    def on_ready(self, queue, pcb):
+        queue.insert(pcb.proc_num, pcb.next_burst_time)
+
+    def pick_next(self, queue):
+        return queue.delMin()
+
+    def should_preempt(self, pcb, current, remaining):
+        return pcb.next_burst_time < remaining
+
+
+class RR(Policy):
+    def __init__(self, t_slice):
+        super(RR, self).__init__()
+        self.t_slice = t_slice
+
+    def time_slice(self, queue, pcb):
+        return self.t_slice
+
+
+class MLFQ(Policy):
+    """
+    Round Robin within the levels of a MultilevelQueue: a process using up
+    the quantum of its level while others are ready is demoted one level,
+    one giving up the CPU earlier (I/O, end of the burst) keeps its level;
+    every boost_period ms (0 for never) all the processes go back to level 0
+    """
+
+    def __init__(self, quanta, boost_period=0):
+        super(MLFQ, self).__init__()
+        self.quanta = quanta
+        self.boost_period = boost_period
+        self.next_boost = boost_period
+
+    def new_queue(self):
+        return MultilevelQueue(self.quanta)
+
+    def on_ready(self, queue, pcb):
+        queue.insert(pcb.proc_num)
+
+    def time_slice(self, queue, pcb):
+        return queue.quantum(pcb.proc_num)
+
+    def on_slice(self, queue, pcb):
+        queue.demote(pcb.proc_num)
+
+    def on_exit(self, queue, pcb):
+        queue.forget(pcb.proc_num)
+
+    def on_schedule(self, queue, clock):
+        # periodic priority boost, the clock stops at each period (next_event)
+        if self.boost_period and clock >= self.next_boost:
+            queue.boost()
+            self.next_boost = (clock / self.boost_period + 1) * self.boost_period
+            return True
+        return False
+
+    def next_event(self):
+        return self.next_boost if self.boost_period else None
@@ -0,0 +1,111 @@
+#!/usr/bin/python
+
+"""
+per-phase timing of a run
+
+PhaseProfiler shadows the phase methods of the objects of a run (BaseOS
+phases, the event sink) with instance attributes that count the calls and
+accumulate their wall and CPU time, and removes them at the end of the run:
+nothing is patched, and nothing costs anything, unless BaseOS.profile is set
+
+the times are inclusive, "self" excludes the nested phases (e.g.
+memory_placement inside new_arrival_proc), and what no phase covers is the
+scheduler loop itself
+"""
+
+import sys
+import time
+import cProfile
+import pstats
+
+class PhaseProfiler(object):
+    def __init__(self):
+        super(PhaseProfiler, self).__init__()
+        self.calls = {}
+        self.wall = {}
+        self.cpu = {}
+        self.self_wall = {}
+        self.stack = [] # [wall time of the nested phases] of the phases in progress
+        self.patched = [] # (object, attribute, previous instance attribute or None)
+        self.total_wall = 0.0
+        self.total_cpu = 0.0
+
+    def instrument(self, obj, names, prefix=''):
+        for name in names:
+            func = getattr(obj, name, None)
+            if func is None:
+                continue
+            self.patched.append((obj, name, obj.__dict__.get(name)))
+            setattr(obj, name, self.wrap(prefix + name, func))
+
+    def restore(self):
+        for obj, name, previous in reversed(self.patched):
+            if previous is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+        self.patched = []
+
+    def wrap(self, name, func):
+        stack = self.stack
+        def phase(*args, **kwargs):
+            frame = [0.0]
+            stack.append(frame)
+            w0 = time.time()
+            c0 = time.clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                wall = time.time() - w0
+                cpu = time.clock() - c0
+                stack.pop()
+                if stack:
+                    stack[-1][0] += wall
+                self.calls[name] = self.calls.get(name, 0) + 1
+                self.wall[name] = self.wall.get(name, 0.0) + wall
+                self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+                self.self_wall[name] = self.self_wall.get(name, 0.0) + wall - frame[0]
+        return phase
+
+    def run(self, func, *args, **kwargs):
+        # time the whole call, its phases being instrumented beforehand
+        w0 = time.time()
+        c0 = time.clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.total_wall += time.time() - w0
+            self.total_cpu += time.clock() - c0
+
+    def report(self, title, out=None):
+        out = out or sys.stdout
+        total = self.total_wall or 1e-9
+        out.write("-- profile of %s: %.3f s wall, %.3f s CPU\n"%(title, self.total_wall, self.total_cpu))
+        out.write("--   %-22s %9s %9s %9s %9s %7s\n"%('phase', 'calls', 'wall s', 'self s', 'CPU s', 'self %'))
+        for name in sorted(self.calls, key=lambda name: -self.self_wall[name]):
+            out.write("--   %-22s %9s %9.3f %9.3f %9.3f %6.1f%%\n"%(name, self.calls[name], self.wall[name],
+                    self.self_wall[name], self.cpu[name], 100 * self.self_wall[name] / total))
+        loop = self.total_wall - sum(self.self_wall.itervalues())
+        out.write("--   %-22s %9s %9s %9.3f %9s %6.1f%%\n"%('(scheduler loop)', '', '', loop, '', 100 * loop / total))
+
+
+def profile_run(bos, title, func, *args):
+    """
+    run func(*args) with the phases of bos and its sink timed, under cProfile
+    too if bos.profile > 1, print the breakdown and return the result
+    """
+    profiler = PhaseProfiler()
+    profiler.instrument(bos, bos.profile_phases)
+    profiler.instrument(bos.sink, ('event', 'write', 'flush'), 'sink.')
+    c_profile = cProfile.Profile() if bos.profile > 1 else None
+    try:
+        if c_profile is not None:
+            result = profiler.run(c_profile.runcall, func, *args)
+        else:
+            result = profiler.run(func, *args)
+    finally:
+        profiler.restore()
+    profiler.report(title)
+    if c_profile is not None:
+        pstats.Stats(c_profile, stream=sys.stdout).sort_stats('cumulative').print_stats(bos.profile_top)
+    return result
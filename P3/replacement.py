@@ -0,0 +1,422 @@
+#!/usr/bin/python
+
+"""
+trace-driven page replacement
+
+the engines replay a reference trace against a fixed number of frames and
+count its page faults, in O(1) per reference:
+    LRU     a dict of the resident pages (page -> frame) and a FrameList of
+            the frames, least recently referenced first
+    Clock   the same dict, the reference bits and pages of the frames in arrays
+    FIFO    the same dict, the frames are replaced in turn (nothing is ever freed)
+StackDistances gets the LRU fault rates of every number of frames in a
+single pass instead (Mattson): with F frames, a reference faults iff more
+than F-1 other pages were referenced since the last reference to its page,
+counted with a Fenwick tree over the times of the last references
+
+a trace file is a flat array of 32-bit little endian page numbers, it is
+memory-mapped and read in chunks, never loaded as a whole
+
+    python replacement.py trace.bin --generate 100000000 --pages 4096
+    python replacement.py trace.bin --frames 64 128 256 512 --algos LRU Clock
+"""
+
+import sys
+import mmap
+import time
+import argparse
+import random
+import itertools
+from array import array
+
+TRACE_CHUNK = 1 << 16 # references read at a time
+
+def iter_reference_string(seed, pages, locality=0.9, window=4):
+    """
+    endless page numbers in [0, pages): a reference falls within the current
+    window of pages with probability locality, otherwise on a random page,
+    where the window moves to (a phase change)
+    """
+    r = random.Random(seed)
+    base = 0
+    window = min(window, pages)
+    while True:
+        if r.random() < locality:
+            yield (base + r.randrange(window)) % pages
+        else:
+            base = r.randrange(pages)
+            yield base
+
+
+class FrameList(object):
+    """
+    doubly-linked list of frame numbers in [0, size) backed by two arrays:
+    append, remove, move to the tail (touch) and the head in O(1)
+    """
+    def __init__(self, size):
+        super(FrameList, self).__init__()
+        self.nil = size # sentinel, the head is next[nil] and the tail prev[nil]
+        self.prev = array('l', [-1]) * (size + 1) # -1 if not in the list
+        self.next = array('l', [-1]) * (size + 1)
+        self.prev[size] = self.next[size] = size
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, frame):
+        return self.prev[frame] != -1
+
+    def __iter__(self):
+        frame = self.next[self.nil]
+        while frame != self.nil:
+            yield frame
+            frame = self.next[frame]
+
+    def head(self):
+        frame = self.next[self.nil]
+        return None if frame == self.nil else frame
+
+    def append(self, frame):
+        tail = self.prev[self.nil]
+        self.next[tail] = frame
+        self.prev[frame] = tail
+        self.next[frame] = self.nil
+        self.prev[self.nil] = frame
+        self.count += 1
+
+    def remove(self, frame):
+        prev, next = self.prev[frame], self.next[frame]
+        self.next[prev] = next
+        self.prev[next] = prev
+        self.prev[frame] = self.next[frame] = -1
+        self.count -= 1
+
+    def touch(self, frame):
+        if self.prev[self.nil] != frame:
+            self.remove(frame)
+            self.append(frame)
+
+
+class Replacement(object):
+    """
+    the base of the engines: frames frames, all free at first
+    """
+    def __init__(self, frames):
+        super(Replacement, self).__init__()
+        self.frames = frames
+        self.table = {} # {page: frame} of the resident pages
+        self.frame_page = array('l', [-1]) * frames
+        self.references = 0
+        self.faults = 0
+        self.evictions = 0
+
+    def run(self, refs):
+        # replay a chunk of references
+        access = self.access
+        for page in refs:
+            access(page)
+
+    def access(self, page):
+        """
+        reference a page, return True if it faulted
+        """
+        self.references += 1
+        frame = self.table.get(page)
+        if frame is not None:
+            self.hit(frame)
+            return False
+        self.faults += 1
+        if len(self.table) < self.frames:
+            frame = len(self.table)
+        else:
+            frame = self.victim()
+            del self.table[self.frame_page[frame]]
+            self.evictions += 1
+        self.table[page] = frame
+        self.frame_page[frame] = page
+        self.load(frame)
+        return True
+
+    def fault_rate(self):
+        return float(self.faults) / self.references if self.references else 0.0
+
+
+class LRU(Replacement):
+    def __init__(self, frames):
+        super(LRU, self).__init__(frames)
+        self.order = FrameList(frames)
+
+    def hit(self, frame):
+        self.order.touch(frame)
+
+    def load(self, frame):
+        self.order.append(frame)
+
+    def victim(self):
+        frame = self.order.head()
+        self.order.remove(frame)
+        return frame
+
+    def run(self, refs):
+        # access() with the list operations inlined, most references are hits
+        table, frame_page = self.table, self.frame_page
+        prev, next, nil = self.order.prev, self.order.next, self.order.nil
+        faults = 0
+        for page in refs:
+            frame = table.get(page)
+            if frame is not None:
+                if prev[nil] == frame:
+                    continue
+                p, n = prev[frame], next[frame] # unlink
+                next[p] = n
+                prev[n] = p
+            else:
+                faults += 1
+                if len(table) < self.frames:
+                    frame = len(table)
+                    self.order.count += 1
+                else:
+                    frame = next[nil] # the head, least recently referenced
+                    n = next[frame]
+                    next[nil] = n
+                    prev[n] = nil
+                    del table[frame_page[frame]]
+                    self.evictions += 1
+                table[page] = frame
+                frame_page[frame] = page
+            tail = prev[nil] # append
+            next[tail] = frame
+            prev[frame] = tail
+            next[frame] = nil
+            prev[nil] = frame
+        self.references += len(refs)
+        self.faults += faults
+
+
+class Clock(Replacement):
+    def __init__(self, frames):
+        super(Clock, self).__init__(frames)
+        self.ref_bit = array('b', [0]) * frames
+        self.hand = 0
+
+    def hit(self, frame):
+        self.ref_bit[frame] = 1
+
+    def load(self, frame):
+        self.ref_bit[frame] = 1
+
+    def victim(self):
+        # second chance: clear the set bits up to the first clear one
+        ref_bit, hand = self.ref_bit, self.hand
+        while ref_bit[hand]:
+            ref_bit[hand] = 0
+            hand = (hand + 1) % self.frames
+        self.hand = (hand + 1) % self.frames
+        return hand
+
+    def run(self, refs):
+        # access() with the victim search inlined
+        table, frame_page, ref_bit, frames = self.table, self.frame_page, self.ref_bit, self.frames
+        hand = self.hand
+        faults = 0
+        for page in refs:
+            frame = table.get(page)
+            if frame is not None:
+                ref_bit[frame] = 1
+                continue
+            faults += 1
+            if len(table) < frames:
+                frame = len(table)
+            else:
+                while ref_bit[hand]:
+                    ref_bit[hand] = 0
+                    hand = (hand + 1) % frames
+                frame = hand
+                hand = (hand + 1) % frames
+                del table[frame_page[frame]]
+                self.evictions += 1
+            table[page] = frame
+            frame_page[frame] = page
+            ref_bit[frame] = 1
+        self.hand = hand
+        self.references += len(refs)
+        self.faults += faults
+
+
+class FIFO(Replacement):
+    def __init__(self, frames):
+        super(FIFO, self).__init__(frames)
+        self.hand = 0 # the frame loaded first, frames are loaded in turn
+
+    def hit(self, frame):
+        pass
+
+    def load(self, frame):
+        pass
+
+    def victim(self):
+        frame = self.hand
+        self.hand = (self.hand + 1) % self.frames
+        return frame
+
+
+engines = {'LRU': LRU, 'Clock': Clock, 'FIFO': FIFO}
+
+
+class StackDistances(object):
+    """
+    histogram of the LRU stack distances of a trace (Mattson): hist[d]
+    references were to the d-th most recently referenced page (1 for the
+    last one), cold ones to pages never referenced before
+
+    the last reference to each page has a marker at its time in a Fenwick
+    tree, the distance is the number of markers since then; the times are
+    renumbered when the tree is full, so that its size stays proportional to
+    the number of distinct pages rather than to the length of the trace
+    """
+    min_capacity = 1 << 16
+
+    def __init__(self):
+        super(StackDistances, self).__init__()
+        self.hist = array('l', [0])
+        self.cold = 0
+        self.references = 0
+        self.last = {} # {page: time of its last reference}, times from 1
+        self.now = 0
+        self.tree = array('l', [0]) * (self.min_capacity + 1)
+
+    def run(self, refs):
+        last, tree, hist = self.last, self.tree, self.hist
+        capacity = len(tree) - 1
+        now = self.now
+        for page in refs:
+            if now == capacity:
+                self.now = now
+                self.compact()
+                tree = self.tree
+                capacity = len(tree) - 1
+                now = self.now
+            t = last.get(page)
+            if t is None:
+                self.cold += 1
+            else:
+                # markers up to t, the distance is the number after it, its own included
+                seen, i = 0, t
+                while i:
+                    seen += tree[i]
+                    i &= i - 1
+                d = len(last) - seen + 1
+                if d >= len(hist):
+                    hist.extend(array('l', [0]) * (d + 1 - len(hist)))
+                hist[d] += 1
+                i = t
+                while i <= capacity:
+                    tree[i] -= 1
+                    i += i & -i
+            now += 1
+            last[page] = now
+            i = now
+            while i <= capacity:
+                tree[i] += 1
+                i += i & -i
+        self.now = now
+        self.references += len(refs)
+
+    def compact(self):
+        # renumber the last references 1..n in time order and rebuild the tree (in O(capacity))
+        order = sorted(self.last, key=self.last.get)
+        capacity = max(self.min_capacity, 4 * len(order))
+        tree = array('l', [0]) * (capacity + 1)
+        for t, page in enumerate(order, 1):
+            self.last[page] = t
+            tree[t] = 1
+        for i in xrange(1, capacity + 1):
+            j = i + (i & -i)
+            if j <= capacity:
+                tree[j] += tree[i]
+        self.tree = tree
+        self.now = len(order)
+
+    def faults(self, frames):
+        # with that many frames: the cold references and those further down the stack
+        return self.cold + sum(itertools.islice(self.hist, frames + 1, None))
+
+    def fault_rate(self, frames):
+        return float(self.faults(frames)) / self.references if self.references else 0.0
+
+
+def write_trace(filename, pages):
+    # pages: iterable of page numbers, written in chunks
+    with open(filename, 'wb') as f:
+        pages = iter(pages)
+        while True:
+            chunk = array('i', itertools.islice(pages, TRACE_CHUNK))
+            if not chunk:
+                break
+            if sys.byteorder == 'big':
+                chunk.byteswap()
+            f.write(chunk.tostring())
+
+def read_trace(filename, chunk=TRACE_CHUNK):
+    """
+    yield the references of a trace file as arrays of chunk page numbers,
+    the file is memory-mapped
+    """
+    with open(filename, 'rb') as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if size == 0:
+            return
+        trace = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            step = chunk * 4
+            for offset in xrange(0, size - size % 4, step):
+                refs = array('i')
+                refs.fromstring(trace[offset : min(offset + step, size - size % 4)])
+                if sys.byteorder == 'big':
+                    refs.byteswap()
+                yield refs
+        finally:
+            trace.close()
+
+def replay(filename, frame_counts, algos=('LRU',), stack=True):
+    """
+    one pass over the trace feeding an engine per algorithm and number of
+    frames, and the stack distances if stack is set;
+    return ({(algo, frames): engine}, StackDistances or None)
+    """
+    runs = dict(((algo, frames), engines[algo](frames)) for algo in algos for frames in frame_counts)
+    distances = StackDistances() if stack else None
+    for refs in read_trace(filename):
+        for engine in runs.itervalues():
+            engine.run(refs)
+        if distances is not None:
+            distances.run(refs)
+    return runs, distances
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='replay a page reference trace against page replacement algorithms')
+    parser.add_argument('trace', help='trace file, 32-bit little endian page numbers')
+    parser.add_argument('--frames', nargs='+', type=int, default=[16, 32, 64, 128])
+    parser.add_argument('--algos', nargs='*', default=['LRU', 'Clock', 'FIFO'], choices=sorted(engines),
+                        help='engines to run besides the stack distances')
+    parser.add_argument('--no-stack', action='store_true', help='skip the LRU stack distances')
+    parser.add_argument('--generate', type=int, metavar='N', help='write a synthetic trace of N references first')
+    parser.add_argument('--pages', type=int, default=1024, help='pages of the synthetic trace')
+    parser.add_argument('--locality', type=float, default=0.98)
+    parser.add_argument('--window', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.generate:
+        write_trace(args.trace, itertools.islice(iter_reference_string(args.seed, args.pages, args.locality, args.window), args.generate))
+    t0 = time.time()
+    runs, distances = replay(args.trace, args.frames, args.algos, not args.no_stack)
+    columns = (['LRU (stack)'] if distances is not None else []) + args.algos
+    print "%8s %s"%('frames', ' '.join('%12s'%name for name in columns))
+    for frames in args.frames:
+        rates = [distances.fault_rate(frames)] if distances is not None else []
+        rates += [runs[algo, frames].fault_rate() for algo in args.algos]
+        print "%8s %s"%(frames, ' '.join('%11.4f%%'%(100 * rate) for rate in rates))
+    references = distances.references if distances is not None else next(iter(runs.itervalues())).references if runs else 0
+    sys.stderr.write('%s references in %.2f s\n'%(references, time.time() - t0))
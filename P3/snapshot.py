@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+"""
+snapshots of a run
+
+a snapshot is the whole state of BaseOS.run_proc between two scheduling
+points: the process table, the ready queue, the memory pool (locator and
+holes), the clock, the pending I/O and arrivals, and the statistics so far,
+pickled and zlib-compressed; BaseOS.resume() continues the run from it with
+the same log and results as the uninterrupted run from that point on
+
+the arrivals are not copied, a snapshot only counts the records already
+read, so the same workload has to be loaded (or streamed) to resume
+
+    python snapshot.py <snapshot> <workload>
+
+replays the rest of the run from a snapshot, with the parameters it was saved with
+"""
+
+import os
+import zlib
+import cPickle as pickle
+
+VERSION = 3
+
+def dumps(state):
+    return zlib.compress(pickle.dumps((VERSION, state), pickle.HIGHEST_PROTOCOL))
+
+def loads(data):
+    version, state = pickle.loads(zlib.decompress(data))
+    if version != VERSION:
+        raise ValueError('unsupported snapshot version: %s'%version)
+    return state
+
+def save(state, filename):
+    # write next to the previous snapshot and rename, an interruption never leaves a partial file
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'wb') as f:
+        f.write(dumps(state))
+    os.rename(tmp_filename, filename)
+
+def load(filename):
+    with open(filename, 'rb') as f:
+        return loads(f.read())
+
+if __name__ == '__main__':
+    import sys
+    from baseos import BaseOS
+    bos = BaseOS()
+    bos.load_process(sys.argv[2])
+    bos.resume(sys.argv[1])
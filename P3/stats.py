@@ -0,0 +1,130 @@
+#!/usr/bin/python
+
+"""
+run statistics
+
+RunRecorder keeps the per-burst and per-process records of a run in
+compact arrays as the simulation goes, summarize() reduces them in one
+pass at the end (vectorized when numpy is installed):
+means and p50/p95/p99 of wait and turnaround, throughput, CPU and
+memory utilization
+
+times are on the simulation clock, the defragmentation stalls
+(t_pseudo_elapsed) are not part of them
+"""
+
+from array import array
+from collections import OrderedDict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PERCENTILES = (50, 95, 99)
+
+class RunRecorder(object):
+    """
+    burst_ready, burst_end, burst_wait: per CPU burst, the time it became
+        ready, the time it completed and the time spent in the ready queue
+    proc_arrival, proc_exit: per terminated process
+    mem_time, mem_used: memory units in use from mem_time on
+    """
+    def __init__(self):
+        super(RunRecorder, self).__init__()
+        self.burst_ready = array('l')
+        self.burst_end = array('l')
+        self.burst_wait = array('l')
+        self.proc_arrival = array('l')
+        self.proc_exit = array('l')
+        self.mem_time = array('l')
+        self.mem_used = array('l')
+        self.current = {} # {proc-num: [ready time, enqueue time, wait]} of the current bursts
+
+    def ready(self, proc_num, t):
+        # a new CPU burst is ready (admission, I/O completion, previous burst done)
+        self.current[proc_num] = [t, t, 0]
+
+    def requeue(self, proc_num, t):
+        # the burst is preempted and back in the ready queue
+        self.current[proc_num][1] = t
+
+    def dispatch(self, proc_num, t):
+        burst = self.current[proc_num]
+        burst[2] += t - burst[1]
+
+    def end_burst(self, proc_num, t):
+        ready_time, enqueue_time, wait = self.current.pop(proc_num)
+        self.burst_ready.append(ready_time)
+        self.burst_end.append(t)
+        self.burst_wait.append(wait)
+
+    def exit(self, arrival_time, t):
+        self.proc_arrival.append(arrival_time)
+        self.proc_exit.append(t)
+
+    def memory(self, t, used_units):
+        if len(self.mem_time) and self.mem_time[-1] == t:
+            self.mem_used[-1] = used_units
+        else:
+            self.mem_time.append(t)
+            self.mem_used.append(used_units)
+
+    def total_wait(self):
+        return sum(self.burst_wait)
+
+
+def percentiles(values, qs=PERCENTILES):
+    """
+    linear interpolation between the closest ranks, as numpy.percentile
+    """
+    if not len(values):
+        return [0.0 for q in qs]
+    if numpy is not None:
+        return [float(x) for x in numpy.percentile(numpy.asarray(values, dtype=float), qs)]
+    values = sorted(values)
+    ret = []
+    for q in qs:
+        pos = (len(values) - 1) * q / 100.0
+        lo = int(pos)
+        hi = min(lo + 1, len(values) - 1)
+        ret.append(values[lo] + (values[hi] - values[lo]) * (pos - lo))
+    return ret
+
+def _mean(values):
+    return float(sum(values)) / len(values) if len(values) else 0.0
+
+def summarize(recorder, end_time, total_burst_time, total_units):
+    """
+    OrderedDict of the distribution statistics of a run
+    """
+    if numpy is not None:
+        wait = numpy.asarray(recorder.burst_wait, dtype=float)
+        turnaround = numpy.asarray(recorder.burst_end, dtype=float) - numpy.asarray(recorder.burst_ready, dtype=float)
+        proc_turnaround = numpy.asarray(recorder.proc_exit, dtype=float) - numpy.asarray(recorder.proc_arrival, dtype=float)
+        mem_time = numpy.append(numpy.asarray(recorder.mem_time, dtype=float), end_time)
+        mem_used = numpy.asarray(recorder.mem_used, dtype=float)
+        mem_units_ms = float(numpy.dot(numpy.diff(mem_time), mem_used)) if len(mem_used) else 0.0
+        mean = lambda values: float(values.mean()) if len(values) else 0.0
+    else:
+        wait = recorder.burst_wait
+        turnaround = [e - r for r, e in zip(recorder.burst_ready, recorder.burst_end)]
+        proc_turnaround = [e - a for a, e in zip(recorder.proc_arrival, recorder.proc_exit)]
+        mem_time = list(recorder.mem_time) + [end_time]
+        mem_units_ms = float(sum((mem_time[i + 1] - mem_time[i]) * used for i, used in enumerate(recorder.mem_used)))
+        mean = _mean
+    stats = OrderedDict()
+    stats['mean_wait'] = mean(wait)
+    for q, x in zip(PERCENTILES, percentiles(wait)):
+        stats['p%s_wait'%q] = x
+    stats['mean_burst_turnaround'] = mean(turnaround)
+    for q, x in zip(PERCENTILES, percentiles(turnaround)):
+        stats['p%s_burst_turnaround'%q] = x
+    stats['mean_proc_turnaround'] = mean(proc_turnaround)
+    for q, x in zip(PERCENTILES, percentiles(proc_turnaround)):
+        stats['p%s_proc_turnaround'%q] = x
+    stats['throughput'] = 1000.0 * len(recorder.proc_exit) / end_time if end_time else 0.0 # processes per second
+    stats['cpu_utilization'] = float(total_burst_time) / end_time if end_time else 0.0
+    stats['mem_utilization'] = mem_units_ms / (end_time * total_units) if end_time and total_units else 0.0 # time-weighted
+    stats['peak_mem_utilization'] = float(max(recorder.mem_used)) / total_units if len(recorder.mem_used) and total_units else 0.0
+    return stats
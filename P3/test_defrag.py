@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+"""
+defragmentation plans and their log, run from P3/: python -m unittest test_defrag
+"""
+
+import unittest
+from collections import OrderedDict
+from baseos import BaseOS
+from mem_pool import MemPool
+from defrag import plan_smallest, apply_moves
+from events import EventSink
+from pcb import PCB
+
+class RecordingSink(EventSink):
+    def __init__(self):
+        super(RecordingSink, self).__init__()
+        self.names = []
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        self.names.append(name)
+
+def fragmented_pool():
+    # A(3) . B(3) . C(2): the two free units are 1-unit holes, no window can be cleared
+    memory_pool = MemPool(10, 1)
+    for proc_num, start, size in (('A', 0, 3), ('B', 4, 3), ('C', 8, 2)):
+        memory_pool.place(proc_num, start, size)
+    return memory_pool
+
+class DefragTest(unittest.TestCase):
+    def test_smallest_falls_back_to_full(self):
+        memory_pool = fragmented_pool()
+        hole_start, moves = plan_smallest(memory_pool, 2)
+        self.assertNotEqual(hole_start, -1)
+        apply_moves(memory_pool, moves)
+        memory_pool.place('D', hole_start, 2)
+        self.assertEqual(memory_pool.free_units(), 0)
+
+    def test_failed_plan_logs_nothing(self):
+        bos = BaseOS()
+        bos.sink = RecordingSink()
+        bos.policy = bos.make_policy('SRT')
+        bos.defrag_plan = lambda memory_pool, size: (-1, []) # a strategy that cannot open a hole
+        memory_pool = fragmented_pool()
+        pcb = PCB('D', 10, 1, 0, memory=2)
+        self.assertFalse(bos.admit(OrderedDict([('D', pcb)]), bos.policy.new_queue(), memory_pool, 'FirstFit', 'D', pcb))
+        self.assertEqual(bos.sink.names, ['no_memory'])
+        self.assertEqual(bos.defrag_count, 0)
+
+if __name__ == '__main__':
+    unittest.main()
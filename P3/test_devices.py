@@ -0,0 +1,26 @@
+#!/usr/bin/python
+
+"""
+the I/O device model, run from P3/: python -m unittest test_devices
+"""
+
+import unittest
+from devices import IODevice
+
+class DepthTest(unittest.TestCase):
+    def test_release_reported_late(self):
+        device = IODevice('disk', 1)
+        self.assertEqual(device.submit(0, 'A', 10, 0), 10)
+        self.assertEqual(device.submit(12, 'B', 10, 0), None) # A's channel release is not reported yet
+        self.assertEqual(device.release(10), ('B', 22)) # reported at its own time, B starts on arrival
+        self.assertEqual(device.wait_time, 0)
+        self.assertEqual(device.depth_time, 0) # the device clock never goes backwards
+        self.assertEqual(device.t_last, 12)
+        device.submit(15, 'C', 10, 0)
+        self.assertEqual(device.release(22), ('C', 32))
+        self.assertEqual(device.wait_time, 7) # C queued from 15 to 22
+        self.assertEqual(device.depth_time, 7)
+        self.assertEqual(device.stats(30)['avg_depth'], 7 / 30.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+"""
+the event log selected by event_log, run from P3/: python -m unittest test_events
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from baseos import BaseOS
+from events import JsonlSink, make_sink
+
+class JsonlRunTest(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+        shutil.rmtree(self.workdir)
+
+    def test_jsonl_run(self):
+        log = os.path.join(self.workdir, 'run.jsonl')
+        config = os.path.join(self.workdir, 'config.txt')
+        with open(config, 'w') as f:
+            f.write('event_log=jsonl:%s\n'%log)
+        bos = BaseOS()
+        bos.load_process('processes.txt')
+        bos.load_config(config)
+        self.assertTrue(isinstance(bos.sink, JsonlSink))
+        bos.run_proc('SRT', 'FirstFit')
+        bos.sink.close()
+        with open(log, 'r') as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual(events[0]['event'], 'start')
+        self.assertEqual(events[-1]['event'], 'end')
+        self.assertEqual(sorted(e['proc'] for e in events if e['event'] == 'terminate'), sorted(bos.process_table))
+        times = [e['t'] for e in events]
+        self.assertEqual(times, sorted(times))
+
+    def test_invalid_event_log(self):
+        self.assertRaises(ValueError, make_sink, 'xml:run.xml', BaseOS.event_formats)
+
+if __name__ == '__main__':
+    unittest.main()
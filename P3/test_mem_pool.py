@@ -0,0 +1,44 @@
+#!/usr/bin/python
+
+"""
+the hole index and the graph of MemPool, run from P3/: python -m unittest test_mem_pool
+"""
+
+import random
+import unittest
+from mem_pool import MemPool
+from baseos import BaseOS
+
+class FirstFitTest(unittest.TestCase):
+    def scan(self, memory_pool, size, rover):
+        # the first hole that fits, the linear way
+        for start, hole_size in memory_pool.holes():
+            if start >= rover and hole_size >= size:
+                return start
+        return -1
+
+    def test_tree_matches_scan(self):
+        rand = random.Random(7)
+        memory_pool = MemPool(32, 10)
+        resident = []
+        for step in xrange(2000):
+            if resident and rand.random() < 0.4:
+                memory_pool.free(resident.pop(rand.randrange(len(resident))))
+            elif memory_pool.allocate(step, rand.randint(1, 40), rand.choice(MemPool.placement_algos)) != -1:
+                resident.append(step)
+            size = rand.randint(1, 60)
+            rover = rand.randint(0, memory_pool.total_units)
+            self.assertEqual(memory_pool._first_fit(size, rover), self.scan(memory_pool, size, rover))
+        self.assertEqual(memory_pool.hole_max.get(1, 0), memory_pool.largest_hole())
+
+class MemGraphTest(unittest.TestCase):
+    def test_one_cell_per_unit(self):
+        memory_pool = MemPool(8, 3)
+        memory_pool.place('12', 0, 6)
+        memory_pool.place('7', 6, 4)
+        graph = BaseOS().draw_mem_graph(memory_pool)
+        self.assertEqual(graph.split('\r\n'), ['='*8, '11111177', '77......', '........', '='*8])
+        self.assertEqual(BaseOS().draw_mem_graph(memory_pool, 1, 1).split('\r\n'), ['='*8, '77......', '='*8])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/python
+
+"""
+the MLFQ priority boost, run from P3/: python -m unittest test_mlfq
+"""
+
+import os
+import sys
+import unittest
+from collections import OrderedDict
+from baseos import BaseOS
+from events import EventSink
+from pcb import PCB
+
+class RecordingSink(EventSink):
+    def __init__(self):
+        super(RecordingSink, self).__init__()
+        self.events = []
+
+    def event(self, t, name, proc=None, queue=None, **data):
+        self.events.append((t, name, proc))
+
+class BoostTest(unittest.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def test_boost_is_on_time(self):
+        # one long burst and nobody else ready: no scheduling point before 3500ms
+        bos = BaseOS()
+        bos.sink = RecordingSink()
+        bos.mlfq_boost = 1000
+        bos.process_table = OrderedDict([('A', PCB('A', 3500, 1, 0, memory=10))])
+        bos.run_proc('MLFQ', 'FirstFit')
+        boosts = [t for t, name, proc in bos.sink.events if name == 'boost']
+        self.assertEqual(boosts, [1000, 2000, 3000])
+
+if __name__ == '__main__':
+    unittest.main()
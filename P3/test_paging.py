@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+"""
+paged mode under memory pressure, run from P3/: python -m unittest test_paging
+"""
+
+import os
+import sys
+import signal
+import unittest
+from collections import OrderedDict
+from baseos import BaseOS
+from paging import PagedMemory
+from pcb import PCB
+from events import EventSink
+
+class PagedRunTest(unittest.TestCase):
+    def setUp(self):
+        signal.signal(signal.SIGALRM, self.timeout)
+        signal.alarm(120) # a livelocked run fails the test instead of hanging it
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def tearDown(self):
+        signal.alarm(0)
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def timeout(self, signum, frame):
+        raise AssertionError('the run did not terminate')
+
+    def run_paged(self, algo, replacement_algo, proc_count):
+        bos = BaseOS()
+        bos.sink = EventSink()
+        bos.memory_mode = 'paged'
+        bos.mem_units_per_line, bos.mem_line_num, bos.page_size = 16, 1, 4 # 4 frames
+        bos.process_table = OrderedDict()
+        for i in xrange(proc_count):
+            proc_num = 'P%s'%i
+            bos.process_table[proc_num] = PCB(proc_num, 100 + 7 * i, 3, 40, 0, 5 * i, 32)
+        return bos, bos.run_proc(algo, replacement_algo)
+
+    def test_more_processes_than_frames(self):
+        for algo in ('RR', 'MLFQ', 'SRT'):
+            for replacement_algo in PagedMemory.replacement_algos:
+                bos, stats = self.run_paged(algo, replacement_algo, 12)
+                self.assertEqual(len(bos.recorder.proc_exit), 12, (algo, replacement_algo))
+                self.assertTrue(stats['page_evictions'] > 0)
+
+    def test_pinned_frame_is_not_replaced(self):
+        memory = PagedMemory(8, 1, 'LRU', 4) # 2 frames
+        a, b = PCB('A', 20, 1, 0, memory=8), PCB('B', 20, 1, 0, memory=8)
+        memory.allocate('A', 8)
+        memory.allocate('B', 8)
+        self.assertEqual(memory.allocate('C', 8), -1) # one process per frame
+        page_a = memory.fault(a)
+        memory.fault(b)
+        self.assertEqual(memory.loaded('A'), page_a)
+        memory.run(b, 10) # B makes its faulting reference, A is yet to run
+        frame_a = memory.spaces['A'].page_table[page_a]
+        self.assertEqual(memory.pinned, set([frame_a]))
+        self.assertNotEqual(memory._victim(), frame_a)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/python
+
+"""
+benchmark harness of P2/bench.py and P3/bench.py, a single copy so that both
+projects save and compare their results the same way (each bench.py puts the
+repository root on sys.path)
+
+a benchmark is a function (size, seed, **params) -> {metric: value}, timing
+its own measured section; run_benchmarks() runs each one in a fresh worker
+process, so that the peak memory (peak_rss_kb) is its own, and adds the
+total wall/CPU time of the worker; the results are saved as JSON and
+compare() flags the regressions between two result files
+"""
+
+import sys
+import json
+import time
+import platform
+import resource
+from collections import OrderedDict
+from multiprocessing import Pool
+
+# metrics compared by compare(), higher is better for the rates, lower for the others
+RATE_METRICS = ('events_per_s', 'ops_per_s', 'units_per_s')
+COST_METRICS = ('peak_rss_kb',)
+
+def timed(op, setup=None, min_time=0.2, max_repeat=1000, max_time=None):
+    """
+    run op() (op(setup()) after an untimed setup() if given) until min_time
+    seconds have been measured, or max_time seconds have passed in all;
+    return (seconds of the fastest run, last result), the fastest run is the
+    one the least disturbed by the rest of the machine, so every run should
+    get the same input
+    """
+    seconds = 0.0
+    best = None
+    repeat = 0
+    result = None
+    t_start = time.time()
+    while repeat == 0 or (seconds < min_time and repeat < max_repeat and
+                          (max_time is None or time.time() - t_start < max_time)):
+        state = setup() if setup is not None else None
+        t0 = time.time()
+        result = op(state) if setup is not None else op()
+        t = time.time() - t0
+        seconds += t
+        best = t if best is None else min(best, t)
+        repeat += 1
+    return max(best, 1e-9), result
+
+def _cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _run(job):
+    name, func, size, seed, params = job
+    t0 = time.time()
+    c0 = _cpu_time()
+    row = OrderedDict([('name', name), ('size', size)])
+    try:
+        row.update(func(size, seed, **params))
+    except Exception, e:
+        row['error'] = '%s: %s'%(e.__class__.__name__, e)
+    row['wall_s'] = time.time() - t0
+    row['cpu_s'] = _cpu_time() - c0
+    row['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KB on Linux
+    return row
+
+def run_benchmarks(jobs, isolate=True, log=sys.stderr):
+    """
+    jobs: (name, function, size, seed, params) tuples, return the result rows
+    """
+    rows = []
+    for job in jobs:
+        if isolate:
+            pool = Pool(1)
+            try:
+                row = pool.apply(_run, (job,))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            row = _run(job)
+        rows.append(row)
+        if log is not None:
+            log.write('%s\n'%format_row(row))
+            log.flush()
+    return rows
+
+def format_row(row):
+    fields = ['%-28s %9s'%(row['name'], row['size'])]
+    for name in RATE_METRICS:
+        if name in row:
+            fields.append('%s %.0f'%(name, row[name]))
+    if 'error' in row:
+        fields.append('error %s'%row['error'])
+    fields.append('wall %.2fs peak %.0fMB'%(row['wall_s'], row['peak_rss_kb'] / 1024.0))
+    return '  '.join(fields)
+
+def save(rows, filename, seed):
+    meta = OrderedDict([
+        ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('seed', seed),
+    ])
+    with open(filename, 'w') as f:
+        json.dump(OrderedDict([('meta', meta), ('results', rows)]), f, indent=1)
+
+def load(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+def compare(old, new, threshold=0.1):
+    """
+    the regressions of new against old (benchmark results, see save) as
+    (name, size, metric, old value, new value, relative change) tuples:
+    a rate down or a cost up by more than threshold
+    """
+    old_rows = dict(((row['name'], row['size']), row) for row in old['results'])
+    regressions = []
+    for row in new['results']:
+        old_row = old_rows.get((row['name'], row['size']))
+        if old_row is None:
+            continue
+        for metric in RATE_METRICS + COST_METRICS:
+            if not old_row.get(metric) or metric not in row:
+                continue
+            change = float(row[metric] - old_row[metric]) / old_row[metric]
+            if (metric in RATE_METRICS and change < -threshold) or (metric in COST_METRICS and change > threshold):
+                regressions.append((row['name'], row['size'], metric, old_row[metric], row[metric], change))
+    return regressions